@@ -1,8 +1,20 @@
-from django.contrib import admin
-from .models import User, ProfileViewRecord
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect, render
+from django.urls import path
+from .importers import import_users
+from .models import User, ProfileViewer, ProfileViewRecord, ProfileViewRollup, OTPChallenge
 from category.models import Category
 
 
+class UserImportForm(forms.Form):
+    csv_file = forms.FileField(help_text="Columns: name, email, mobile_number (required); country_code, role, address, designation, business_name, company_name, is_whatsapp")
+    country_code = forms.CharField(required=False, help_text="Used for rows without country_code, e.g. +91")
+    dry_run = forms.BooleanField(required=False, help_text="Validate only, don't create users")
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('id', 'category_name', 'type')  # ✅ use correct field
@@ -12,27 +24,60 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'mobile_number', 'email', 'role', 'is_active')
-    list_filter = ('role', 'is_active', 'is_staff')
+    list_display = ('id', 'name', 'mobile_number', 'email', 'role', 'profile_completed', 'is_active')
+    list_filter = ('role', 'profile_completed', 'is_active', 'is_staff')
     search_fields = ('name', 'email', 'mobile_number')
-    readonly_fields = ('profile_views', 'otp_created_at')
+    readonly_fields = ('profile_views', 'profile_completed')
     fieldsets = (
         ("Basic Info", {
             "fields": ('name', 'email', 'mobile_number', 'country_code', 'is_whatsapp', 'address'),
         }),
         ("Profile & Role", {
-            "fields": ('role', 'category', 'profile_picture', 'about', 'enable_designation_and_company_name', 'designation'),
+            "fields": ('role', 'category', 'profile_picture', 'about', 'enable_designation_and_company_name', 'designation', 'profile_completed'),
         }),
         ("Business Info", {
             "fields": ('business_name', 'company_name', 'logo'),
         }),
         ("Security & Status", {
-            "fields": ('otp', 'otp_created_at', 'is_active', 'is_staff', 'is_superuser'),
+            "fields": ('is_active', 'is_staff', 'is_superuser'),
         }),
         ("Analytics", {
             "fields": ('profile_views',),
         }),
     )
+    change_list_template = 'admin/accounts/user/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('import-csv/', self.admin_site.admin_view(self.import_csv_view), name='accounts_user_import_csv'),
+        ]
+        return urls + super().get_urls()
+
+    def import_csv_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:accounts_user_changelist')
+
+        result = None
+        form = UserImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            fileobj = io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig', newline='')
+            result = import_users(
+                fileobj,
+                default_country_code=form.cleaned_data['country_code'] or None,
+                dry_run=form.cleaned_data['dry_run'],
+            )
+            verb = "Would create" if form.cleaned_data['dry_run'] else "Created"
+            level = messages.WARNING if result.errors else messages.SUCCESS
+            self.message_user(request, f"{verb} {result.created} users, {len(result.errors)} rows rejected.", level)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Import users from CSV",
+            'form': form,
+            'result': result,
+        }
+        return render(request, 'admin/accounts/user/import_csv.html', context)
 
 
 @admin.register(ProfileViewRecord)
@@ -42,6 +87,28 @@ class ProfileViewRecordAdmin(admin.ModelAdmin):
     search_fields = ('profile_owner__mobile_number', 'viewer__mobile_number')
 
 
+@admin.register(ProfileViewer)
+class ProfileViewerAdmin(admin.ModelAdmin):
+    list_display = ('profile_owner', 'viewer')
+    search_fields = ('profile_owner__mobile_number', 'viewer__mobile_number')
+    raw_id_fields = ('profile_owner', 'viewer')
+
+
+@admin.register(ProfileViewRollup)
+class ProfileViewRollupAdmin(admin.ModelAdmin):
+    list_display = ('profile_owner', 'granularity', 'bucket_start', 'views')
+    list_filter = ('granularity', 'bucket_start')
+    search_fields = ('profile_owner__mobile_number',)
+    raw_id_fields = ('profile_owner',)
+
+
+@admin.register(OTPChallenge)
+class OTPChallengeAdmin(admin.ModelAdmin):
+    list_display = ('mobile_number', 'created_at', 'expires_at', 'consumed_at')
+    list_filter = ('created_at',)
+    search_fields = ('mobile_number',)
+
+
 
 
 
@@ -0,0 +1,62 @@
+# accounts/async_api.py
+"""
+Plumbing for async read endpoints.
+
+DRF views are synchronous, so under ASGI each request holds a worker thread
+through its ORM I/O. The hottest read endpoints also have async variants
+built on plain Django async views: AsyncAPIView authenticates the JWT with
+CachedJWTAuthentication.aauthenticate and views answer with
+json_api_response, which keeps the api_response envelope.
+"""
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import status
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .authentication import CachedJWTAuthentication
+
+
+def json_api_response(success, message=None, data=None, status_code=status.HTTP_200_OK, **extra):
+    """
+    The api_response envelope as a plain JsonResponse (no DRF renderer
+    needed). `extra` adds top-level keys such as next_cursor.
+    """
+    if message is None:
+        message = "Operation successful." if success else "An error occurred."
+    return JsonResponse({"success": success, "message": message, "data": data, **extra}, status=status_code)
+
+
+def _auth_error_message(exc):
+    detail = exc.detail
+    if isinstance(detail, dict):
+        detail = detail.get("detail", "Invalid token.")
+    return str(detail)
+
+
+class AsyncAPIView(View):
+    """
+    Base class for async GET endpoints. Sets request.user from the Bearer
+    token and rejects anonymous requests unless `authentication_required`
+    is False. Handlers must be `async def`.
+    """
+    http_method_names = ['get', 'head', 'options']
+    authentication_required = True
+    authenticator_class = CachedJWTAuthentication
+
+    async def dispatch(self, request, *args, **kwargs):
+        authenticator = self.authenticator_class()
+        try:
+            result = await authenticator.aauthenticate(request)
+        except (InvalidToken, AuthenticationFailed) as e:
+            return self.unauthorized(request, authenticator, _auth_error_message(e))
+
+        request.user = result[0] if result else AnonymousUser()
+        if self.authentication_required and not request.user.is_authenticated:
+            return self.unauthorized(request, authenticator, "Authentication credentials were not provided.")
+        return await super().dispatch(request, *args, **kwargs)
+
+    def unauthorized(self, request, authenticator, message):
+        response = json_api_response(False, message, None, status.HTTP_401_UNAUTHORIZED)
+        response["WWW-Authenticate"] = authenticator.authenticate_header(request)
+        return response
@@ -0,0 +1,115 @@
+# accounts/authentication.py
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Bump when the cached User shape changes (new fields, migrations) so old
+# entries are ignored instead of unpickled.
+USER_CACHE_VERSION = 1
+
+
+def get_user_cache():
+    return caches[getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default')]
+
+
+def user_cache_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    get_user_cache().delete(user_cache_key(user_id), version=USER_CACHE_VERSION)
+
+
+def invalidate_cached_users(user_ids):
+    get_user_cache().delete_many([user_cache_key(user_id) for user_id in user_ids], version=USER_CACHE_VERSION)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves request.user from a short-lived cache
+    instead of querying accounts_user on every request.
+
+    Entries are dropped on User save/delete (see accounts.signals), so profile
+    edits and deactivation take effect on the next request - provided
+    AUTH_USER_CACHE_ALIAS is a cache shared by every worker (accounts.checks
+    warns otherwise). Bulk `queryset.update()` bypasses signals; those
+    changes show up after AUTH_USER_CACHE_TIMEOUT.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        cache = get_user_cache()
+        key = user_cache_key(user_id)
+        user = cache.get(key, version=USER_CACHE_VERSION)
+        if user is None:
+            # Cache miss: the parent does the lookup and all the checks
+            user = super().get_user(validated_token)
+            cache.set(
+                key,
+                user,
+                timeout=getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60),
+                version=USER_CACHE_VERSION,
+            )
+            return user
+
+        self.check_user(user, validated_token)
+        return user
+
+    def check_user(self, user, validated_token):
+        """The checks JWTAuthentication.get_user applies after its lookup."""
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views: token parsing and validation are pure
+        CPU, the user comes from the cache or the async ORM.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        cache = get_user_cache()
+        key = user_cache_key(user_id)
+        user = await cache.aget(key, version=USER_CACHE_VERSION)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            self.check_user(user, validated_token)
+            await cache.aset(
+                key,
+                user,
+                timeout=getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60),
+                version=USER_CACHE_VERSION,
+            )
+            return user
+
+        self.check_user(user, validated_token)
+        return user
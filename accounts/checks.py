@@ -0,0 +1,36 @@
+# accounts/checks.py
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Caches whose invalidations must reach every worker
+SHARED_CACHE_SETTINGS = (
+    'AUTH_USER_CACHE_ALIAS',
+    'PROFILE_PUBLIC_CACHE_ALIAS',
+    'UNREAD_COUNT_CACHE_ALIAS',
+)
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register('caches')
+def check_shared_caches(app_configs, **kwargs):
+    """
+    A per-process cache only drops entries in the worker that made the change;
+    every other worker keeps serving deactivated users, stale profiles and
+    badge counts until the entries time out.
+    """
+    warnings = []
+    for name in SHARED_CACHE_SETTINGS:
+        alias = getattr(settings, name, 'default')
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend in PROCESS_LOCAL_BACKENDS:
+            warnings.append(Warning(
+                f"{name} points at the '{alias}' cache, which is not shared between processes.",
+                hint="Use a file, database or RESP (accounts.resp_cache.RespCache) cache.",
+                obj=name,
+                id='accounts.W001',
+            ))
+    return warnings
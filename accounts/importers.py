@@ -0,0 +1,157 @@
+# accounts/importers.py
+"""
+Bulk user import from CSV (corporate onboarding).
+
+Rows are streamed and processed in chunks: phones are normalized through the
+shared phone cache, duplicates are found with one set-based query per chunk
+(emails compared case-insensitively), and valid rows are inserted with
+bulk_create. A user registering between that check and the insert only sends
+the chunk down a row-by-row path. Imported users get an unusable password
+(they log in with OTP), so no per-row password hashing happens.
+"""
+import csv
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import User
+from .phone import normalize_phone_number, PhoneNumberError
+from .search import index_users
+
+REQUIRED_COLUMNS = ('name', 'email', 'mobile_number')
+OPTIONAL_COLUMNS = (
+    'country_code', 'role', 'address', 'designation', 'business_name', 'company_name', 'is_whatsapp',
+)
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.errors = []  # (line number, message)
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+
+def _clean_row(row, default_country_code):
+    """Validate one CSV row; returns (field values, None) or (None, error message)."""
+    values = {key: (row.get(key) or '').strip() for key in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+
+    if not values['name']:
+        return None, "name is required"
+    try:
+        validate_email(values['email'])
+    except ValidationError:
+        return None, f"invalid email '{values['email']}'"
+    try:
+        mobile_number, country_code = normalize_phone_number(
+            values['mobile_number'], values['country_code'] or default_country_code
+        )
+    except PhoneNumberError as e:
+        return None, f"invalid mobile number '{values['mobile_number']}': {e.message}"
+
+    role = values['role'].lower() or 'individual'
+    if role not in dict(User.ROLE_CHOICES):
+        return None, f"invalid role '{values['role']}'"
+
+    return {
+        'name': values['name'],
+        'email': User.objects.normalize_email(values['email']),
+        'mobile_number': mobile_number,
+        'country_code': country_code,
+        'role': role,
+        'address': values['address'] or None,
+        'designation': values['designation'] or None,
+        'business_name': values['business_name'] or None,
+        'company_name': values['company_name'] or None,
+        'is_whatsapp': values['is_whatsapp'].lower() in TRUE_VALUES,
+    }, None
+
+
+def _import_chunk(rows, result, seen_mobiles, seen_emails, default_country_code, dry_run):
+    cleaned = []
+    for line, row in rows:
+        values, error = _clean_row(row, default_country_code)
+        if error:
+            result.add_error(line, error)
+        elif values['mobile_number'] in seen_mobiles:
+            result.add_error(line, f"duplicate mobile number {values['mobile_number']} in file")
+        elif values['email'].lower() in seen_emails:
+            result.add_error(line, f"duplicate email {values['email']} in file")
+        else:
+            seen_mobiles.add(values['mobile_number'])
+            seen_emails.add(values['email'].lower())
+            cleaned.append((line, values))
+    if not cleaned:
+        return
+
+    # One query for every existing mobile/email of this chunk
+    existing = User.objects.alias(email_lower=Lower('email')).filter(
+        Q(mobile_number__in=[values['mobile_number'] for _, values in cleaned])
+        | Q(email_lower__in=[values['email'].lower() for _, values in cleaned])
+    ).values_list('mobile_number', 'email')
+    existing_mobiles = {mobile for mobile, _ in existing}
+    existing_emails = {email.lower() for _, email in existing if email}
+
+    unusable_password = make_password(None)
+    users = []
+    for line, values in cleaned:
+        if values['mobile_number'] in existing_mobiles:
+            result.add_error(line, f"mobile number {values['mobile_number']} already registered")
+        elif values['email'].lower() in existing_emails:
+            result.add_error(line, f"email {values['email']} already registered")
+        else:
+            user = User(password=unusable_password, **values)
+            # bulk_create skips save(), so fill the maintained column here
+            user.profile_completed = user.compute_profile_completed()
+            users.append((line, user))
+
+    if users and not dry_run:
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user in users], batch_size=len(users))
+        except IntegrityError:
+            # Someone registered one of these numbers/emails since the check above
+            users = _insert_one_by_one(users, result)
+        # Some backends (MySQL) don't return ids from bulk_create
+        index_users(User.objects.filter(mobile_number__in=[user.mobile_number for _, user in users]))
+    result.created += len(users)
+
+
+def _insert_one_by_one(users, result):
+    """Insert `(line, user)` pairs one at a time; returns the pairs that were created."""
+    created = []
+    for line, user in users:
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user])
+        except IntegrityError:
+            result.add_error(line, f"mobile number {user.mobile_number} or email {user.email} already registered")
+        else:
+            created.append((line, user))
+    return created
+
+
+def import_users(fileobj, chunk_size=1000, default_country_code=None, dry_run=False):
+    """Import users from a text-mode CSV file object. Returns an ImportResult."""
+    result = ImportResult()
+    reader = csv.DictReader(fileobj)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        result.add_error(1, f"missing required column(s): {', '.join(missing)}")
+        return result
+
+    seen_mobiles, seen_emails = set(), set()
+    rows = enumerate(reader, start=2)  # line 1 is the header
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            result.errors.sort()
+            return result
+        _import_chunk(chunk, result, seen_mobiles, seen_emails, default_country_code, dry_run)
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import ProfileViewRecord
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete raw ProfileViewRecord rows older than the retention window. "
+        "View history stays available through the hourly/daily rollups, and "
+        "ProfileViewer keeps pruned viewers from being counted again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=90)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['retention_days'])
+        expired = ProfileViewRecord.objects.filter(viewed_at__lt=cutoff)
+        total = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            total += ProfileViewRecord.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} profile view records older than {cutoff:%Y-%m-%d}."))
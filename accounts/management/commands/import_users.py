@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importers import import_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users in bulk from a CSV file with columns name, email, mobile_number "
+        "and optionally country_code, role, address, designation, business_name, "
+        "company_name, is_whatsapp."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--country-code', help="Used for rows without country_code, e.g. +91")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only, don't create users")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as fileobj:
+                result = import_users(
+                    fileobj,
+                    chunk_size=options['chunk_size'],
+                    default_country_code=options['country_code'],
+                    dry_run=options['dry_run'],
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for line, message in result.errors:
+            self.stderr.write(f"line {line}: {message}")
+        verb = "Would create" if options['dry_run'] else "Created"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {result.created} users, {len(result.errors)} rows rejected."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import OTPChallenge
+
+
+class Command(BaseCommand):
+    help = "Delete expired or consumed login OTP challenges in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        stale = OTPChallenge.objects.filter(
+            Q(expires_at__lte=timezone.now()) | Q(consumed_at__isnull=False)
+        )
+        total = 0
+        while True:
+            # Small id batches keep each DELETE short and lock-friendly
+            ids = list(stale.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            total += OTPChallenge.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} OTP challenges."))
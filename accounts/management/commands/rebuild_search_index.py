@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from accounts.search import index_users
+
+
+class Command(BaseCommand):
+    help = "Rebuild the directory search tokens for all users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = index_users(User.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} users."))
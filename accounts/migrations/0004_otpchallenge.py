@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_profileviewrecord'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='otp',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='otp_created_at',
+        ),
+        migrations.CreateModel(
+            name='OTPChallenge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mobile_number', models.CharField(max_length=20)),
+                ('otp', models.CharField(max_length=6)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('consumed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['mobile_number', 'otp'], name='accounts_otp_mobile_otp_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_otpchallenge'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileViewRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='profileviewrecord',
+            index=models.Index(fields=['viewed_at'], name='accounts_pvr_viewed_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='profileviewrollup',
+            name='profile_owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='profileviewrollup',
+            constraint=models.UniqueConstraint(fields=('profile_owner', 'granularity', 'bucket_start'), name='accounts_rollup_owner_bucket_uniq'),
+        ),
+    ]
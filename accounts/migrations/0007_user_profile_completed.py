@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+REQUIRED_FIELDS = ('name', 'mobile_number', 'address', 'role', 'profile_picture', 'category_id')
+BUSINESS_REQUIRED_FIELDS = ('business_name', 'logo')
+
+
+def backfill_profile_completed(apps, schema_editor):
+    # Same rule as User.compute_profile_completed at the time of this migration
+    User = apps.get_model('accounts', 'User')
+    batch_size = 1000
+    last_id = 0
+    while True:
+        users = list(User.objects.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not users:
+            break
+        for user in users:
+            required_fields = REQUIRED_FIELDS + (BUSINESS_REQUIRED_FIELDS if user.role == 'business' else ())
+            user.profile_completed = all(getattr(user, field, None) for field in required_fields)
+        User.objects.bulk_update(users, ['profile_completed'], batch_size=batch_size)
+        last_id = users[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_usersearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_completed',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.RunPython(backfill_profile_completed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_viewers(apps, schema_editor):
+    # Every existing record is a pair that was already counted
+    ProfileViewRecord = apps.get_model('accounts', 'ProfileViewRecord')
+    ProfileViewer = apps.get_model('accounts', 'ProfileViewer')
+    batch_size = 5000
+    last_id = 0
+    while True:
+        records = list(
+            ProfileViewRecord.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'profile_owner_id', 'viewer_id')[:batch_size]
+        )
+        if not records:
+            break
+        ProfileViewer.objects.bulk_create(
+            [ProfileViewer(profile_owner_id=owner, viewer_id=viewer) for _, owner, viewer in records],
+            ignore_conflicts=True,
+        )
+        last_id = records[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_profile_completed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileViewer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile_owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('viewer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('profile_owner', 'viewer'), name='accounts_viewer_pair_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_viewers, migrations.RunPython.noop),
+    ]
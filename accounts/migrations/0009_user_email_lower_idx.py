@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:21
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_profileviewer'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('category', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='accounts_user_email_lower_idx'),
+        ),
+    ]
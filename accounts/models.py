@@ -1,4 +1,6 @@
-from django.db import models
+from datetime import timedelta
+from django.db import models, transaction
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.contrib.auth.base_user import BaseUserManager
@@ -37,9 +39,6 @@ class User(AbstractBaseUser, PermissionsMixin):
     country_code = models.CharField(max_length=5, null=True, blank=True)
     address = models.TextField(null=True, blank=True)
 
-    otp = models.CharField(max_length=6, unique=True, null=True, blank=True)
-    otp_created_at = models.DateTimeField(null=True, blank=True)
-
     ROLE_CHOICES = (
         ('individual', 'Individual'),
         ('business', 'Business'),
@@ -57,6 +56,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     company_name = models.CharField(max_length=255, null=True, blank=True)
     logo = models.ImageField(upload_to='logos/', null=True, blank=True)
     profile_views = models.PositiveIntegerField(default=0)
+    # Maintained in save(); see compute_profile_completed()
+    profile_completed = models.BooleanField(default=False, db_index=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
 
@@ -65,10 +66,29 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'mobile_number'  # Use phone to log in
     REQUIRED_FIELDS = ['name', 'email']  # Shown when creating superuser
 
-    def is_otp_valid(self, otp_input, expiry_seconds=300):
-        if self.otp != otp_input or not self.otp_created_at:
-            return False
-        return (timezone.now() - self.otp_created_at).total_seconds() <= expiry_seconds
+    # Fields that must be filled for a profile to count as complete
+    PROFILE_REQUIRED_FIELDS = ('name', 'mobile_number', 'address', 'role', 'profile_picture', 'category_id')
+    BUSINESS_REQUIRED_FIELDS = ('business_name', 'logo')
+
+    class Meta:
+        indexes = [
+            # Case-insensitive email lookups, e.g. duplicate checks in accounts.importers
+            models.Index(Lower('email'), name='accounts_user_email_lower_idx'),
+        ]
+
+    def compute_profile_completed(self):
+        required_fields = list(self.PROFILE_REQUIRED_FIELDS)
+        if self.role == 'business':
+            required_fields += self.BUSINESS_REQUIRED_FIELDS
+        # Empty ImageFields are falsy, so one truthiness check covers every field
+        return all(getattr(self, field, None) for field in required_fields)
+
+    def save(self, *args, **kwargs):
+        self.profile_completed = self.compute_profile_completed()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'profile_completed' not in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'profile_completed'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.mobile_number} - {self.name or 'Unregistered'}"
@@ -81,7 +101,140 @@ class ProfileViewRecord(models.Model):
 
     class Meta:
         unique_together = ('profile_owner', 'viewer')  # One view per viewer per profile
+        indexes = [
+            models.Index(fields=['viewed_at'], name='accounts_pvr_viewed_at_idx'),  # retention pruning
+        ]
 
     def __str__(self):
         return f"{self.viewer} viewed {self.profile_owner}"
 
+
+
+class ProfileViewer(models.Model):
+    """
+    Every (owner, viewer) pair already counted in User.profile_views.
+    Unlike ProfileViewRecord it is never pruned, so a viewer whose record was
+    compacted away is still recognised when they come back.
+    """
+    profile_owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    viewer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile_owner', 'viewer'], name='accounts_viewer_pair_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.viewer} counted for {self.profile_owner}"
+
+
+class ProfileViewRollup(models.Model):
+    """
+    Number of profile views an owner received in one hour or one day (UTC).
+    Incremented by each profile-view flush; the unique constraint doubles as the
+    (owner, granularity, bucket_start) index the analytics endpoint scans.
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = (
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    )
+
+    profile_owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='view_rollups')
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['profile_owner', 'granularity', 'bucket_start'],
+                name='accounts_rollup_owner_bucket_uniq',
+            ),
+        ]
+
+    @staticmethod
+    def bucket_for(viewed_at, granularity):
+        if granularity == ProfileViewRollup.HOUR:
+            return viewed_at.replace(minute=0, second=0, microsecond=0)
+        return viewed_at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def __str__(self):
+        return f"{self.profile_owner} - {self.granularity} {self.bucket_start:%Y-%m-%d %H:%M}: {self.views}"
+
+
+class UserSearchToken(models.Model):
+    """
+    Inverted index for the people/business directory: one row per distinct
+    word of a user's searchable fields, weighted by the field it came from.
+    Maintained by accounts.search; rebuild with `rebuild_search_index`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=32)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'token'], name='accounts_search_user_token_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['token', 'user'], name='accounts_search_token_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> {self.user_id}"
+
+
+class OTPChallenge(models.Model):
+    """
+    A login OTP sent to a mobile number.
+    Rows are append-only: verification consumes a row with a single UPDATE and
+    expired rows are removed in batches by `purge_otp_challenges`, so logins
+    never write to the User table.
+    """
+    EXPIRY_SECONDS = 300
+
+    mobile_number = models.CharField(max_length=20)
+    otp = models.CharField(max_length=6)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    consumed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['mobile_number', 'otp'], name='accounts_otp_mobile_otp_idx'),
+        ]
+
+    @classmethod
+    @transaction.atomic
+    def issue(cls, mobile_number, otp):
+        """
+        Issue a new challenge; any earlier live one for the number stops
+        working, so only the most recent code can be used.
+        """
+        now = timezone.now()
+        cls.objects.filter(
+            mobile_number=mobile_number,
+            consumed_at__isnull=True,
+            expires_at__gt=now,
+        ).update(consumed_at=now)
+        return cls.objects.create(
+            mobile_number=mobile_number,
+            otp=otp,
+            expires_at=timezone.now() + timedelta(seconds=cls.EXPIRY_SECONDS),
+        )
+
+    @classmethod
+    def consume(cls, mobile_number, otp):
+        """Atomically mark a live challenge as used. Returns True if one matched."""
+        now = timezone.now()
+        return cls.objects.filter(
+            mobile_number=mobile_number,
+            otp=otp,
+            consumed_at__isnull=True,
+            expires_at__gt=now,
+        ).update(consumed_at=now) > 0
+
+    def __str__(self):
+        return f"OTP for {self.mobile_number}"
@@ -0,0 +1,155 @@
+# accounts/pagination.py
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+
+Unlike OFFSET pagination every page is a single index range scan, so page
+1000 costs the same as page 1. Cursors are opaque url-safe strings encoding
+the ordering values of the last row of the previous page.
+"""
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder truncates to milliseconds; cursors need exact values
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor.")
+    if not isinstance(values, list):
+        raise InvalidCursor("Invalid cursor.")
+    return values
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset on a unique ordering, e.g. ('-timestamp', '-id').
+    The last ordering field must be unique (normally the primary key).
+
+    `paginate()` returns `(rows, next_cursor)`; `next_cursor` is None on the
+    last page.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, ordering, page_size=20, max_page_size=100):
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+
+    @staticmethod
+    def _params(request):
+        # DRF Request or a plain Django HttpRequest (async views)
+        return getattr(request, 'query_params', request.GET)
+
+    def get_page_size(self, request):
+        try:
+            size = int(self._params(request).get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def _coerce(self, queryset, name, value):
+        # Annotations (e.g. a search score) are not model fields
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        if isinstance(field, models.DateTimeField) and isinstance(value, str):
+            parsed = parse_datetime(value)
+            if parsed is None:
+                raise InvalidCursor("Invalid cursor.")
+            return parsed
+        if isinstance(field, models.ForeignKey):
+            field = field.target_field
+        try:
+            return field.to_python(value)
+        except Exception:
+            raise InvalidCursor("Invalid cursor.")
+
+    def _after(self, queryset, values):
+        """Q matching rows strictly after `values` in the configured ordering."""
+        names = self._field_names()
+        if len(values) != len(names):
+            raise InvalidCursor("Invalid cursor.")
+        values = [self._coerce(queryset, name, value) for name, value in zip(names, values)]
+
+        condition = Q()
+        for i, ordering in enumerate(self.ordering):
+            lookup = 'lt' if ordering.startswith('-') else 'gt'
+            step = Q(**{f'{names[i]}__{lookup}': values[i]})
+            for j in range(i):
+                step &= Q(**{names[j]: values[j]})
+            condition |= step
+        if len(names) > 1:
+            # Redundant bound on the leading column: without it some planners
+            # (SQLite) can't turn the OR into an index range and walk every
+            # row before the cursor instead
+            bound = 'lte' if self.ordering[0].startswith('-') else 'gte'
+            condition &= Q(**{f'{names[0]}__{bound}': values[0]})
+        return condition
+
+    def _page_queryset(self, queryset, request, cursor, page_size):
+        if cursor is None:
+            cursor = self._params(request).get(self.cursor_query_param)
+        queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(queryset, decode_cursor(cursor)))
+        # One extra row tells us whether there is a next page without a COUNT
+        return queryset[:page_size + 1]
+
+    def _page(self, rows, page_size):
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = self.cursor_for(rows[-1]) if has_next else None
+        return rows, next_cursor
+
+    def paginate(self, queryset, request, cursor=None, page_size=None):
+        if page_size is None:
+            page_size = self.get_page_size(request)
+        rows = list(self._page_queryset(queryset, request, cursor, page_size))
+        return self._page(rows, page_size)
+
+    async def apaginate(self, queryset, request, cursor=None, page_size=None):
+        """paginate() for async views, fetching the page with the async ORM."""
+        if page_size is None:
+            page_size = self.get_page_size(request)
+        rows = [row async for row in self._page_queryset(queryset, request, cursor, page_size)]
+        return self._page(rows, page_size)
+
+    def cursor_for(self, row):
+        """Cursor pointing just after `row`."""
+        return encode_cursor([self._value(row, name) for name in self._field_names()])
+
+    @staticmethod
+    def _value(row, name):
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
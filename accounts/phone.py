@@ -0,0 +1,68 @@
+# accounts/phone.py
+"""
+Single place where mobile numbers are parsed, validated and formatted.
+
+phonenumbers.parse/is_valid_number/format_number are comparatively expensive
+and the same number is normalized several times per signup/login request
+(view, serializer, utils), so results are kept in a bounded LRU cache keyed by
+the exact input. Failures are cached too, which keeps bad retries cheap.
+"""
+from functools import lru_cache
+
+import phonenumbers
+
+CACHE_SIZE = 10000
+
+PARSE_ERROR = 'parse'
+INVALID_NUMBER = 'invalid'
+
+
+class PhoneNumberError(ValueError):
+    """Raised when a number cannot be parsed (`PARSE_ERROR`) or is not valid (`INVALID_NUMBER`)."""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalize(full_number):
+    try:
+        parsed = phonenumbers.parse(full_number, None)
+    except phonenumbers.NumberParseException as e:
+        return None, None, PARSE_ERROR, str(e)
+
+    if not phonenumbers.is_valid_number(parsed):
+        return None, None, INVALID_NUMBER, "Invalid mobile number"
+
+    e164 = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+    return e164, f"+{parsed.country_code}", None, None
+
+
+def normalize_phone_number(raw, country_code=None):
+    """
+    Return `(e164_number, "+<country code>")` for a raw number.
+
+    Numbers starting with '+' are parsed as-is and `country_code` is ignored;
+    otherwise `country_code` is prefixed before parsing.
+    Raises PhoneNumberError if the number can't be parsed or is invalid.
+    """
+    if raw.startswith('+') or not country_code:
+        full_number = raw
+    else:
+        full_number = f"{country_code}{raw}"
+
+    e164, normalized_country_code, reason, message = _normalize(full_number)
+    if reason:
+        raise PhoneNumberError(reason, message)
+    return e164, normalized_country_code
+
+
+def cache_info():
+    """Hit/miss statistics of the normalization cache."""
+    return _normalize.cache_info()
+
+
+def clear_cache():
+    _normalize.cache_clear()
@@ -0,0 +1,77 @@
+# accounts/profile_cache.py
+"""
+Rendered-response cache for the public profile (business card) endpoint.
+
+Entries are keyed by a per-user version and a global category generation.
+Changes bump the version instead of deleting keys, so every host/worker
+sharing the cache sees the change; PROFILE_PUBLIC_CACHE_ALIAS must therefore
+be a shared cache, not a per-process one. See accounts.signals for the User,
+SocialMediaLink and Category hooks.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+
+CATEGORY_GENERATION_KEY = 'profile_public:category_generation'
+
+
+def get_profile_cache():
+    return caches[getattr(settings, 'PROFILE_PUBLIC_CACHE_ALIAS', 'default')]
+
+
+def _version_key(user_id):
+    return f'profile_public:version:{user_id}'
+
+
+def _bump(key):
+    cache = get_profile_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Missing key: any fresh value differs from what cached entries used
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_public_profile(user_id):
+    _bump(_version_key(user_id))
+
+
+def invalidate_public_profiles(user_ids):
+    for user_id in user_ids:
+        _bump(_version_key(user_id))
+
+
+def invalidate_all_public_profiles():
+    _bump(CATEGORY_GENERATION_KEY)
+
+
+def _entry_key(user_id, host):
+    cache = get_profile_cache()
+    versions = cache.get_many([_version_key(user_id), CATEGORY_GENERATION_KEY])
+    # Image URLs are absolute, so the host is part of the rendered payload
+    host_hash = hashlib.md5(host.encode()).hexdigest()[:8]
+    return (
+        f'profile_public:{user_id}:{host_hash}:'
+        f'{versions.get(_version_key(user_id), 0)}:{versions.get(CATEGORY_GENERATION_KEY, 0)}'
+    )
+
+
+def get_cached_profile(user_id, host):
+    """Return `(key, entry)`; `entry` is None on a miss."""
+    key = _entry_key(user_id, host)
+    return key, get_profile_cache().get(key)
+
+
+def cache_profile(key, data):
+    body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    entry = {
+        'data': data,
+        'etag': f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"',
+        'last_modified': int(time.time()),
+    }
+    get_profile_cache().set(key, entry, timeout=getattr(settings, 'PROFILE_PUBLIC_CACHE_TIMEOUT', 300))
+    return entry
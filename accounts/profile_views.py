@@ -0,0 +1,172 @@
+# accounts/profile_views.py
+"""
+Write-behind ingestion of profile views.
+
+Profile GETs only drop a (viewer, owner) event into an in-memory buffer.
+A background thread flushes the buffer every PROFILE_VIEW_FLUSH_INTERVAL
+seconds (or sooner once PROFILE_VIEW_BUFFER_SIZE distinct pairs are pending)
+with one multi-row upsert of ProfileViewRecord, F() increments of
+User.profile_views for first-time viewers and of the hourly/daily
+ProfileViewRollup buckets. First-time viewers are recognised through
+ProfileViewer, which compact_profile_views leaves alone. The owners' User
+rows are locked for the flush, so concurrent flushes from other workers
+never count a viewer twice.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .authentication import invalidate_cached_users
+from .profile_cache import invalidate_public_profiles
+from .models import User, ProfileViewer, ProfileViewRecord, ProfileViewRollup
+
+logger = logging.getLogger(__name__)
+
+
+def _group_by_increment(counts):
+    """Invert {key: n} into {n: [keys]} so each distinct increment is one UPDATE."""
+    grouped = defaultdict(list)
+    for key, increment in counts.items():
+        grouped[increment].append(key)
+    return grouped
+
+
+def update_rollups(events):
+    """Add the buffered hits to their hourly and daily buckets."""
+    hits = Counter()
+    for (_, owner), (viewed_at, count) in events.items():
+        for granularity in (ProfileViewRollup.HOUR, ProfileViewRollup.DAY):
+            hits[(owner, granularity, ProfileViewRollup.bucket_for(viewed_at, granularity))] += count
+
+    # Make sure every bucket exists, then increment in place so concurrent
+    # flushes from other workers never overwrite each other
+    ProfileViewRollup.objects.bulk_create(
+        [
+            ProfileViewRollup(profile_owner_id=owner, granularity=granularity, bucket_start=bucket_start)
+            for owner, granularity, bucket_start in hits
+        ],
+        ignore_conflicts=True,
+    )
+    for increment, keys in _group_by_increment(hits).items():
+        buckets = Q()
+        for owner, granularity, bucket_start in keys:
+            buckets |= Q(profile_owner_id=owner, granularity=granularity, bucket_start=bucket_start)
+        ProfileViewRollup.objects.filter(buckets).update(views=F('views') + increment)
+
+
+def flush_events(events):
+    """
+    Persist a batch of buffered views.
+    `events` maps (viewer_id, owner_id) -> [last_viewed_at, hits].
+    """
+    if not events:
+        return
+    viewer_ids = {viewer for viewer, _ in events}
+    owner_ids = {owner for _, owner in events}
+
+    with transaction.atomic():
+        # Serialize flushes touching the same owners (ordered, so no deadlocks);
+        # otherwise two workers flushing the same first-time pair would both
+        # miss it below and both count the viewer
+        list(User.objects.select_for_update().filter(id__in=owner_ids).order_by('id').values_list('id', flat=True))
+
+        # One query for every pair counted before (superset, narrowed in Python)
+        existing = set(
+            ProfileViewer.objects.filter(viewer_id__in=viewer_ids, profile_owner_id__in=owner_ids)
+            .values_list('viewer_id', 'profile_owner_id')
+        )
+        new_pairs = [pair for pair in events if pair not in existing]
+        ProfileViewer.objects.bulk_create(
+            [ProfileViewer(viewer_id=viewer, profile_owner_id=owner) for viewer, owner in new_pairs],
+            ignore_conflicts=True,
+        )
+
+        upsert_kwargs = {'update_conflicts': True, 'update_fields': ['viewed_at']}
+        if connection.features.supports_update_conflicts_with_target:
+            upsert_kwargs['unique_fields'] = ['profile_owner', 'viewer']
+        ProfileViewRecord.objects.bulk_create(
+            [
+                ProfileViewRecord(viewer_id=viewer, profile_owner_id=owner, viewed_at=viewed_at)
+                for (viewer, owner), (viewed_at, _) in events.items()
+            ],
+            **upsert_kwargs,
+        )
+
+        # Unique views only: bump each owner once per new viewer, grouped by increment
+        new_viewers = Counter(owner for _, owner in new_pairs)
+        for increment, owners in _group_by_increment(new_viewers).items():
+            User.objects.filter(id__in=owners).update(profile_views=F('profile_views') + increment)
+
+        update_rollups(events)
+
+    if new_viewers:
+        # profile_views changed with UPDATE ... F(), which sends no signals
+        invalidate_cached_users(new_viewers)
+        invalidate_public_profiles(new_viewers)
+
+
+class ProfileViewBuffer:
+    """Thread-safe buffer of pending profile views, deduplicated per (viewer, owner)."""
+
+    def __init__(self, max_events=500, flush_interval=5.0):
+        self.max_events = max_events
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def record(self, viewer_id, owner_id):
+        with self._lock:
+            entry = self._pending.get((viewer_id, owner_id))
+            if entry is None:
+                self._pending[(viewer_id, owner_id)] = [timezone.now(), 1]
+            else:
+                entry[0] = timezone.now()
+                entry[1] += 1
+            full = len(self._pending) >= self.max_events
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            events, self._pending = self._pending, {}
+        try:
+            flush_events(events)
+        except Exception:
+            logger.exception("Dropping %d buffered profile views after a failed flush", len(events))
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='profile-view-flusher', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            finally:
+                # DB connections are per thread; don't keep this one open between flushes
+                connections.close_all()
+
+
+buffer = ProfileViewBuffer(
+    max_events=getattr(settings, 'PROFILE_VIEW_BUFFER_SIZE', 500),
+    flush_interval=getattr(settings, 'PROFILE_VIEW_FLUSH_INTERVAL', 5.0),
+)
+atexit.register(buffer.flush)
+
+
+def record_profile_view(viewer_id, owner_id):
+    buffer.record(viewer_id, owner_id)
@@ -0,0 +1,129 @@
+# accounts/resp.py
+"""
+Minimal blocking client for the Redis serialization protocol (RESP2).
+
+Only the handful of commands the signup store and the chat pub/sub layer need
+are used, so this avoids pulling a full Redis client into requirements. Any
+server that speaks RESP (Redis, KeyDB, Valkey, a local stand-in) works.
+"""
+import socket
+import threading
+
+
+class RespError(Exception):
+    """Raised when the server replies with an error (``-ERR ...``)."""
+
+
+def encode_command(*args):
+    """Encode a command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        else:
+            data = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def read_reply(stream):
+    """Read a single RESP reply from a binary file-like ``stream``."""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    prefix, body = line[:1], line[1:-2]
+    if prefix == b"+":
+        return body.decode()
+    if prefix == b"-":
+        raise RespError(body.decode())
+    if prefix == b":":
+        return int(body)
+    if prefix == b"$":
+        length = int(body)
+        if length == -1:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if prefix == b"*":
+        length = int(body)
+        if length == -1:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise RespError(f"Unknown reply prefix: {prefix!r}")
+
+
+async def read_reply_async(reader):
+    """``read_reply`` for an ``asyncio.StreamReader`` (used by pub/sub subscribers)."""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    prefix, body = line[:1], line[1:-2]
+    if prefix == b"+":
+        return body.decode()
+    if prefix == b"-":
+        raise RespError(body.decode())
+    if prefix == b":":
+        return int(body)
+    if prefix == b"$":
+        length = int(body)
+        if length == -1:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if prefix == b"*":
+        length = int(body)
+        if length == -1:
+            return None
+        return [await read_reply_async(reader) for _ in range(length)]
+    raise RespError(f"Unknown reply prefix: {prefix!r}")
+
+
+class RespClient:
+    """
+    Thread-safe RESP client holding one persistent connection.
+    The connection is re-opened once if the server dropped it.
+    """
+
+    def __init__(self, host="127.0.0.1", port=6379, db=0, password=None, timeout=2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock = None
+        self._stream = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock = sock
+        self._stream = sock.makefile("rb")
+        if self.password:
+            self._send("AUTH", self.password)
+        if self.db:
+            self._send("SELECT", self.db)
+
+    def _send(self, *args):
+        self._sock.sendall(encode_command(*args))
+        return read_reply(self._stream)
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._stream.close()
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._stream = None
+
+    def execute(self, *args):
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send(*args)
+                except (ConnectionError, OSError):
+                    self.close()
+                    if attempt == 2:
+                        raise
@@ -0,0 +1,119 @@
+# accounts/resp_cache.py
+"""
+Django cache backend for any RESP-speaking server (Redis, Valkey, ...), built
+on the small client in accounts.resp so it needs no extra dependency:
+
+    CACHES = {
+        "shared": {
+            "BACKEND": "accounts.resp_cache.RespCache",
+            "LOCATION": "127.0.0.1:6379",
+            "OPTIONS": {"db": 1, "password": None},
+        },
+    }
+
+Integers are stored as plain numbers so incr()/decr() are atomic on the
+server; everything else is pickled. clear() flushes the whole database, so
+give the cache a db of its own.
+"""
+import pickle
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .resp import RespClient
+
+
+class RespCache(BaseCache):
+    def __init__(self, server, params):
+        super().__init__(params)
+        host, _, port = (server[0] if isinstance(server, (list, tuple)) else server).partition(':')
+        options = params.get('OPTIONS', {})
+        self.client = RespClient(
+            host=host or '127.0.0.1',
+            port=int(port or 6379),
+            db=options.get('db', 0),
+            password=options.get('password'),
+            timeout=options.get('timeout', 2.0),
+        )
+
+    def _encode(self, value):
+        if type(value) is int:
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _decode(self, value):
+        try:
+            return int(value)
+        except ValueError:
+            return pickle.loads(value)
+
+    def _expiry(self, timeout):
+        """SET arguments for `timeout`; None means the value must not be stored."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return []
+        milliseconds = int(timeout * 1000)
+        return ['PX', milliseconds] if milliseconds > 0 else None
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return False
+        return self.client.execute('SET', key, self._encode(value), 'NX', *expiry) is not None
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = self.client.execute('GET', key)
+        return default if value is None else self._decode(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            self.client.execute('DEL', key)
+            return
+        self.client.execute('SET', key, self._encode(value), *expiry)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return bool(self.client.execute('DEL', key))
+        if not expiry:
+            return bool(self.client.execute('PERSIST', key) or self.client.execute('EXISTS', key))
+        return bool(self.client.execute('PEXPIRE', key, expiry[1]))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self.client.execute('DEL', key))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self.client.execute('DEL', *keys)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = [self.make_and_validate_key(key, version=version) for key in keys]
+        values = self.client.execute('MGET', *made)
+        return {key: self._decode(value) for key, value in zip(keys, values) if value is not None}
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self.client.execute('EXISTS', key))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if not self.client.execute('EXISTS', key):
+            raise ValueError("Key '%s' not found." % key)
+        return self.client.execute('INCRBY', key, delta)
+
+    def clear(self):
+        self.client.execute('FLUSHDB')
+
+    def close(self, **kwargs):
+        # One persistent connection per process, reused across requests
+        pass
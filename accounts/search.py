@@ -0,0 +1,130 @@
+# accounts/search.py
+"""
+People/business directory search backed by the UserSearchToken side table.
+
+Each user's name, business_name, company_name, designation and category name
+are split into lowercase word tokens. A search term matches tokens by prefix,
+which is an index range scan on (token, user), and users are ranked by the
+summed weight of their matching tokens.
+"""
+import re
+
+from django.db.models import Q, Sum
+
+from .models import User, UserSearchToken
+
+MAX_TOKEN_LENGTH = 32
+MIN_TOKEN_LENGTH = 2
+
+FIELD_WEIGHTS = {
+    'name': 5,
+    'business_name': 5,
+    'company_name': 3,
+    'designation': 2,
+}
+CATEGORY_WEIGHT = 1
+
+_word_re = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [
+        word[:MAX_TOKEN_LENGTH]
+        for word in _word_re.findall(text.lower())
+        if len(word) >= MIN_TOKEN_LENGTH
+    ]
+
+
+def build_tokens(user, category_name=None):
+    """Return {token: weight} for a user. Pass `category_name` to skip the category lookup."""
+    weights = {}
+    sources = [(getattr(user, field), weight) for field, weight in FIELD_WEIGHTS.items()]
+    if category_name is None and user.category_id:
+        category_name = user.category.category_name
+    sources.append((category_name, CATEGORY_WEIGHT))
+
+    for text, weight in sources:
+        for token in set(tokenize(text)):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def index_user(user):
+    """Bring a user's tokens up to date, writing only the difference."""
+    wanted = build_tokens(user)
+    current = dict(UserSearchToken.objects.filter(user=user).values_list('token', 'weight'))
+    if wanted == current:
+        return
+
+    stale = [token for token, weight in current.items() if wanted.get(token) != weight]
+    if stale:
+        UserSearchToken.objects.filter(user=user, token__in=stale).delete()
+    UserSearchToken.objects.bulk_create([
+        UserSearchToken(user=user, token=token, weight=weight)
+        for token, weight in wanted.items()
+        if current.get(token) != weight
+    ])
+
+
+def index_users(queryset, batch_size=1000):
+    """Rebuild tokens for many users, one DELETE and one INSERT per batch."""
+    queryset = queryset.select_related('category').order_by('id')
+    last_id = 0
+    total = 0
+    while True:
+        users = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not users:
+            return total
+        ids = [user.id for user in users]
+        UserSearchToken.objects.filter(user_id__in=ids).delete()
+        UserSearchToken.objects.bulk_create(
+            [
+                UserSearchToken(user_id=user.id, token=token, weight=weight)
+                for user in users
+                for token, weight in build_tokens(
+                    user, category_name=user.category.category_name if user.category_id else ''
+                ).items()
+            ],
+            batch_size=batch_size,
+        )
+        total += len(users)
+        last_id = ids[-1]
+
+
+def prefix_range(term):
+    """
+    Tokens starting with `term`, as a plain range on the token index:
+    SQLite never uses an index for the LIKE 'term%' that __startswith emits.
+    """
+    return Q(token__gte=term, token__lt=term[:-1] + chr(ord(term[-1]) + 1))
+
+
+def search_users(query, role=None, category_id=None, completed=None):
+    """
+    Return a queryset of {'user_id', 'score'} rows ranked by relevance, ready
+    for KeysetPaginator(ordering=('-score', '-user_id')).
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return UserSearchToken.objects.none().values('user_id')
+
+    matches = Q()
+    for term in terms:
+        matches |= prefix_range(term)
+
+    tokens = UserSearchToken.objects.filter(matches, user__is_active=True)
+    if role:
+        tokens = tokens.filter(user__role=role)
+    if category_id:
+        tokens = tokens.filter(user__category_id=category_id)
+    if completed is not None:
+        tokens = tokens.filter(user__profile_completed=completed)
+    return tokens.values('user_id').annotate(score=Sum('weight'))
+
+
+def load_ranked_users(rows):
+    """Fetch the users for a page of search rows, keeping the ranked order."""
+    users = User.objects.select_related('category').in_bulk([row['user_id'] for row in rows])
+    return [users[row['user_id']] for row in rows if row['user_id'] in users]
@@ -1,6 +1,6 @@
 # serializers.py
 from rest_framework import serializers
-import phonenumbers
+from .phone import normalize_phone_number, PhoneNumberError, INVALID_NUMBER
 from .models import User
 from media_management.models import ImageUpload
 from media_management.serializers import ImageUploadSerializer
@@ -8,7 +8,15 @@ from category.models import Category
 from category.serializers import CategorySerializer
 from django.contrib.auth import get_user_model
 from social.serializers import SocialMediaLinkSerializer
-from django.db import models
+from services.serializers import ServiceSerializer
+from theme.models import Theme
+from theme.serializers import ThemeSerializer
+
+
+class PhoneNumberInputSerializer(serializers.Serializer):
+    """Raw number and country code posted to the signup endpoints, checked before normalizing."""
+    mobile_number = serializers.CharField(max_length=32)
+    country_code = serializers.CharField(max_length=8)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -18,18 +26,8 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'email', 'mobile_number', 'country_code', 'is_whatsapp', 'profileupdate_completed', 'profile_picture', 'role', 'about']
 
     def get_profileupdate_completed(self, obj):
-        # Required fields for all users
-        required_fields = ['name', 'mobile_number', 'address', 'role', 'profile_picture', 'category']
-
-        # Additional fields required if role is 'business'
-        if obj.role == 'business':
-            required_fields += ['business_name', 'logo']
-
-        for field in required_fields:
-            value = getattr(obj, field, None)
-            if not value:
-                return False
-        return True
+        # Stored on the row by User.save(), see User.compute_profile_completed
+        return obj.profile_completed
 
     def validate(self, attrs):
         role = attrs.get('role', None)
@@ -70,16 +68,14 @@ class UserSerializer(serializers.ModelSerializer):
         mobile_number = attrs.get('mobile_number')
         country_code = attrs.get('country_code')
         
-        # Check if phone is already in E164 format (starts with +)
+        # Check if phone is already in E164 format (starts with +).
+        # SignupRequest has usually normalized it already, so this is a cache hit.
         if mobile_number and mobile_number.startswith('+'):
             try:
-                parsed = phonenumbers.parse(mobile_number, None)
-                if phonenumbers.is_valid_number(parsed):
-                    # Phone is already formatted, just ensure country_code matches
-                    attrs['mobile_number'] = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-                    attrs['country_code'] = f"+{parsed.country_code}"
-                    return attrs
-            except phonenumbers.NumberParseException:
+                # Phone is already formatted, just ensure country_code matches
+                attrs['mobile_number'], attrs['country_code'] = normalize_phone_number(mobile_number)
+                return attrs
+            except PhoneNumberError:
                 pass
         
         # Original validation logic for non-formatted numbers
@@ -87,18 +83,15 @@ class UserSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Mobile number and country code are required.")
         
         # Combine the country code and phone
-        full_phone = f"{country_code}{mobile_number}"
         try:
-            parsed = phonenumbers.parse(full_phone, None)
-        except phonenumbers.NumberParseException as e:
-            raise serializers.ValidationError(f"Mobile number could not be parsed: {e}")
-        
-        if not phonenumbers.is_valid_number(parsed):
-            raise serializers.ValidationError("Mobile number is invalid.")
+            normalized = normalize_phone_number(f"{country_code}{mobile_number}")
+        except PhoneNumberError as e:
+            if e.reason == INVALID_NUMBER:
+                raise serializers.ValidationError("Mobile number is invalid.")
+            raise serializers.ValidationError(f"Mobile number could not be parsed: {e.message}")
         
         # Replace the plain phone with the formatted international version
-        attrs['mobile_number'] = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-        attrs['country_code'] = f"+{parsed.country_code}"
+        attrs['mobile_number'], attrs['country_code'] = normalized
         
         return attrs
 
@@ -131,20 +124,7 @@ class UserProfileUpdateSerializer(serializers.ModelSerializer):
         }
 
     def get_profileupdate_completed(self, obj):
-        required_fields = ['name', 'mobile_number', 'address', 'role', 'profile_picture', 'category']
-
-        if obj.role == 'business':
-            required_fields += ['business_name', 'logo']
-
-        for field_name in required_fields:
-            value = getattr(obj, field_name, None)
-
-            if hasattr(User, field_name) and isinstance(getattr(User, field_name).field, models.ImageField):
-                if not value or not bool(value.name):
-                    return False
-            elif not value:
-                return False
-        return True
+        return obj.profile_completed
 
     def validate(self, attrs):
         instance = self.instance
@@ -357,6 +337,38 @@ class UserListSerializer(serializers.ModelSerializer):
         # For example, if you have a 'role' field directly on your User model:
         # fields = ['id', 'username', 'email', 'first_name', 'last_name', 'date_joined', 'role']
 
+class ProfileBundleSerializer(UserProfileUpdateSerializer):
+    """
+    Everything the business card screen needs in one payload.
+    Expects the user to be loaded with ProfileBundleView's select_related /
+    prefetch_related, otherwise each nested list costs extra queries.
+    """
+    services = ServiceSerializer(many=True, read_only=True)
+    theme = serializers.SerializerMethodField()
+    images = ImageUploadSerializer(source='uploaded_images', many=True, read_only=True)
+
+    class Meta(UserProfileUpdateSerializer.Meta):
+        fields = ['id'] + UserProfileUpdateSerializer.Meta.fields + ['services', 'theme', 'images']
+
+    def get_theme(self, obj):
+        try:
+            theme = obj.theme
+        except Theme.DoesNotExist:
+            return None
+        return ThemeSerializer(theme, context=self.context).data
+
+
+class UserDirectorySerializer(serializers.ModelSerializer):
+    """Compact card shown in directory search results."""
+    category_name = serializers.CharField(source='category.category_name', read_only=True, default=None)
+
+    class Meta:
+        model = User
+        fields = [
+            'id', 'name', 'role', 'profile_picture', 'designation',
+            'business_name', 'company_name', 'logo', 'category_id', 'category_name',
+        ]
+
 # Keep your existing UserProfileUpdateSerializer as is for profile updates.
 # from .models import UserProfile # Assuming UserProfile is where extra user data is
 # class UserProfileUpdateSerializer(serializers.ModelSerializer):
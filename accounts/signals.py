@@ -0,0 +1,64 @@
+# accounts/signals.py
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from category.models import Category
+from social.models import SocialMediaLink
+from .authentication import invalidate_cached_user, invalidate_cached_users
+from .models import User
+from .profile_cache import invalidate_public_profile, invalidate_all_public_profiles
+from .search import index_user, index_users
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_auth_user(sender, instance, **kwargs):
+    # Covers profile edits as well as deactivation (is_active=False)
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def reindex_user(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_user(instance)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_users(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        index_users(User.objects.filter(category=instance))
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_users(sender, instance, **kwargs):
+    # SET_NULL is applied with a bulk UPDATE, so collect the users beforehand
+    instance._search_user_ids = list(instance.users.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def reindex_former_category_users(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_search_user_ids', None)
+    if user_ids:
+        # category is required for a complete profile (User.compute_profile_completed)
+        User.objects.filter(id__in=user_ids).update(profile_completed=False)
+        invalidate_cached_users(user_ids)
+        index_users(User.objects.filter(id__in=user_ids))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_public_profile(sender, instance, **kwargs):
+    invalidate_public_profile(instance.pk)
+
+
+@receiver(post_save, sender=SocialMediaLink)
+@receiver(post_delete, sender=SocialMediaLink)
+def drop_cached_public_profile_for_link(sender, instance, **kwargs):
+    invalidate_public_profile(instance.user_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def drop_cached_public_profiles_for_category(sender, instance, **kwargs):
+    # Categories change rarely; start a new generation instead of finding their users
+    invalidate_all_public_profiles()
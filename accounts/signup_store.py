@@ -0,0 +1,176 @@
+# accounts/signup_store.py
+"""
+Pluggable store for pending signups (OTP + validated signup data).
+
+SignupRequest writes a session here and FinalizeSignup reads it back, usually
+from a different worker process, so the configured backend must be shared
+between processes. Pick one with ``SIGNUP_SESSION_STORE`` in settings:
+
+    SIGNUP_SESSION_STORE = {
+        "BACKEND": "accounts.signup_store.SQLiteSignupStore",
+        "OPTIONS": {"path": BASE_DIR / "signup_sessions.sqlite3", "max_entries": 10000},
+    }
+"""
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .resp import RespClient
+
+DEFAULT_TTL = 300  # 5 minutes, same as the OTP lifetime
+
+
+class BaseSignupStore:
+    """Interface every signup store backend implements."""
+
+    key_prefix = "signup_otp:"
+
+    def make_key(self, mobile_number):
+        return f"{self.key_prefix}{mobile_number}"
+
+    def set(self, mobile_number, session, ttl=DEFAULT_TTL):
+        raise NotImplementedError
+
+    def get(self, mobile_number):
+        raise NotImplementedError
+
+    def delete(self, mobile_number):
+        raise NotImplementedError
+
+
+class LocMemSignupStore(BaseSignupStore):
+    """
+    In-process store with TTL and an LRU cap.
+    Not shared across workers - use it for local development only.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set(self, mobile_number, session, ttl=DEFAULT_TTL):
+        key = self.make_key(mobile_number)
+        with self._lock:
+            self._data[key] = (time.time() + ttl, pickle.dumps(session))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get(self, mobile_number):
+        key = self.make_key(mobile_number)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+        return pickle.loads(payload)
+
+    def delete(self, mobile_number):
+        with self._lock:
+            self._data.pop(self.make_key(mobile_number), None)
+
+
+class SQLiteSignupStore(BaseSignupStore):
+    """
+    File-backed store shared by every worker on the same host.
+    Expired rows are swept on write and the table is capped at ``max_entries``
+    (oldest expiry evicted first), so disk and page-cache use stay bounded.
+    """
+
+    def __init__(self, path=None, max_entries=10000, timeout=5.0):
+        self.path = str(path or settings.BASE_DIR / "signup_sessions.sqlite3")
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS signup_session ("
+                "key TEXT PRIMARY KEY, payload BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS signup_session_expires_at "
+                "ON signup_session (expires_at)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def set(self, mobile_number, session, ttl=DEFAULT_TTL):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM signup_session WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO signup_session (key, payload, expires_at) VALUES (?, ?, ?)",
+                (self.make_key(mobile_number), pickle.dumps(session), now + ttl),
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM signup_session").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM signup_session WHERE key IN ("
+                    "SELECT key FROM signup_session ORDER BY expires_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def get(self, mobile_number):
+        row = self._connection().execute(
+            "SELECT payload FROM signup_session WHERE key = ? AND expires_at > ?",
+            (self.make_key(mobile_number), time.time()),
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def delete(self, mobile_number):
+        self._connection().execute(
+            "DELETE FROM signup_session WHERE key = ?", (self.make_key(mobile_number),)
+        )
+
+
+class RedisSignupStore(BaseSignupStore):
+    """
+    Store for any RESP-speaking server (Redis, Valkey, a local stand-in).
+    Keys carry a server-side TTL; cap memory with the server's ``maxmemory``
+    and a ``volatile-ttl`` eviction policy.
+    """
+
+    def __init__(self, host="127.0.0.1", port=6379, db=0, password=None, timeout=2.0):
+        self.client = RespClient(host=host, port=port, db=db, password=password, timeout=timeout)
+
+    def set(self, mobile_number, session, ttl=DEFAULT_TTL):
+        self.client.execute("SET", self.make_key(mobile_number), pickle.dumps(session), "EX", int(ttl))
+
+    def get(self, mobile_number):
+        payload = self.client.execute("GET", self.make_key(mobile_number))
+        return pickle.loads(payload) if payload is not None else None
+
+    def delete(self, mobile_number):
+        self.client.execute("DEL", self.make_key(mobile_number))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_signup_store():
+    """Return the process-wide store configured by ``SIGNUP_SESSION_STORE``."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = getattr(settings, "SIGNUP_SESSION_STORE", {})
+                backend = import_string(config.get("BACKEND", "accounts.signup_store.SQLiteSignupStore"))
+                _store = backend(**config.get("OPTIONS", {}))
+    return _store
@@ -1,3 +1,678 @@
-from django.test import TestCase
+import multiprocessing
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import traceback
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from django.utils import timezone
+
+from category.models import Category
+from media_management.models import ImageUpload
+from services.models import Service
+from social.models import SocialMediaLink, SocialMediaPlatform
+from theme.models import Theme
+from ubc.query_budget import assert_query_budget
+
+from . import signup_store
+from .checks import check_shared_caches
+from .importers import import_users
+from .models import OTPChallenge, ProfileViewRecord, User, UserSearchToken
+from .profile_views import flush_events
+from .utils import get_tokens_for_user
+from .resp import read_reply
+
+
+class FakeRespServer(socketserver.ThreadingTCPServer):
+    """
+    Just enough of a RESP server for RedisSignupStore, RespCache and
+    RespBroker: SET .. EX, GET, MGET, EXISTS, INCRBY, DEL and PUBLISH /
+    (UN)SUBSCRIBE.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        self.data = {}
+        self.channels = {}
+        self.handlers = set()
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), FakeRespHandler)
+
+    def drop_connections(self):
+        """Close every client connection, as a server restart would."""
+        with self.lock:
+            for handler in list(self.handlers):
+                try:
+                    handler.request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.handlers.clear()
+            self.channels.clear()
+
+
+class FakeRespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        with self.server.lock:
+            self.server.handlers.add(self)
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            name, args = command[0].upper(), command[1:]
+            # Replies and published messages share the socket
+            with self.server.lock:
+                try:
+                    self.wfile.write(self.run(name, args))
+                except OSError:
+                    return
+
+    def finish(self):
+        with self.server.lock:
+            self.server.handlers.discard(self)
+            for subscribers in self.server.channels.values():
+                subscribers.discard(self)
+        super().finish()
+
+    def lookup(self, key):
+        value, expires_at = self.server.data.get(key, (None, None))
+        if expires_at and expires_at <= time.time():
+            return None
+        return value
+
+    def run(self, name, args):
+        data = self.server.data
+        if name in (b'SUBSCRIBE', b'UNSUBSCRIBE'):
+            replies = []
+            for channel in args:
+                subscribers = self.server.channels.setdefault(channel, set())
+                if name == b'SUBSCRIBE':
+                    subscribers.add(self)
+                else:
+                    subscribers.discard(self)
+                kind = name.lower()
+                replies.append(b'*3\r\n$%d\r\n%s\r\n$%d\r\n%s\r\n:1\r\n' % (len(kind), kind, len(channel), channel))
+            return b''.join(replies)
+        if name == b'PUBLISH':
+            channel, payload = args
+            subscribers = self.server.channels.get(channel, set())
+            push = b'*3\r\n$7\r\nmessage\r\n$%d\r\n%s\r\n$%d\r\n%s\r\n' % (len(channel), channel, len(payload), payload)
+            for handler in subscribers:
+                if handler is not self:
+                    handler.wfile.write(push)
+            return b':%d\r\n' % len(subscribers)
+        if name == b'SET':
+            options = [arg.upper() for arg in args[2:]]
+            expires_at = None
+            if b'EX' in options:
+                expires_at = time.time() + int(args[2 + options.index(b'EX') + 1])
+            if b'PX' in options:
+                expires_at = time.time() + int(args[2 + options.index(b'PX') + 1]) / 1000
+            if b'NX' in options and self.lookup(args[0]) is not None:
+                return b'$-1\r\n'
+            data[args[0]] = (args[1], expires_at)
+            return b'+OK\r\n'
+        if name == b'GET':
+            value = self.lookup(args[0])
+            return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+        if name == b'MGET':
+            values = [self.lookup(key) for key in args]
+            return b'*%d\r\n' % len(values) + b''.join(
+                b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+                for value in values
+            )
+        if name == b'EXISTS':
+            return b':%d\r\n' % sum(self.lookup(key) is not None for key in args)
+        if name == b'INCRBY':
+            value = int(self.lookup(args[0]) or 0) + int(args[1])
+            data[args[0]] = (str(value).encode(), data.get(args[0], (None, None))[1])
+            return b':%d\r\n' % value
+        if name == b'DEL':
+            return b':%d\r\n' % sum(data.pop(key, None) is not None for key in args)
+        return b'-ERR unknown command\r\n'
+
+
+def start_fake_resp_server(testcase):
+    server = FakeRespServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    testcase.addCleanup(server.server_close)
+    testcase.addCleanup(server.shutdown)
+    return server
+
+
+def start_resp_server(testcase):
+    return start_fake_resp_server(testcase).server_address[1]
+
+
+def _run_child(target, args, conn):
+    try:
+        # A fresh worker: no store instance inherited from the parent
+        signup_store._store = None
+        conn.send((True, target(*args)))
+    except Exception:
+        conn.send((False, traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+def run_in_worker(target, *args):
+    """Call `target(*args)` in a separate (forked) process, like another worker."""
+    context = multiprocessing.get_context('fork')
+    parent_conn, child_conn = context.Pipe()
+    # Children must open their own database connections
+    connections.close_all()
+    process = context.Process(target=_run_child, args=(target, args, child_conn))
+    process.start()
+    if not parent_conn.poll(30):
+        process.kill()
+        raise AssertionError(f"worker did not answer {target.__name__}")
+    ok, result = parent_conn.recv()
+    process.join()
+    if not ok:
+        raise AssertionError(result)
+    return result
+
+
+def _post(path, payload):
+    response = Client().post(path, payload, content_type='application/json')
+    return response.status_code, response.json()
+
+
+def post_in_worker(path, payload):
+    """POST from a separate worker process."""
+    return run_in_worker(_post, path, payload)
+
+
+class SignupAcrossWorkersMixin:
+    """SignupRequest and FinalizeSignup handled by different processes."""
+
+    def store_config(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        signup_store._store = None
+        settings_override = self.settings(SIGNUP_SESSION_STORE=self.store_config())
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(setattr, signup_store, '_store', None)
+
+    def test_every_finalize_hits(self):
+        for i in range(3):
+            mobile = f'98765000{i:02d}'
+            status_code, body = post_in_worker('/api/signup/', {
+                'mobile_number': mobile, 'country_code': '+91', 'name': f'User {i}',
+            })
+            self.assertEqual(status_code, 200, body)
+            otp = body['data']['otp']
+
+            status_code, body = post_in_worker('/api/finalize-signup/', {
+                'mobile_number': mobile, 'country_code': '+91', 'otp': otp,
+            })
+            self.assertEqual(status_code, 200, body)
+            self.assertEqual(body['message'], 'User registered successfully')
+            self.assertEqual(body['data']['user']['mobile_number'], mobile)
+            self.assertEqual(body['data']['user']['country_code'], '+91')
+
+    def test_wrong_otp_is_rejected_by_another_worker(self):
+        status_code, body = post_in_worker('/api/signup/', {
+            'mobile_number': '9876500099', 'country_code': '+91', 'name': 'Someone',
+        })
+        self.assertEqual(status_code, 200, body)
+        wrong = '0000' if body['data']['otp'] != '0000' else '1111'
+
+        status_code, body = post_in_worker('/api/finalize-signup/', {
+            'mobile_number': '9876500099', 'country_code': '+91', 'otp': wrong,
+        })
+        self.assertEqual(status_code, 400)
+        self.assertEqual(body['message'], 'Invalid OTP')
+
+
+class SQLiteSignupStoreWorkerTests(SignupAcrossWorkersMixin, TransactionTestCase):
+    def store_config(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        return {
+            'BACKEND': 'accounts.signup_store.SQLiteSignupStore',
+            'OPTIONS': {'path': f'{directory}/signup_sessions.sqlite3'},
+        }
+
+
+class RedisSignupStoreWorkerTests(SignupAcrossWorkersMixin, TransactionTestCase):
+    def store_config(self):
+        return {
+            'BACKEND': 'accounts.signup_store.RedisSignupStore',
+            'OPTIONS': {'host': '127.0.0.1', 'port': start_resp_server(self)},
+        }
+
+
+class SignupInputTests(TestCase):
+    def test_malformed_mobile_numbers_are_rejected(self):
+        for path in ('/api/signup/', '/api/finalize-signup/'):
+            for mobile in (['9876500010'], {'n': 1}, None, True):
+                response = self.client.post(path, {
+                    'mobile_number': mobile, 'country_code': '+91', 'otp': '1234', 'name': 'Someone',
+                }, content_type='application/json')
+                self.assertEqual(response.status_code, 400, (path, mobile))
+                self.assertIn('mobile_number', response.json()['data'])
+
+    def test_numeric_mobile_number_is_accepted(self):
+        response = self.client.post('/api/signup/', {
+            'mobile_number': 9876500010, 'country_code': '+91', 'name': 'Someone',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        response = self.client.post('/api/finalize-signup/', {
+            'mobile_number': 9876500010, 'country_code': '+91', 'otp': response.json()['data']['otp'],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(User.objects.filter(mobile_number='+919876500010').exists())
+
+
+class OTPChallengeTests(TestCase):
+    def test_new_challenge_supersedes_earlier_ones(self):
+        for otp in ('1111', '2222', '3333'):
+            OTPChallenge.issue('+919876500001', otp)
+
+        self.assertFalse(OTPChallenge.consume('+919876500001', '1111'))
+        self.assertFalse(OTPChallenge.consume('+919876500001', '2222'))
+        self.assertTrue(OTPChallenge.consume('+919876500001', '3333'))
+        # Single use
+        self.assertFalse(OTPChallenge.consume('+919876500001', '3333'))
+
+    def test_other_numbers_are_not_affected(self):
+        OTPChallenge.issue('+919876500001', '1111')
+        OTPChallenge.issue('+919876500002', '2222')
+
+        self.assertTrue(OTPChallenge.consume('+919876500001', '1111'))
+        self.assertTrue(OTPChallenge.consume('+919876500002', '2222'))
+
+
+def _resave_user(pk):
+    User.objects.get(pk=pk).save()
+
+
+class SharedCacheInvalidationTests(TransactionTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        caches_override = self.settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': directory,
+            },
+        })
+        caches_override.enable()
+        self.addCleanup(caches_override.disable)
+
+    def test_deactivation_in_another_worker_stops_cached_auth(self):
+        user = User.objects.create(mobile_number='+919876500010', name='Cached')
+        headers = {'HTTP_AUTHORIZATION': f"Bearer {get_tokens_for_user(user)['access']}"}
+        self.assertEqual(self.client.get('/api/profile/', **headers).status_code, 200)
+
+        # Bypasses signals: this worker keeps authenticating from its cache...
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/profile/', **headers).status_code, 200)
+
+        # ...until a save in another worker drops the shared entry
+        run_in_worker(_resave_user, user.pk)
+        self.assertEqual(self.client.get('/api/profile/', **headers).status_code, 401)
+
+    def test_process_local_cache_is_flagged(self):
+        self.assertEqual(check_shared_caches(None), [])
+        with self.settings(AUTH_USER_CACHE_ALIAS='default'):
+            self.assertEqual([w.id for w in check_shared_caches(None)], ['accounts.W001'])
+
+
+class RespCacheTests(TestCase):
+    def setUp(self):
+        port = start_resp_server(self)
+        caches_override = self.settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'resp': {'BACKEND': 'accounts.resp_cache.RespCache', 'LOCATION': f'127.0.0.1:{port}'},
+        })
+        caches_override.enable()
+        self.addCleanup(caches_override.disable)
+        self.cache = caches['resp']
+
+    def test_values_round_trip(self):
+        self.cache.set('profile', {'name': 'A', 'links': [1, 2]}, timeout=60)
+        self.assertEqual(self.cache.get('profile'), {'name': 'A', 'links': [1, 2]})
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.get_many(['profile', 'missing']), {'profile': {'name': 'A', 'links': [1, 2]}})
+
+        self.cache.delete_many(['profile'])
+        self.assertIsNone(self.cache.get('profile'))
+
+    def test_add_only_sets_missing_keys(self):
+        self.assertTrue(self.cache.add('counts', {'messages': 1}))
+        self.assertFalse(self.cache.add('counts', {'messages': 2}))
+        self.assertEqual(self.cache.get('counts'), {'messages': 1})
+
+    def test_incr_is_server_side(self):
+        self.cache.set('generation', 5, timeout=None)
+        self.assertEqual(self.cache.incr('generation'), 6)
+        self.assertEqual(self.cache.get('generation'), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_zero_timeout_does_not_store(self):
+        self.cache.set('key', 'value', timeout=0)
+        self.assertIsNone(self.cache.get('key'))
+
+
+class ProfileViewFlushTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(mobile_number='+919876500020', name='Owner')
+        self.viewers = [
+            User.objects.create(mobile_number=f'+9198765000{30 + i}', name=f'Viewer {i}') for i in range(2)
+        ]
+
+    def flush(self, *viewers, hits=1):
+        now = timezone.now()
+        flush_events({(viewer.pk, self.owner.pk): [now, hits] for viewer in viewers})
+
+    def test_counts_each_viewer_once(self):
+        self.flush(self.viewers[0], hits=3)
+        self.flush(self.viewers[0], self.viewers[1])
+        self.flush(self.viewers[1])
+
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.profile_views, 2)
+        self.assertEqual(ProfileViewRecord.objects.filter(profile_owner=self.owner).count(), 2)
+
+    def test_viewer_returning_after_compaction_is_not_counted_again(self):
+        self.flush(self.viewers[0])
+        ProfileViewRecord.objects.update(viewed_at=timezone.now() - timedelta(days=120))
+
+        call_command('compact_profile_views', retention_days=90, stdout=StringIO())
+        self.assertFalse(ProfileViewRecord.objects.exists())
+
+        self.flush(self.viewers[0], self.viewers[1])
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.profile_views, 2)
+        self.assertEqual(ProfileViewRecord.objects.filter(profile_owner=self.owner).count(), 2)
+
+
+class DirectorySearchTests(TestCase):
+    def setUp(self):
+        self.plumbers = Category.objects.create(category_name='Plumbers', type='professional', icon='category_icons/p.png')
+        self.ann = User.objects.create(mobile_number='+919876500060', name='Ann Plumb', role='business', business_name='Plumb Works')
+        self.bob = User.objects.create(mobile_number='+919876500061', name='Bob Plumber', category=self.plumbers)
+        self.client = APIClient()
+        self.client.force_authenticate(self.ann)
+
+    def search(self, **params):
+        return self.client.get('/api/directory/search/', params)
+
+    def test_ranked_and_filtered(self):
+        response = self.search(q='plumb')
+        self.assertEqual(response.status_code, 200)
+        # Name and business name outweigh name and category name
+        self.assertEqual([row['id'] for row in response.json()['data']], [self.ann.pk, self.bob.pk])
+
+        response = self.search(q='plumb', category=self.plumbers.pk)
+        self.assertEqual([row['id'] for row in response.json()['data']], [self.bob.pk])
+
+    def test_non_integer_category_is_a_bad_request(self):
+        for category in ('²', 'x', '-1', '0', '1.5', str(2 ** 64)):
+            response = self.search(q='plumb', category=category)
+            self.assertEqual(response.status_code, 400, category)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'accounts-tests'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'accounts-tests-shared'},
+})
+class PublicProfileETagTests(TestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create(mobile_number='+919876500070', name='Card')
+        self.path = f'/api/profile-public/{self.user.pk}/'
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(self.path, headers={'If-None-Match': f'"other", {etag}'})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.path, headers={'If-None-Match': '"other"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_when_the_profile_does(self):
+        etag = self.client.get(self.path)['ETag']
+
+        self.user.name = 'Card, updated'
+        self.user.save()
+
+        response = self.client.get(self.path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['data']['name'], 'Card, updated')
+
+    def test_social_link_change_invalidates(self):
+        etag = self.client.get(self.path)['ETag']
+        platform = SocialMediaPlatform.objects.create(name='Website', data_type='url')
+        SocialMediaLink.objects.create(user=self.user, platform=platform, platform_url='https://example.com')
+
+        response = self.client.get(self.path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ProfileBatchTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create(mobile_number=f'+9198765001{i:02d}', name=f'Batch {i}') for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def batch(self, ids):
+        return self.client.get('/api/profiles/', {'ids': ids})
+
+    def test_requested_order_and_missing_ids(self):
+        first, second, third = (user.pk for user in self.users)
+        missing = third + 1000
+        response = self.batch(f'{third},{missing},{first},{third}')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([profile['id'] for profile in data['profiles']], [third, first])
+        self.assertEqual(data['missing_ids'], [missing])
+
+    def test_invalid_ids_are_a_bad_request(self):
+        for ids in ('', ',', '²', '1,x', '1,-2', '0', str(2 ** 64)):
+            self.assertEqual(self.batch(ids).status_code, 400, ids)
+
+    @override_settings(PROFILE_BATCH_MAX_IDS=3)
+    def test_id_cap_counts_distinct_ids(self):
+        pk = self.users[0].pk
+        self.assertEqual(self.batch(f'{pk},{pk + 1},{pk + 2},{pk}').status_code, 200)
+        self.assertEqual(self.batch(f'{pk},{pk + 1},{pk + 2},{pk + 3}').status_code, 400)
+
+    def test_query_count_does_not_grow_with_ids(self):
+        platform = SocialMediaPlatform.objects.create(name='Website', data_type='url')
+        for user in self.users:
+            SocialMediaLink.objects.create(user=user, platform=platform, platform_url='https://example.com')
+        ids = ','.join(str(user.pk) for user in self.users)
+
+        # users (with category) + social links (with platform)
+        with self.assertNumQueries(2):
+            response = self.batch(ids)
+        self.assertEqual(len(response.json()['data']['profiles']), 3)
+
+
+IMPORT_HEADER = 'name,email,mobile_number,country_code,role\n'
+
+
+class UserImportTests(TestCase):
+    def run_import(self, rows, **kwargs):
+        return import_users(StringIO(IMPORT_HEADER + ''.join(rows)), default_country_code='+91', **kwargs)
+
+    def test_valid_rows_are_created_and_indexed(self):
+        result = self.run_import([
+            'Ann,ann@example.com,9876500200,,\n',
+            'Bob,bob@example.com,+919876500201,,business\n',
+        ])
+        self.assertEqual((result.created, result.errors), (2, []))
+        bob = User.objects.get(mobile_number='+919876500201')
+        self.assertEqual((bob.role, bob.country_code), ('business', '+91'))
+        self.assertFalse(bob.has_usable_password())
+        self.assertTrue(UserSearchToken.objects.filter(user=bob, token='bob').exists())
+
+    def test_invalid_and_duplicate_rows_are_reported_by_line(self):
+        User.objects.create(mobile_number='+919876500210', email='phone-taken@example.com', name='Existing')
+        User.objects.create(mobile_number='+919876500209', email='Taken@Example.com', name='Existing')
+        result = self.run_import([
+            ',noname@example.com,9876500211,,\n',         # 2: no name
+            'Bad Email,not-an-email,9876500212,,\n',      # 3
+            'Bad Phone,phone@example.com,12,,\n',          # 4
+            'Bad Role,role@example.com,9876500213,,admin\n',  # 5
+            'Ann,ann@example.com,9876500214,,\n',          # 6: ok
+            'Ann Again,ANN@example.com,9876500215,,\n',    # 7: same email, other case
+            'Ann Phone,ann2@example.com,9876500214,,\n',   # 8: same mobile
+            'Taken,taken@example.com,9876500216,,\n',      # 9: registered email, other case
+            'Taken Phone,x@example.com,9876500210,,\n',    # 10: registered mobile
+        ])
+        self.assertEqual(result.created, 1)
+        self.assertEqual([line for line, _ in result.errors], [2, 3, 4, 5, 7, 8, 9, 10])
+        self.assertIn('already registered', dict(result.errors)[9])
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_dry_run_creates_nothing(self):
+        result = self.run_import(['Ann,ann@example.com,9876500220,,\n', ',x@example.com,9876500221,,\n'], dry_run=True)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(len(result.errors), 1)
+        self.assertFalse(User.objects.exists())
+
+    def test_missing_columns(self):
+        result = import_users(StringIO('name,email\nAnn,ann@example.com\n'))
+        self.assertEqual(result.created, 0)
+        self.assertEqual(result.errors, [(1, 'missing required column(s): mobile_number')])
+
+    def test_registration_racing_the_insert_only_rejects_that_row(self):
+        real_make_password = make_password
+
+        def register_then_hash(password):
+            # Someone signs up with row 3's number after the duplicate check ran
+            User.objects.create(mobile_number='+919876500231', name='Racer')
+            return real_make_password(password)
+
+        with mock.patch('accounts.importers.make_password', side_effect=register_then_hash):
+            result = self.run_import([
+                'Ann,ann@example.com,9876500230,,\n',
+                'Bob,bob@example.com,9876500231,,\n',
+                'Cid,cid@example.com,9876500232,,\n',
+            ])
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, _ in result.errors], [3])
+        self.assertEqual(User.objects.get(mobile_number='+919876500231').name, 'Racer')
+        self.assertEqual(
+            set(User.objects.filter(email__isnull=False).values_list('name', flat=True)), {'Ann', 'Cid'},
+        )
+        self.assertTrue(UserSearchToken.objects.filter(user__name='Cid').exists())
+
+
+class ImportUsersCommandTests(TestCase):
+    def write_csv(self, text):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        path = f'{directory}/users.csv'
+        with open(path, 'w', encoding='utf-8-sig') as f:
+            f.write(text)
+        return path
+
+    def call(self, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_users', *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_and_dry_run(self):
+        path = self.write_csv(IMPORT_HEADER + 'Ann,ann@example.com,9876500240,,\nBad,bad,9876500241,,\n')
+
+        stdout, stderr = self.call(path, '--country-code', '+91', '--dry-run')
+        self.assertIn('Would create 1 users, 1 rows rejected.', stdout)
+        self.assertIn("line 3: invalid email 'bad'", stderr)
+        self.assertFalse(User.objects.exists())
+
+        stdout, _ = self.call(path, '--country-code', '+91', '--chunk-size', '1')
+        self.assertIn('Created 1 users, 1 rows rejected.', stdout)
+        self.assertTrue(User.objects.filter(mobile_number='+919876500240').exists())
+
+    def test_missing_file(self):
+        with self.assertRaises(CommandError):
+            self.call('/nonexistent/users.csv')
+
+
+class ProfileCompletedTests(TestCase):
+    def test_deleting_the_category_clears_profile_completed(self):
+        category = Category.objects.create(category_name='Plumbers', type='professional', icon='category_icons/p.png')
+        user = User.objects.create(
+            mobile_number='+919876500040', name='Complete', address='x', role='individual',
+            profile_picture='profiles/a.png', category=category,
+        )
+        self.assertTrue(user.profile_completed)
+
+        category.delete()
+
+        user.refresh_from_db()
+        self.assertIsNone(user.category_id)
+        self.assertFalse(user.profile_completed)
+        self.assertEqual(user.profile_completed, user.compute_profile_completed())
+
+
+class ProfileBundleQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(mobile_number='+919876500050', name='Bundle')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_related(self, n):
+        platform, _ = SocialMediaPlatform.objects.get_or_create(name='Website', data_type='url')
+        SocialMediaLink.objects.bulk_create(
+            SocialMediaLink(user=self.user, platform=platform, platform_url=f'https://example.com/{i}') for i in range(n)
+        )
+        Service.objects.bulk_create(
+            Service(user=self.user, name=f'Service {i}', picture='service_pictures/s.png', description='x')
+            for i in range(n)
+        )
+        ImageUpload.objects.bulk_create(
+            ImageUpload(user=self.user, image='uploads/i.png', original_filename='i.png', file_size=1)
+            for i in range(n)
+        )
+
+    def get_bundle(self):
+        with assert_query_budget(4, n_plus_one_threshold=2):
+            response = self.client.get(f'/api/profile/{self.user.pk}/bundle/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_budget_without_related_rows(self):
+        self.get_bundle()
+
+    def test_budget_does_not_grow_with_related_rows(self):
+        Theme.objects.create(user=self.user)
+        self.add_related(10)
+        data = self.get_bundle()
+        self.assertEqual(len(data['social_links']), 10)
+        self.assertEqual(len(data['services']), 10)
+        self.assertEqual(len(data['images']), 10)
@@ -7,7 +7,12 @@ urlpatterns = [
     path('signup/', views.SignupRequest.as_view()),
     path('finalize-signup/', views.FinalizeSignup.as_view()), 
     path('profile/', views.ProfileView.as_view()),
+    path('profile/async/', views.AsyncProfileView.as_view(), name='profile-async'),
     path('profile/<int:pk>/', views.ProfileDetailView.as_view(), name='profile-detail'),
+    path('profile/<int:pk>/bundle/', views.ProfileBundleView.as_view(), name='profile-bundle'),
+    path('profile/analytics/', views.ProfileViewAnalyticsView.as_view(), name='profile-analytics'),
+    path('profiles/', views.ProfileBatchView.as_view(), name='profile-batch'),
     path('users/', views.UserListView.as_view(), name='user-list'),
+    path('directory/search/', views.DirectorySearchView.as_view(), name='directory-search'),
     path('profile-public/<int:pk>/', views.ProfilePublicDetailView.as_view(), name='profile-public-detail'),
 ]
@@ -1,9 +1,9 @@
 import random
-import phonenumbers
 from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.response import Response
 from rest_framework import status
+from .phone import normalize_phone_number, PhoneNumberError, INVALID_NUMBER
 
 def _extract_single_error_message(errors_data):
     """
@@ -55,18 +55,33 @@ def generate_otp():
     return str(random.randint(1000, 9999))
 
 
+# Largest value a BigAutoField primary key can hold
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_id(value):
+    """
+    `value` as a positive database id, or None if it is not one.
+    Parsed with int(): str.isdigit() also accepts characters such as '²'.
+    """
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if 0 < value <= MAX_ID else None
+
+
 def validate_phone_number(phone):
     if not phone.startswith('+'):
         raise ValidationError("Phone number must start with '+' and country code, e.g. +919876543210")
     try:
-        phone_obj = phonenumbers.parse(phone, None)
-    except phonenumbers.NumberParseException:
+        e164, _ = normalize_phone_number(phone)
+    except PhoneNumberError as e:
+        if e.reason == INVALID_NUMBER:
+            raise ValidationError("Invalid phone number")
         raise ValidationError("Invalid phone number format")
 
-    if not phonenumbers.is_valid_number(phone_obj):
-        raise ValidationError("Invalid phone number")
-
-    return phonenumbers.format_number(phone_obj, phonenumbers.PhoneNumberFormat.E164)
+    return e164
 
 
 def get_tokens_for_user(user):
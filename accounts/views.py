@@ -1,18 +1,30 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import User,ProfileViewRecord
-from .utils import generate_otp, get_tokens_for_user
+from .models import User,OTPChallenge,ProfileViewRollup
+from .utils import generate_otp, get_tokens_for_user, parse_id
 from django.utils import timezone
-from .serializers import UserSerializer, UserProfileUpdateSerializer,UserListSerializer
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+from .serializers import UserSerializer, UserProfileUpdateSerializer,UserListSerializer,UserDirectorySerializer,ProfileBundleSerializer,PhoneNumberInputSerializer
+from django.db.models import Prefetch, aprefetch_related_objects
+from social.models import SocialMediaLink
+from .search import search_users, load_ranked_users
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import generics
 from rest_framework import permissions
-from phonenumbers import parse, is_valid_number, format_number, PhoneNumberFormat, NumberParseException
-from django.core.cache import cache
 from rest_framework import status
+from .signup_store import get_signup_store
+from .profile_views import record_profile_view
+from .pagination import KeysetPaginator, InvalidCursor
+from .async_api import AsyncAPIView, json_api_response
+from .profile_cache import get_cached_profile, cache_profile
+from django.http import HttpResponseNotModified
+from django.utils.cache import parse_etags
+from django.utils.http import http_date, parse_http_date_safe
+from django.conf import settings
 from accounts.utils import api_response
-from phonenumbers import parse, is_valid_number, format_number, NumberParseException, PhoneNumberFormat
+from .phone import normalize_phone_number, PhoneNumberError, INVALID_NUMBER
 from django.contrib.auth import get_user_model
 
 def api_response(success, message, data=None, status_code=status.HTTP_200_OK):
@@ -32,14 +44,11 @@ class RequestPhoneOTP(APIView):
 
         mobile_number = serializer.validated_data.get("mobile_number")
 
-        user = User.objects.filter(mobile_number=mobile_number).first()
-        if not user:
+        if not User.objects.filter(mobile_number=mobile_number).exists():
             return api_response(False, "User does not exist. Please sign up first.", status_code=404)
 
         otp = generate_otp()
-        user.otp = otp
-        user.otp_created_at = timezone.now()
-        user.save()
+        OTPChallenge.issue(mobile_number, otp)
 
         print(f"[DEBUG] OTP for {mobile_number}: {otp}")
         return api_response(True, "OTP sent sucesssfully to mobile number", data={"otp": otp})
@@ -56,11 +65,11 @@ class VerifyPhoneOTP(APIView):
 
         mobile_number = serializer.validated_data.get("mobile_number")
 
-        user = User.objects.filter(mobile_number=mobile_number, otp=otp_input).first()
-        if user and user.is_otp_valid(otp_input):
-            user.otp = None
-            user.otp_created_at = None
-            user.save()
+        # Consume the challenge in one UPDATE; the User row is only read
+        user = None
+        if otp_input and OTPChallenge.consume(mobile_number, otp_input):
+            user = User.objects.filter(mobile_number=mobile_number).first()
+        if user:
             tokens = get_tokens_for_user(user)
             user_data = UserSerializer(user).data
             return api_response(True, "Login successful", data={
@@ -77,30 +86,23 @@ class SignupRequest(APIView):
     def post(self, request):
         data = request.data
 
-        raw_mobile = data.get("mobile_number")
-        country_code = data.get("country_code")
         email = data.get("email")
 
-        # Validate presence of mobile and country code
-        if not raw_mobile or not country_code:
-            return api_response(False, "Mobile number and country code are required", data=None, status_code=400)
+        # Validate presence and type of mobile and country code
+        phone = PhoneNumberInputSerializer(data=data)
+        if not phone.is_valid():
+            return api_response(False, "Mobile number and country code are required", data=phone.errors, status_code=400)
+        raw_mobile = phone.validated_data["mobile_number"]
+        country_code = phone.validated_data["country_code"]
 
         # Normalize the mobile number to E.164 format
+        # If number starts with +, it is trusted and parsed as-is
         try:
-            # If number starts with +, trust it and try parsing
-            if raw_mobile.startswith("+"):
-                parsed = parse(raw_mobile, None)
-            else:
-                parsed = parse(f"{country_code}{raw_mobile}", None)
-
-            if not is_valid_number(parsed):
+            normalized_mobile, normalized_country_code = normalize_phone_number(raw_mobile, country_code)
+        except PhoneNumberError as e:
+            if e.reason == INVALID_NUMBER:
                 return api_response(False, "Invalid mobile number", data=None, status_code=400)
-
-            normalized_mobile = format_number(parsed, PhoneNumberFormat.E164)
-            normalized_country_code = f"+{parsed.country_code}"
-
-        except NumberParseException as e:
-            return api_response(False, f"Mobile number parse error: {str(e)}", data=None, status_code=400)
+            return api_response(False, f"Mobile number parse error: {e.message}", data=None, status_code=400)
 
         # Check for duplicate mobile/email BEFORE serializer.is_valid()
         if User.objects.filter(mobile_number=normalized_mobile).exists():
@@ -125,11 +127,12 @@ class SignupRequest(APIView):
             cache_key = f"signup_otp:{mobile_number}"
             print(f"[DEBUG] SignupRequest cache key: {cache_key}, otp: {otp}")
 
-            cache.set(cache_key, {
+            # Shared across workers, so FinalizeSignup can land on any process
+            get_signup_store().set(mobile_number, {
                 "otp": otp,
                 "signup_data": validated,
                 "created_at": timezone.now().isoformat()
-            }, timeout=300)  # 5 minutes
+            }, ttl=300)  # 5 minutes
 
             return api_response(True, "OTP sent for verification", data={"otp": otp})
 
@@ -143,26 +146,24 @@ class SignupRequest(APIView):
 class FinalizeSignup(APIView):
     def post(self, request):
         otp_input = request.data.get("otp")
-        mobile_number_raw = request.data.get("mobile_number")
-        country_code = request.data.get("country_code")
 
-        if not mobile_number_raw or not country_code:
-            return api_response(False, "Mobile number and country code are required.", status_code=400)
+        phone = PhoneNumberInputSerializer(data=request.data)
+        if not phone.is_valid():
+            return api_response(False, "Mobile number and country code are required.", data=phone.errors, status_code=400)
+        mobile_number_raw = phone.validated_data["mobile_number"]
+        country_code = phone.validated_data["country_code"]
 
         # Normalize to E.164 format
         try:
-            parsed = parse(f"{country_code}{mobile_number_raw}", None)
-            if not is_valid_number(parsed):
+            mobile_number, _ = normalize_phone_number(mobile_number_raw, country_code)
+        except PhoneNumberError as e:
+            if e.reason == INVALID_NUMBER:
                 return api_response(False, "Invalid mobile number", status_code=400)
-            mobile_number = format_number(parsed, PhoneNumberFormat.E164)
-        except NumberParseException as e:
-            return api_response(False, f"Number parse error: {str(e)}", status_code=400)
+            return api_response(False, f"Number parse error: {e.message}", status_code=400)
 
-        # Now get from cache using normalized number
-        cache_key = f"signup_otp:{mobile_number}"
-        otp_data = cache.get(cache_key)
-
-        print(f"[DEBUG] FinalizeSignup cache key: {cache_key}, value: {otp_data}")
+        # Now get the pending signup using normalized number
+        signup_store = get_signup_store()
+        otp_data = signup_store.get(mobile_number)
 
         if not otp_data:
             return api_response(False, "OTP expired or not found", status_code=400)
@@ -181,7 +182,7 @@ class FinalizeSignup(APIView):
         user = User.objects.create(**serializer.validated_data)
 
         # Clear the OTP after success
-        cache.delete(cache_key)
+        signup_store.delete(mobile_number)
 
         tokens = get_tokens_for_user(user)
         user_data = UserSerializer(user).data
@@ -237,6 +238,25 @@ class ProfileView(APIView):
 
         
 
+class AsyncProfileView(AsyncAPIView):
+    """
+    Async variant of ProfileView.get, served with the async ORM. The
+    category is joined and social links prefetched up front, so serializing
+    needs no further queries.
+    """
+
+    async def get(self, request):
+        user = await User.objects.select_related('category').aget(pk=request.user.pk)
+        await aprefetch_related_objects([user], 'social_links__platform')
+        serializer = UserProfileUpdateSerializer(user)
+        return json_api_response(
+            success=True,
+            message="Profile fetched successfully",
+            data=serializer.data,
+            status_code=status.HTTP_200_OK
+        )
+
+
 class ProfileDetailView(generics.RetrieveAPIView):
     queryset = User.objects.all()
     serializer_class = UserProfileUpdateSerializer
@@ -246,20 +266,8 @@ class ProfileDetailView(generics.RetrieveAPIView):
         instance = self.get_object()
 
         if request.user.is_authenticated and request.user != instance:
-            # Check if the view is unique
-            profile_view_record, created = ProfileViewRecord.objects.update_or_create(
-                viewer=request.user,
-                profile_owner=instance,
-                defaults={'viewed_at': timezone.now()} # Always update the timestamp to now
-            )
-            if created: # This 'created' variable comes from update_or_create above
-                instance.profile_views = (instance.profile_views or 0) + 1
-                instance.save(update_fields=["profile_views"])
-            # if not already_viewed:
-            #     # Create a record and increment unique view count
-            #     ProfileViewRecord.objects.create(profile_owner=instance, viewer=request.user)
-            #     instance.profile_views = (instance.profile_views or 0) + 1
-            #     instance.save(update_fields=["profile_views"])
+            # Buffered: the record upsert and unique-view count happen in a batched flush
+            record_profile_view(request.user.pk, instance.pk)
 
         serializer = self.get_serializer(instance)
         return api_response(
@@ -270,23 +278,104 @@ class ProfileDetailView(generics.RetrieveAPIView):
         )
 
 
+
+class ProfileBundleView(generics.RetrieveAPIView):
+    """
+    User, category, social links (with platforms), services, theme and images
+    in one response, loaded with a fixed number of queries (4) regardless of
+    how many links, services or images the user has.
+    """
+    serializer_class = ProfileBundleSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return User.objects.select_related('category', 'theme').prefetch_related(
+            Prefetch('social_links', queryset=SocialMediaLink.objects.select_related('platform')),
+            'services',
+            'uploaded_images',
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+
+        if request.user.is_authenticated and request.user != instance:
+            record_profile_view(request.user.pk, instance.pk)
+
+        serializer = self.get_serializer(instance)
+        return api_response(
+            success=True,
+            message="Profile bundle fetched successfully.",
+            data=serializer.data,
+            status_code=status.HTTP_200_OK
+        )
+
+
+class ProfileBatchView(APIView):
+    """
+    Several profiles in one request: GET profiles/?ids=3,1,2
+
+    Profiles come back in the requested order with the same fields as
+    profile/<pk>/ (plus id); unknown ids are listed in missing_ids. Unlike
+    ProfileDetailView no profile views are recorded.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        raw_ids = [value.strip() for value in (request.query_params.get("ids") or "").split(",") if value.strip()]
+        if not raw_ids:
+            return api_response(False, "Provide at least one id, e.g. ?ids=1,2,3", status_code=status.HTTP_400_BAD_REQUEST)
+        ids = [parse_id(value) for value in raw_ids]
+        if None in ids:
+            return api_response(False, "ids must be a comma-separated list of integers.", status_code=status.HTTP_400_BAD_REQUEST)
+
+        ids = list(dict.fromkeys(ids))  # dedupe, keep order
+        max_ids = settings.PROFILE_BATCH_MAX_IDS
+        if len(ids) > max_ids:
+            return api_response(False, f"At most {max_ids} ids can be requested at once.", status_code=status.HTTP_400_BAD_REQUEST)
+
+        users = User.objects.select_related('category').prefetch_related(
+            Prefetch('social_links', queryset=SocialMediaLink.objects.select_related('platform')),
+        ).in_bulk(ids)
+        found = [users[pk] for pk in ids if pk in users]
+
+        serializer = UserProfileUpdateSerializer(found, many=True, context={"request": request})
+        profiles = [{"id": user.id, **data} for user, data in zip(found, serializer.data)]
+        return api_response(True, "Profiles fetched successfully.", data={
+            "profiles": profiles,
+            "missing_ids": [pk for pk in ids if pk not in users],
+        })
+
 User = get_user_model()
 
 class UserListView(generics.ListAPIView):
-    queryset = User.objects.all()
     serializer_class = UserListSerializer # Use the serializer for listing users
     permission_classes = [permissions.IsAuthenticated] # Only authenticated users can view the list
 
+    def get_queryset(self):
+        # Only load the columns UserListSerializer renders
+        return User.objects.only(*UserListSerializer.Meta.fields)
+
     # Override the list method to use your custom api_response helper
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return api_response(
+        paginator = KeysetPaginator(
+            ordering=('id',),
+            page_size=settings.USER_LIST_PAGE_SIZE,
+            max_page_size=settings.USER_LIST_MAX_PAGE_SIZE,
+        )
+        try:
+            users, next_cursor = paginator.paginate(self.get_queryset(), request)
+        except InvalidCursor as e:
+            return api_response(False, str(e), status_code=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(users, many=True)
+        response = api_response(
             success=True,
             message="List of all registered users fetched successfully.",
             data=serializer.data,
             status_code=status.HTTP_200_OK
         )
+        response.data["next_cursor"] = next_cursor
+        return response
 
 
 User = get_user_model()
@@ -297,28 +386,131 @@ class ProfilePublicDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.AllowAny]
     authentication_classes = [] # <--- ADD THIS LINE!
 
+    def get_queryset(self):
+        return User.objects.select_related('category').prefetch_related('social_links__platform')
+
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+        pk = kwargs['pk']
 
         # The view counting logic should still check if the request is from an authenticated user
         # to ensure only logged-in users contribute to unique views.
-        if request.user.is_authenticated and request.user != instance:
-            profile_view_record, created = ProfileViewRecord.objects.update_or_create(
-                viewer=request.user,
-                profile_owner=instance,
-                defaults={'viewed_at': timezone.now()}
+        if request.user.is_authenticated and request.user.pk != pk:
+            record_profile_view(request.user.pk, pk)
+
+        # Rendered payload, ETag and Last-Modified come from the cache; the ORM
+        # is only touched on a miss
+        cache_key, entry = get_cached_profile(pk, request.get_host())
+        if entry is None:
+            instance = self.get_object()
+            serializer = self.get_serializer(instance)
+            entry = cache_profile(cache_key, serializer.data)
+
+        if_none_match = request.headers.get("If-None-Match")
+        if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since"))
+        if (if_none_match and (if_none_match.strip() == "*" or entry["etag"] in parse_etags(if_none_match))) or (
+            not if_none_match and if_modified_since and entry["last_modified"] <= if_modified_since
+        ):
+            response = HttpResponseNotModified()
+        else:
+            response = api_response(
+                success=True,
+                message="Profile fetched successfully.",
+                data=entry["data"],
+                status_code=status.HTTP_200_OK
             )
-            if created:
-                instance.profile_views = (instance.profile_views or 0) + 1
-                instance.save(update_fields=["profile_views"])
+        response["ETag"] = entry["etag"]
+        response["Last-Modified"] = http_date(entry["last_modified"])
+        response["Cache-Control"] = "public, no-cache"
+        return response
 
-        serializer = self.get_serializer(instance)
-        return api_response(
-            success=True,
-            message="Profile fetched successfully.",
-            data=serializer.data,
-            status_code=status.HTTP_200_OK
-        )
 
+class ProfileViewAnalyticsView(APIView):
+    """
+    Views-over-time for the logged-in user's profile, served from the
+    hourly/daily rollups with one range scan.
+
+    Query params: granularity=day|hour (default day), start, end (ISO date or
+    datetime; default the last 30 days).
+    """
+    permission_classes = [IsAuthenticated]
 
+    def _parse_bound(self, value):
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            parsed_date = parse_date(value)
+            if parsed_date is None:
+                raise ValueError(value)
+            parsed = datetime.combine(parsed_date, time.min)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
 
+    def get(self, request):
+        granularity = request.query_params.get("granularity", ProfileViewRollup.DAY)
+        if granularity not in (ProfileViewRollup.DAY, ProfileViewRollup.HOUR):
+            return api_response(False, "granularity must be 'day' or 'hour'.", status_code=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            end = self._parse_bound(request.query_params.get("end")) or timezone.now()
+            start = self._parse_bound(request.query_params.get("start")) or end - timedelta(days=30)
+        except ValueError as e:
+            return api_response(False, f"Invalid date: {e}", status_code=status.HTTP_400_BAD_REQUEST)
+
+        rows = ProfileViewRollup.objects.filter(
+            profile_owner=request.user,
+            granularity=granularity,
+            bucket_start__gte=ProfileViewRollup.bucket_for(start, granularity),
+            bucket_start__lt=end,
+        ).order_by("bucket_start").values_list("bucket_start", "views")
+
+        series = [{"bucket_start": bucket_start, "views": views} for bucket_start, views in rows]
+        return api_response(True, "Profile view analytics fetched successfully.", data={
+            "granularity": granularity,
+            "start": start,
+            "end": end,
+            "total_views": sum(point["views"] for point in series),
+            "series": series,
+        })
+
+
+class DirectorySearchView(APIView):
+    """
+    Ranked people/business search over name, business/company name,
+    designation and category name.
+
+    Query params: q (required), role, category (id), completed (true/false),
+    cursor, page_size.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = (request.query_params.get("q") or "").strip()
+        if len(query) < 2:
+            return api_response(False, "Search query must be at least 2 characters long.", status_code=status.HTTP_400_BAD_REQUEST)
+
+        role = request.query_params.get("role")
+        if role and role not in dict(User.ROLE_CHOICES):
+            return api_response(False, "Invalid role.", status_code=status.HTTP_400_BAD_REQUEST)
+        category_id = request.query_params.get("category")
+        if category_id:
+            category_id = parse_id(category_id)
+            if category_id is None:
+                return api_response(False, "Invalid category.", status_code=status.HTTP_400_BAD_REQUEST)
+        completed = {"true": True, "false": False}.get((request.query_params.get("completed") or "").lower())
+
+        paginator = KeysetPaginator(
+            ordering=("-score", "-user_id"),
+            page_size=settings.DIRECTORY_SEARCH_PAGE_SIZE,
+            max_page_size=settings.DIRECTORY_SEARCH_MAX_PAGE_SIZE,
+        )
+        try:
+            rows, next_cursor = paginator.paginate(search_users(query, role=role, category_id=category_id, completed=completed), request)
+        except InvalidCursor as e:
+            return api_response(False, str(e), status_code=status.HTTP_400_BAD_REQUEST)
+
+        serializer = UserDirectorySerializer(load_ranked_users(rows), many=True, context={"request": request})
+        response = api_response(True, "Search results fetched successfully.", data=serializer.data)
+        response.data["next_cursor"] = next_cursor
+        return response
@@ -0,0 +1,137 @@
+# benchmarks/async_throughput.py
+"""
+Throughput of the async read endpoints against their sync originals, both
+served by real uvicorn workers (forked, sharing one listening socket) at
+each of `--workers`.
+
+For every endpoint pair, worker count and `--concurrency` level, that many
+keep-alive HTTP connections send back-to-back GETs for `--duration` seconds,
+each request authenticated as the next of `--users` seeded users. Requests
+are counted after a one-second warm-up. Client and workers share the
+machine, so on few cores the client's CPU is part of the picture.
+
+    python -m benchmarks.async_throughput --workers 1 2 --concurrency 1 16 64
+"""
+import asyncio
+import os
+import re
+import time
+
+from .harness import asgi_server, parser, report, setup, summary, test_database
+
+ENDPOINTS = [
+    ('inbox', '/api/chats/', '/api/chats/async/'),
+    ('notifications', '/api/notifications/', '/api/notifications/async/'),
+    ('profile', '/api/profile/', '/api/profile/async/'),
+    ('categories', '/api/category/', '/api/category/async/'),
+]
+
+_content_length_re = re.compile(rb'content-length: *(\d+)', re.IGNORECASE)
+
+
+async def hammer(port, path, tokens, concurrency, duration):
+    """Return (requests per second, per-request latencies) for `path`."""
+    latencies = []
+    stop_at = time.perf_counter() + duration
+
+    async def connection(offset):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        index = offset
+        while time.perf_counter() < stop_at:
+            token = tokens[index % len(tokens)]
+            index += concurrency
+            start = time.perf_counter()
+            writer.write(
+                f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nAuthorization: Bearer {token}\r\n\r\n'.encode()
+            )
+            head = await reader.readuntil(b'\r\n\r\n')
+            if not head.startswith(b'HTTP/1.1 200'):
+                raise AssertionError(head)
+            await reader.readexactly(int(_content_length_re.search(head).group(1)))
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connection(offset) for offset in range(concurrency)))
+    return len(latencies) / (time.perf_counter() - started), latencies
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--workers', type=int, nargs='+', default=[1, 2])
+    args.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    args.add_argument('--duration', type=float, default=10)
+    args.add_argument('--users', type=int, default=200)
+    args.add_argument('--messages-per-user', type=int, default=100)
+    args = args.parse_args()
+    setup()
+
+    import random
+
+    from django.test import override_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from accounts.models import User
+    from category.models import Category
+    from chats.models import Message
+    from notifications.models import Notification
+
+    rng = random.Random(42)
+    settings = override_settings(
+        CACHES={
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'async-throughput-{alias}'}
+            for alias in ('default', 'shared')
+        },
+        # Development-only instrumentation; both variants would pay for it
+        QUERY_BUDGET={'ENABLED': False},
+    )
+    with settings, test_database(shared=True):
+        categories = Category.objects.bulk_create(
+            Category(category_name=f'Category {i}', type='professional', icon=f'category_icons/{i}.png')
+            for i in range(30)
+        )
+        users = User.objects.bulk_create(
+            User(
+                mobile_number=f'+9173{i:08d}', name=f'Reader {i}', email=f'reader{i}@example.com',
+                category=rng.choice(categories), about='Interior design and site supervision.',
+            )
+            for i in range(args.users)
+        )
+        for user in users:
+            Message.objects.bulk_create(
+                Message(sender=rng.choice(users), receiver=user, content=f'Message {i} about the site visit')
+                for i in range(args.messages_per_user)
+            )
+            Notification.objects.bulk_create(
+                Notification(recipient=user, title=f'Update {i}', message='Your quote was viewed.')
+                for i in range(args.messages_per_user // 2)
+            )
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+
+        rows = []
+        for workers in args.workers:
+            with asgi_server(workers=workers) as (port, _):
+                for name, sync_path, async_path in ENDPOINTS:
+                    for concurrency in args.concurrency:
+                        for variant, path in (('sync', sync_path), ('async', async_path)):
+                            asyncio.run(hammer(port, path, tokens, concurrency, 1))
+                            throughput, latencies = asyncio.run(
+                                hammer(port, path, tokens, concurrency, args.duration)
+                            )
+                            rows.append({
+                                'endpoint': name,
+                                'workers': workers,
+                                'concurrency': concurrency,
+                                'variant': variant,
+                                'req_per_s': round(throughput, 1),
+                                **summary(latencies),
+                            })
+        report(
+            f'uvicorn, {os.cpu_count()} CPU(s) shared with the client, {args.users} users, '
+            f'{args.duration:g}s per cell',
+            rows,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/cached_auth.py
+"""
+Queries and latency of authenticated read endpoints with simplejwt's
+JWTAuthentication versus accounts.authentication.CachedJWTAuthentication.
+
+    python -m benchmarks.cached_auth --requests 500 --rows 50
+"""
+from .harness import measure, parser, report, setup, summary, test_database
+
+ENDPOINTS = [
+    ('ProfileView.get', '/api/profile/'),
+    ('MessageListView', '/api/chats/'),
+    ('NotificationListView', '/api/notifications/'),
+]
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--requests', type=int, default=500)
+    args.add_argument('--rows', type=int, default=50, help='messages and notifications in the inbox')
+    args = args.parse_args()
+    setup()
+
+    from unittest import mock
+
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.views import APIView
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    from accounts.authentication import CachedJWTAuthentication, invalidate_cached_user
+    from accounts.models import User
+    from accounts.utils import get_tokens_for_user
+    from chats.models import Message
+    from notifications.models import Notification
+
+    with test_database():
+        reader = User.objects.create(mobile_number='+919876590001', name='Reader')
+        sender = User.objects.create(mobile_number='+919876590002', name='Sender')
+        Message.objects.bulk_create(
+            Message(sender=sender, receiver=reader, content=f'message {i}') for i in range(args.rows)
+        )
+        Notification.objects.bulk_create(
+            Notification(recipient=reader, title=f'n{i}', message='x') for i in range(args.rows)
+        )
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(reader)['access']}")
+        invalidate_cached_user(reader.pk)
+
+        rows = []
+        for auth_class in (JWTAuthentication, CachedJWTAuthentication):
+            with mock.patch.object(APIView, 'authentication_classes', [auth_class]):
+                for name, path in ENDPOINTS:
+                    def get():
+                        response = client.get(path)
+                        assert response.status_code == 200, response.content
+
+                    get()  # fills the user cache for the cached class
+                    with CaptureQueriesContext(connection) as context:
+                        get()
+                    user_lookups = [
+                        query for query in context.captured_queries
+                        if 'FROM "accounts_user" WHERE "accounts_user"."id"' in query['sql'].replace('`', '"')
+                    ]
+                    rows.append({
+                        'auth': auth_class.__name__,
+                        'endpoint': name,
+                        'queries': len(context.captured_queries),
+                        'user_lookups': len(user_lookups),
+                        **summary(measure(get, args.requests)),
+                    })
+        report(f'{args.requests} requests per row, {args.rows} messages/notifications', rows)
+
+
+if __name__ == '__main__':
+    main()
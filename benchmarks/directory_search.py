@@ -0,0 +1,113 @@
+# benchmarks/directory_search.py
+"""
+Directory search over the UserSearchToken index versus the unindexed
+LIKE '%q%' scan the admin's search_fields run, with `--users` seeded users.
+
+Both sides return the first page (DIRECTORY_SEARCH_PAGE_SIZE users); the
+LIKE side is unranked, ordered by id.
+
+    python -m benchmarks.directory_search --users 1000000
+"""
+from .harness import measure, parser, report, setup, summary, test_database
+
+FIRST_NAMES = [
+    'aarav', 'priya', 'rahul', 'anjali', 'vikram', 'sneha', 'arjun', 'kavya', 'rohan', 'meera',
+    'aditya', 'divya', 'karan', 'pooja', 'nikhil', 'shreya', 'manoj', 'lakshmi', 'suresh', 'deepa',
+]
+LAST_NAMES = [
+    'sharma', 'nair', 'menon', 'iyer', 'reddy', 'patel', 'gupta', 'pillai', 'das', 'kumar',
+    'varma', 'rao', 'joshi', 'mehta', 'shah', 'bose', 'singh', 'verma', 'chopra', 'thomas',
+]
+DESIGNATIONS = ['plumber', 'electrician', 'designer', 'developer', 'consultant', 'teacher', 'doctor', 'carpenter']
+QUERIES = [
+    ('common name', 'priya', None),
+    ('prefix', 'pri', None),
+    ('two terms', 'priya sharma', None),
+    ('common + role', 'plumber', 'business'),
+    ('rare token', 'studio4242', None),
+    ('no match', 'zzzz', None),
+]
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--users', type=int, default=1000000)
+    args.add_argument('--repeat', type=int, default=20)
+    args = args.parse_args()
+    setup()
+
+    import random
+    import time
+
+    from django.conf import settings
+    from django.db.models import Q
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from accounts.models import User, UserSearchToken
+    from accounts.search import index_users
+    from accounts.views import DirectorySearchView
+
+    rng = random.Random(42)
+    with test_database():
+        started = time.perf_counter()
+        batch = 10000
+        for start in range(0, args.users, batch):
+            users = []
+            for i in range(start, min(start + batch, args.users)):
+                business = rng.random() < 0.2
+                users.append(User(
+                    mobile_number=f'+9170{i:08d}',
+                    name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    role='business' if business else 'individual',
+                    business_name=f'{rng.choice(LAST_NAMES)} studio{i % 10000}' if business else None,
+                    designation=rng.choice(DESIGNATIONS),
+                ))
+            User.objects.bulk_create(users)
+        seeded = time.perf_counter()
+        index_users(User.objects.all(), batch_size=5000)
+        indexed = time.perf_counter()
+        print(
+            f'seeded {args.users} users in {seeded - started:.0f}s, '
+            f'indexed {UserSearchToken.objects.count()} tokens in {indexed - seeded:.0f}s'
+        )
+
+        reader = User.objects.order_by('id').first()
+        view = DirectorySearchView.as_view()
+        factory = APIRequestFactory()
+        page_size = settings.DIRECTORY_SEARCH_PAGE_SIZE
+
+        def indexed_search(q, role):
+            params = {'q': q, **({'role': role} if role else {})}
+            request = factory.get('/api/directory/search/', params)
+            force_authenticate(request, user=reader)
+            response = view(request)
+            assert response.status_code == 200, response.data
+            return len(response.data['data'])
+
+        def like_scan(q, role):
+            matches = Q()
+            for term in q.split():
+                matches &= (
+                    Q(name__icontains=term) | Q(business_name__icontains=term) | Q(company_name__icontains=term)
+                    | Q(designation__icontains=term) | Q(category__category_name__icontains=term)
+                )
+            users = User.objects.filter(matches, is_active=True)
+            if role:
+                users = users.filter(role=role)
+            return len(users.select_related('category').order_by('id')[:page_size])
+
+        rows = []
+        for name, q, role in QUERIES:
+            for method, func in (('LIKE scan', like_scan), ('token index', indexed_search)):
+                hits = func(q, role)
+                rows.append({
+                    'query': f'{name} ({q!r}{", role=" + role if role else ""})',
+                    'method': method,
+                    'page_rows': hits,
+                    **summary(measure(lambda: func(q, role), args.repeat)),
+                })
+        report(f'{args.users} users, first page of {page_size}, {args.repeat} runs each', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+# benchmarks/harness.py
+"""
+Shared plumbing for the scripts in this directory.
+
+Every script runs against a throwaway test database (created and destroyed
+the same way `manage.py test` does), never against the configured one, and
+uses whatever DJANGO_SETTINGS_MODULE points at (ubc.settings by default).
+Run them from the repository root:
+
+    python -m benchmarks.phone_normalization
+    python -m benchmarks.user_list --users 100000
+
+Scripts that go through a real server (asgi_server) need uvicorn and
+websockets from requirements.txt.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup():
+    """Configure Django for a standalone script."""
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ubc.settings')
+    import django
+    django.setup()
+
+
+def parser(description):
+    return argparse.ArgumentParser(description=description)
+
+
+@contextmanager
+def test_database(shared=False):
+    """
+    Create the test databases, migrate them, and drop them afterwards.
+
+    With `shared=True` an SQLite test database lives in a file rather than in
+    memory, so that servers forked by asgi_server() can open it too.
+    """
+    from django.conf import settings
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+    if shared:
+        for config in settings.DATABASES.values():
+            if config['ENGINE'] == 'django.db.backends.sqlite3':
+                config.setdefault('TEST', {})['NAME'] = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+    setup_test_environment(debug=False)
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def _serve(app, sock, options):
+    import uvicorn
+
+    config = uvicorn.Config(app, log_level='warning', lifespan='off', **options)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _responds(port):
+    try:
+        with socket.create_connection(('127.0.0.1', port), timeout=1) as probe:
+            probe.sendall(b'GET / HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n')
+            return probe.recv(16).startswith(b'HTTP/1.1')
+    except OSError:
+        return False
+
+
+@contextmanager
+def asgi_server(app='ubc.asgi:application', workers=1, **options):
+    """
+    Serve `app` with `workers` uvicorn workers, forked (so they share the
+    test database and settings) and accepting on one listening socket, and
+    yield `(port, worker pids)`. `options` go to uvicorn.Config().
+    """
+    from django.db import connections
+
+    # asyncio only sets TCP_NODELAY on accepted sockets whose proto is TCP;
+    # with proto 0 every response waits out Nagle and the delayed ACK
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(2048)
+    port = sock.getsockname()[1]
+    # The workers must open their own database connections
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    processes = [
+        context.Process(target=_serve, args=(app, sock, options), daemon=True) for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        deadline = time.monotonic() + 30
+        while not _responds(port):
+            if time.monotonic() > deadline or not all(process.is_alive() for process in processes):
+                raise RuntimeError('uvicorn did not start')
+            time.sleep(0.1)
+        yield port, [process.pid for process in processes]
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(10)
+            if process.is_alive():
+                process.kill()
+        sock.close()
+
+
+def rss_mb(pid='self'):
+    """Current resident set size of process `pid`, in MiB (Linux only)."""
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return round(int(line.split()[1]) / 1024, 1)
+
+
+def measure(func, repeat, warmup=1):
+    """Call `func` `warmup + repeat` times; return the timings (seconds) of the last `repeat` calls."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summary(timings, unit='ms'):
+    """Median / p95 / max of `timings` as a `dict`, in milliseconds (`unit='ms'`) or microseconds (`'us'`)."""
+    scale = {'ms': 1e3, 'us': 1e6}[unit]
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {
+        f'median_{unit}': round(statistics.median(ordered) * scale, 2),
+        f'p95_{unit}': round(p95 * scale, 2),
+        f'max_{unit}': round(ordered[-1] * scale, 2),
+    }
+
+
+def count_queries(func):
+    """Run `func` and return `(result, number of queries it issued)`."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        result = func()
+    return result, len(context.captured_queries)
+
+
+def reset_peak_rss():
+    """Reset the peak RSS to the current RSS (Linux only; a no-op elsewhere)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """Peak resident set size since the last reset_peak_rss() (or process start), in MiB."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # getrusage reports KiB on Linux and cannot be reset
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def report(title, rows):
+    """Print `rows` (a list of dicts sharing keys) as an aligned table."""
+    print(f'\n{title}')
+    if not rows:
+        return
+    columns = list(rows[0])
+    widths = {column: max(len(str(column)), *(len(str(row[column])) for row in rows)) for column in columns}
+    print('  '.join(str(column).ljust(widths[column]) for column in columns))
+    for row in rows:
+        print('  '.join(str(row[column]).ljust(widths[column]) for column in columns))
@@ -0,0 +1,85 @@
+# benchmarks/inbox_depth.py
+"""
+Inbox page latency by depth into history: keyset pagination over
+(timestamp, id), as MessageListView serves it, versus OFFSET pagination of
+the same query.
+
+All `--messages` messages go to one receiver, one second apart, from 100
+senders.
+
+    python -m benchmarks.inbox_depth --messages 1000000
+"""
+from .harness import measure, parser, report, setup, summary, test_database
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--messages', type=int, default=1000000)
+    args.add_argument('--repeat', type=int, default=20)
+    args = args.parse_args()
+    setup()
+
+    import time
+    from datetime import timedelta
+
+    from django.conf import settings
+    from django.utils import timezone
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from accounts.models import User
+    from chats.models import Message
+    from chats.serializers import MessageListSerializer
+    from chats.views import MessageListView, inbox_paginator
+
+    with test_database():
+        reader = User.objects.create(mobile_number='+919876592000', name='Reader')
+        senders = User.objects.bulk_create(
+            User(mobile_number=f'+9198765930{i:02d}', name=f'Sender {i}') for i in range(100)
+        )
+
+        # Spread the timestamps out; auto_now_add would stamp every row with now()
+        started = time.perf_counter()
+        timestamp_field = Message._meta.get_field('timestamp')
+        timestamp_field.auto_now_add = False
+        oldest = timezone.now() - timedelta(seconds=args.messages)
+        batch = 10000
+        for start in range(0, args.messages, batch):
+            Message.objects.bulk_create(
+                Message(
+                    sender=senders[i % len(senders)], receiver=reader, content=f'Message number {i}',
+                    timestamp=oldest + timedelta(seconds=i),
+                )
+                for i in range(start, min(start + batch, args.messages))
+            )
+        timestamp_field.auto_now_add = True
+        print(f'seeded {args.messages} messages in {time.perf_counter() - started:.0f}s')
+
+        page_size = settings.MESSAGE_INBOX_PAGE_SIZE
+        view = MessageListView.as_view()
+        factory = APIRequestFactory()
+        paginator = inbox_paginator()
+        inbox = Message.objects.filter(receiver=reader).select_related('sender').order_by('-timestamp', '-id')
+
+        def keyset_page(cursor):
+            request = factory.get('/api/chats/', {'cursor': cursor} if cursor else {})
+            force_authenticate(request, user=reader)
+            response = view(request)
+            assert response.status_code == 200 and len(response.data['data']) == page_size, response.data
+            return response
+
+        def offset_page(offset):
+            rows = list(inbox[offset:offset + page_size])
+            assert len(rows) == page_size
+            return MessageListSerializer(rows, many=True).data
+
+        rows = []
+        depths = [0, 1000, 10000, 100000, 500000, args.messages - page_size]
+        for depth in sorted({depth for depth in depths if 0 <= depth <= args.messages - page_size}):
+            cursor = paginator.cursor_for(inbox[depth - 1]) if depth else None
+            rows.append({'depth': depth, 'method': 'keyset', **summary(measure(lambda: keyset_page(cursor), args.repeat))})
+            rows.append({'depth': depth, 'method': 'OFFSET', **summary(measure(lambda: offset_page(depth), args.repeat))})
+        report(f'{args.messages} messages in one inbox, page of {page_size}, {args.repeat} runs each', rows)
+
+
+if __name__ == '__main__':
+    main()
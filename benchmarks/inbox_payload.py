@@ -0,0 +1,64 @@
+# benchmarks/inbox_payload.py
+"""
+Inbox payload size and serialization time: the default shape (sender
+profile embedded in every message) versus ?include=users (sender ids plus
+each distinct sender once under included.users).
+
+Serializes and JSON-renders the whole `--messages` inbox, for several
+sender counts.
+
+    python -m benchmarks.inbox_payload --messages 1000 --senders 1 10 100 1000
+"""
+from .harness import measure, parser, report, setup, summary, test_database
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--messages', type=int, default=1000)
+    args.add_argument('--senders', type=int, nargs='+', default=[1, 10, 100, 1000])
+    args.add_argument('--repeat', type=int, default=20)
+    args = args.parse_args()
+    setup()
+
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIRequestFactory
+
+    from accounts.models import User
+    from chats.models import Message
+    from chats.views import inbox_data
+
+    request = APIRequestFactory().get('/api/chats/')
+    with test_database():
+        reader = User.objects.create(mobile_number='+919876591000', name='Reader')
+        rows = []
+        for sender_count in args.senders:
+            senders = User.objects.bulk_create(
+                User(
+                    mobile_number=f'+91987{sender_count:02d}{i:05d}', name=f'Sender {i}',
+                    email=f'sender{sender_count}-{i}@example.com', country_code='+91',
+                    about='Plumbing and electrical work across the city, 10 years of experience.',
+                )
+                for i in range(sender_count)
+            )
+            Message.objects.filter(receiver=reader).delete()
+            Message.objects.bulk_create(
+                Message(sender=senders[i % sender_count], receiver=reader, content=f'Message number {i}, see you soon')
+                for i in range(args.messages)
+            )
+            messages = list(Message.objects.filter(receiver=reader).select_related('sender').order_by('-timestamp', '-id'))
+
+            for shape, params in (('embedded', {}), ('include=users', {'include': 'users'})):
+                def render():
+                    return JSONRenderer().render(inbox_data(messages, params, {'request': request}))
+
+                rows.append({
+                    'senders': sender_count,
+                    'shape': shape,
+                    'payload_kb': round(len(render()) / 1024, 1),
+                    **summary(measure(render, args.repeat)),
+                })
+        report(f'{args.messages} messages, serialize + render, {args.repeat} runs each', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# benchmarks/message_search.py
+"""
+Message search (the MessageSearchToken index behind MessageSearchView)
+versus a LIKE '%q%' scan over the same user's messages, with `--messages`
+seeded messages between `--users` users.
+
+Message bodies are 4-16 words drawn from a Zipf-distributed vocabulary; one
+"heavy" user takes part in `--heavy-share` of all messages, everyone else
+is picked uniformly. Both sides return the first page
+(MESSAGE_SEARCH_PAGE_SIZE); the LIKE side is unranked, newest first.
+
+The database lives in a file (a 10M message index does not fit in memory).
+Seeding runs SQLite without fsync and with a 1 GB page cache; both are back
+to the defaults before anything is measured.
+
+    python -m benchmarks.message_search --messages 10000000
+"""
+from .harness import measure, parser, report, setup, summary, test_database
+
+SYLLABLES = ['ka', 'ri', 'mo', 'te', 'lu', 'sa', 'ven', 'dor', 'pi', 'na', 'gel', 'tha', 'bo', 'rue', 'mix', 'zo']
+PLANTED = 'quotation'  # in ~5 of each user's messages
+QUERIES = [
+    ('rare word', PLANTED),
+    ('common word', None),  # most frequent vocabulary word
+    ('prefix', None),       # 3-letter prefix of a mid-frequency word
+    ('two terms', None),    # two mid-frequency words
+    ('no match', 'zzzzzz'),
+]
+
+
+def vocabulary(rng, size):
+    """`size` distinct made-up words, in random (frequency rank) order."""
+    words = {}
+    while len(words) < size:
+        words.setdefault(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return list(words)
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--messages', type=int, default=10000000)
+    args.add_argument('--users', type=int, default=10000)
+    args.add_argument('--heavy-share', type=float, default=0.01)
+    args.add_argument('--vocabulary', type=int, default=5000)
+    args.add_argument('--repeat', type=int, default=20)
+    args = args.parse_args()
+    setup()
+
+    import itertools
+    import random
+    import time
+
+    from django.conf import settings
+    from django.db import connection, transaction
+    from django.db.models import Q
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from accounts.models import User
+    from chats.models import Message, MessageSearchToken
+    from chats.search import build_tokens
+    from chats.views import MessageSearchView
+
+    rng = random.Random(42)
+    words = vocabulary(rng, args.vocabulary)
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+    with test_database(shared=True):
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = OFF')
+                cursor.execute('PRAGMA cache_size = -1000000')
+        users = User.objects.bulk_create(
+            User(mobile_number=f'+9172{i:08d}', name=f'Chat user {i}') for i in range(args.users)
+        )
+        heavy, others = users[0], users[1:]
+
+        insert_tokens = (
+            f'INSERT INTO {MessageSearchToken._meta.db_table} (owner_id, token, message_id, weight) '
+            f'VALUES (%s, %s, %s, %s)'
+        )
+        plant_rate = 5 * args.users / (2 * args.messages)
+        started = time.perf_counter()
+        batch = 10000
+        for start in range(0, args.messages, batch):
+            messages = []
+            for i in range(start, min(start + batch, args.messages)):
+                sender, receiver = rng.sample(others, 2)
+                if rng.random() < args.heavy_share:
+                    sender, receiver = (heavy, receiver) if rng.random() < 0.5 else (sender, heavy)
+                text = rng.choices(words, cum_weights=weights, k=rng.randint(4, 16))
+                if rng.random() < plant_rate:
+                    text.insert(rng.randint(0, len(text)), PLANTED)
+                messages.append(Message(sender=sender, receiver=receiver, content=' '.join(text)))
+            with transaction.atomic():
+                Message.objects.bulk_create(messages)
+                # The rows index_message() writes, without building model instances
+                with connection.cursor() as cursor:
+                    cursor.executemany(insert_tokens, [
+                        (owner_id, token, message.id, weight)
+                        for message in messages
+                        for owner_id in {message.sender_id, message.receiver_id}
+                        for token, weight in build_tokens(message).items()
+                    ])
+            if start and start % 1000000 == 0:
+                print(f'  {start} messages, {time.perf_counter() - started:.0f}s')
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = FULL')
+                cursor.execute('PRAGMA cache_size = -2000')
+                cursor.execute('ANALYZE')
+        print(
+            f'seeded {args.messages} messages and {MessageSearchToken.objects.count()} tokens '
+            f'in {time.perf_counter() - started:.0f}s'
+        )
+
+        typical = others[0]
+        searchers = [
+            ('heavy', heavy, Message.objects.filter(Q(sender=heavy) | Q(receiver=heavy)).count()),
+            ('typical', typical, Message.objects.filter(Q(sender=typical) | Q(receiver=typical)).count()),
+        ]
+        mid = words[len(words) // 20:]
+        filled = {
+            'common word': words[0],
+            'prefix': mid[0][:3],
+            'two terms': f'{mid[1]} {mid[2]}',
+        }
+        view = MessageSearchView.as_view()
+        factory = APIRequestFactory()
+        page_size = settings.MESSAGE_SEARCH_PAGE_SIZE
+
+        def indexed_search(user, q):
+            request = factory.get('/api/chats/search/', {'q': q})
+            force_authenticate(request, user=user)
+            response = view(request)
+            assert response.status_code == 200, response.data
+            return len(response.data['data'])
+
+        def like_scan(user, q):
+            matches = Q()
+            for term in q.split():
+                matches &= Q(content__icontains=term)
+            mine = Message.objects.filter(Q(sender=user) | Q(receiver=user))
+            return len(mine.filter(matches).select_related('sender').order_by('-id')[:page_size])
+
+        rows = []
+        for who, user, owned in searchers:
+            for name, q in QUERIES:
+                q = q or filled[name]
+                for method, func in (('LIKE scan', like_scan), ('token index', indexed_search)):
+                    rows.append({
+                        'user': f'{who} ({owned} msgs)',
+                        'query': f'{name} ({q!r})',
+                        'method': method,
+                        'page_rows': func(user, q),
+                        **summary(measure(lambda: func(user, q), args.repeat)),
+                    })
+        report(f'{args.messages} messages, {args.users} users, first page of {page_size}, {args.repeat} runs each', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/phone_normalization.py
+"""
+Per-call cost of accounts.phone.normalize_phone_number on cache hits and
+misses, next to the bare phonenumbers parse/is_valid_number/format_number
+sequence every call site used to run on its own.
+
+    python -m benchmarks.phone_normalization --calls 20000
+"""
+from .harness import parser, report, setup, summary
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--calls', type=int, default=20000)
+    args = args.parse_args()
+    setup()
+
+    import time
+
+    import phonenumbers
+
+    from accounts import phone
+
+    numbers = [f'98765{i:05d}' for i in range(args.calls)]
+    invalid = [f'12{i:05d}' for i in range(args.calls)]
+
+    def per_call(func, inputs):
+        timings = []
+        for raw in inputs:
+            start = time.perf_counter()
+            func(raw)
+            timings.append(time.perf_counter() - start)
+        return summary(timings, unit='us')
+
+    def uncached(raw):
+        parsed = phonenumbers.parse(f'+91{raw}', None)
+        if phonenumbers.is_valid_number(parsed):
+            phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+    def normalize(raw):
+        try:
+            phone.normalize_phone_number(raw, '+91')
+        except phone.PhoneNumberError:
+            pass
+
+    rows = [dict(case='phonenumbers, no cache', **per_call(uncached, numbers))]
+    phone.clear_cache()
+    rows.append(dict(case='normalize, miss', **per_call(normalize, numbers)))
+    rows.append(dict(case='normalize, hit', **per_call(normalize, numbers)))
+    phone.clear_cache()
+    rows.append(dict(case='normalize invalid, miss', **per_call(normalize, invalid)))
+    rows.append(dict(case='normalize invalid, hit', **per_call(normalize, invalid)))
+    report(f'{args.calls} distinct numbers per case (microseconds per call)', rows)
+    info = phone.cache_info()
+    print(f'\ncache: maxsize={info.maxsize} currsize={info.currsize}')
+
+
+if __name__ == '__main__':
+    main()
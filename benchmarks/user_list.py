@@ -0,0 +1,92 @@
+# benchmarks/user_list.py
+"""
+UserListView before and after keyset pagination: latency, response size and
+peak RSS of one call, with `--users` seeded users.
+
+The "unpaginated" row is the original view (User.objects.all() through
+UserListSerializer in a single response).
+
+    python -m benchmarks.user_list --users 100000
+"""
+from .harness import measure, parser, peak_rss_mb, report, reset_peak_rss, setup, summary, test_database
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--users', type=int, default=100000)
+    args.add_argument('--repeat', type=int, default=5)
+    args = args.parse_args()
+    setup()
+
+    import gc
+
+    from django.conf import settings
+    from rest_framework import status
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from accounts.models import User
+    from accounts.pagination import KeysetPaginator
+    from accounts.utils import api_response
+    from accounts.views import UserListView
+
+    class UnpaginatedUserListView(UserListView):
+        def get_queryset(self):
+            return User.objects.all()
+
+        def list(self, request, *args, **kwargs):
+            serializer = self.get_serializer(self.get_queryset(), many=True)
+            return api_response(
+                success=True,
+                message="List of all registered users fetched successfully.",
+                data=serializer.data,
+                status_code=status.HTTP_200_OK
+            )
+
+    with test_database():
+        batch = 5000
+        for start in range(0, args.users, batch):
+            User.objects.bulk_create(
+                User(mobile_number=f'+9170{i:08d}', name=f'User {i}', email=f'user{i}@example.com')
+                for i in range(start, min(start + batch, args.users))
+            )
+        reader = User.objects.order_by('id').first()
+        factory = APIRequestFactory()
+
+        # Cursor of the page holding the very last users
+        last_ids = list(User.objects.order_by('-id').values_list('id', flat=True)[:settings.USER_LIST_PAGE_SIZE + 1])
+        deep_cursor = KeysetPaginator(ordering=('id',)).cursor_for(User(id=last_ids[-1]))
+
+        cases = [
+            ('unpaginated', UnpaginatedUserListView.as_view(), {}),
+            ('keyset, first page', UserListView.as_view(), {}),
+            ('keyset, last page', UserListView.as_view(), {'cursor': deep_cursor}),
+            (f'keyset, page_size={settings.USER_LIST_MAX_PAGE_SIZE}', UserListView.as_view(),
+             {'page_size': settings.USER_LIST_MAX_PAGE_SIZE}),
+        ]
+        rows = []
+        for name, view, params in cases:
+            def call():
+                request = factory.get('/api/users/', params)
+                force_authenticate(request, user=reader)
+                response = view(request)
+                response.render()
+                assert response.status_code == 200, response.content
+                return response
+
+            gc.collect()
+            reset_peak_rss()
+            baseline = peak_rss_mb()
+            size = len(call().content)
+            peak = peak_rss_mb()
+            rows.append({
+                'case': name,
+                'response_kb': round(size / 1024, 1),
+                'peak_rss_mb': peak,
+                'rss_growth_mb': round(peak - baseline, 1),
+                **summary(measure(call, args.repeat, warmup=0)),
+            })
+        report(f'{args.users} users, {args.repeat} calls per case', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+# benchmarks/websocket_load.py
+"""
+How many chat WebSockets one uvicorn worker holds: the ASGI application runs
+in a single forked uvicorn worker (InProcessBroker, as one worker needs no
+fan-out), and this script opens sockets for distinct users up to each of
+`--connections`, keeping the earlier ones open.
+
+At every level it reports the time to open the new sockets, the worker's
+RSS, the ping -> pong round trip on `--samples` random sockets, and the
+delay from POST /api/chats/send/ until the receiver's socket has the
+message.new frame. Clients answer the server's keepalive pings. Client and
+worker share the machine, so on few cores the numbers include client CPU.
+
+    python -m benchmarks.websocket_load --connections 1000 5000 10000
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import resource
+import time
+
+from .harness import asgi_server, parser, report, rss_mb, setup, summary, test_database
+
+OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x8, 0x9, 0xA
+
+
+def encode_frame(opcode, payload):
+    # Client frames are always masked
+    mask = os.urandom(4)
+    length = len(payload)
+    if length < 126:
+        header = bytes([0x80 | opcode, 0x80 | length])
+    elif length < 65536:
+        header = bytes([0x80 | opcode, 0x80 | 126]) + length.to_bytes(2, 'big')
+    else:
+        header = bytes([0x80 | opcode, 0x80 | 127]) + length.to_bytes(8, 'big')
+    return header + mask + bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+async def read_frame(reader):
+    head = await reader.readexactly(2)
+    length = head[1] & 0x7F
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), 'big')
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), 'big')
+    return head[0] & 0x0F, await reader.readexactly(length)
+
+
+class Client:
+    """A minimal WebSocket client: text frames land in `frames`, pings are answered."""
+
+    @classmethod
+    async def connect(cls, port, token):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write((
+            f'GET /ws/chats/?token={token} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n'
+            f'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+            f'Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n'
+        ).encode())
+        handshake = await reader.readuntil(b'\r\n\r\n')
+        if not handshake.startswith(b'HTTP/1.1 101'):
+            raise ConnectionError(handshake.split(b'\r\n', 1)[0].decode())
+        client = cls(reader, writer)
+        client.task = asyncio.ensure_future(client.run())
+        return client
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.frames = asyncio.Queue()
+
+    async def run(self):
+        try:
+            while True:
+                opcode, payload = await read_frame(self.reader)
+                if opcode == OP_PING:
+                    self.writer.write(encode_frame(OP_PONG, payload))
+                elif opcode == OP_TEXT:
+                    self.frames.put_nowait(json.loads(payload))
+                elif opcode == OP_CLOSE:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self.frames.put_nowait(None)
+
+    async def send(self, data):
+        self.writer.write(encode_frame(OP_TEXT, json.dumps(data).encode()))
+        await self.writer.drain()
+
+    async def receive(self):
+        frame = await asyncio.wait_for(self.frames.get(), 30)
+        if frame is None:
+            raise ConnectionError('socket closed by the server')
+        return frame
+
+
+async def post_message(port, token, receiver_id, content):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps({'receiver': receiver_id, 'content': content}).encode()
+    writer.write((
+        f'POST /api/chats/send/ HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n'
+        f'Authorization: Bearer {token}\r\nContent-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'
+    ).encode() + body)
+    response = await reader.read()
+    writer.close()
+    if not response.startswith(b'HTTP/1.1 201'):
+        raise AssertionError(response[:500])
+
+
+async def load(port, pid, users, tokens, levels, samples):
+    sender, receivers = users[0], users[1:]
+    sender_token, receiver_tokens = tokens[0], tokens[1:]
+    rng = random.Random(42)
+    idle_rss = rss_mb(pid)
+    clients = []
+    handshakes = asyncio.Semaphore(100)
+
+    async def open_one(index):
+        async with handshakes:
+            return await Client.connect(port, receiver_tokens[index])
+
+    rows = []
+    for level in levels:
+        started = time.perf_counter()
+        clients += await asyncio.gather(*(open_one(index) for index in range(len(clients), level)))
+        connect_s = time.perf_counter() - started
+        # Let the worker settle (handshake buffers, auth threads) before reading its RSS
+        await asyncio.sleep(2)
+        rss = rss_mb(pid)
+
+        picked = rng.sample(range(level), min(samples, level))
+        pings = []
+        for index in picked:
+            start = time.perf_counter()
+            await clients[index].send({'type': 'ping'})
+            assert await clients[index].receive() == {'type': 'pong'}
+            pings.append(time.perf_counter() - start)
+
+        pushes = []
+        for index in picked:
+            start = time.perf_counter()
+            _, frame = await asyncio.gather(
+                post_message(port, sender_token, receivers[index].pk, f'load test {level}'),
+                clients[index].receive(),
+            )
+            assert frame['type'] == 'message.new', frame
+            pushes.append(time.perf_counter() - start)
+
+        closed = sum(client.task.done() for client in clients)
+        rows.append({
+            'connections': level,
+            'connect_s': round(connect_s, 1),
+            'worker_rss_mb': rss,
+            'kb_per_socket': round((rss - idle_rss) * 1024 / level, 1),
+            **{f'ping_{key}': value for key, value in summary(pings).items() if key != 'max_ms'},
+            **{f'push_{key}': value for key, value in summary(pushes).items() if key != 'max_ms'},
+            'dropped': closed,
+        })
+    for client in clients:
+        client.writer.close()
+    return idle_rss, rows
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--connections', type=int, nargs='+', default=[1000, 2000, 5000, 10000])
+    args.add_argument('--samples', type=int, default=100)
+    args = args.parse_args()
+    setup()
+
+    from django.test import override_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from accounts.models import User
+
+    # One socket per client-side descriptor; the worker needs as many
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    levels = sorted(args.connections)
+    if levels[-1] > hard - 200:
+        raise SystemExit(f'open file limit is {hard}: lower --connections or raise the limit')
+
+    settings = override_settings(
+        CACHES={
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'websocket-load-{alias}'}
+            for alias in ('default', 'shared')
+        },
+        CHAT_PUBSUB={'BACKEND': 'chats.pubsub.InProcessBroker', 'OPTIONS': {'queue_size': 100}},
+    )
+    with settings, test_database(shared=True):
+        started = time.perf_counter()
+        User.objects.bulk_create(
+            User(mobile_number=f'+9171{i:08d}', name=f'Socket user {i}') for i in range(levels[-1] + 1)
+        )
+        users = list(User.objects.order_by('id'))
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+        print(f'seeded {len(users)} users and tokens in {time.perf_counter() - started:.0f}s')
+
+        with asgi_server() as (port, [pid]):
+            idle_rss, rows = asyncio.run(load(port, pid, users, tokens, levels, args.samples))
+        report(
+            f'one uvicorn worker (idle RSS {idle_rss} MiB), {os.cpu_count()} CPU(s) shared with the client, '
+            f'{args.samples} sampled sockets per level',
+            rows,
+        )
+
+
+if __name__ == '__main__':
+    main()
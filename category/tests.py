@@ -1,3 +1,34 @@
+from asgiref.sync import sync_to_async
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Category
+
+
+class AsyncCategoryListTests(TestCase):
+    QUERIES = [
+        '',
+        '?type=business',
+        '?search=tech',
+        '?search=shop,design',
+        '?ordering=-category_name',
+        '?ordering=type,-id',
+        '?ordering=unknown',
+        '?category_name=Plumbing',
+        '?id=x',
+        '?type=nope',
+        '?search=zzz',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        for name, kind in [('Plumbing', 'professional'), ('Tech Shop', 'business'),
+                           ('Design Studio', 'business'), ('Tech Support', 'professional')]:
+            Category.objects.create(category_name=name, type=kind, icon=f'category_icons/{name}.png')
+
+    async def test_matches_the_sync_list(self):
+        for query in self.QUERIES:
+            with self.subTest(query=query):
+                expected = await sync_to_async(self.client.get)(f'/api/category/{query}')
+                response = await self.async_client.get(f'/api/category/async/{query}')
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
@@ -1,8 +1,9 @@
 # category/urls.py
 from django.urls import path
-from .views import CategoryListView,CategoryDetailView
+from .views import CategoryListView,CategoryDetailView,AsyncCategoryListView
 
 urlpatterns = [
     path('', CategoryListView.as_view(), name='category-list'),
+    path('async/', AsyncCategoryListView.as_view(), name='category-list-async'),
     path('category/<int:pk>/', CategoryDetailView.as_view(), name='category-detail'),
 ]
@@ -4,8 +4,10 @@ from django_filters.rest_framework import DjangoFilterBackend
 from .models import Category
 from .serializers import CategorySerializer
 from rest_framework.generics import RetrieveAPIView
-from rest_framework.exceptions import NotFound
-from accounts.utils import api_response
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+from accounts.utils import api_response, _extract_single_error_message
+from accounts.async_api import AsyncAPIView, json_api_response
  
 
 class CategoryListView(generics.ListCreateAPIView):
@@ -45,6 +47,44 @@ class CategoryListView(generics.ListCreateAPIView):
             status_code=status.HTTP_201_CREATED
         )
 
+class AsyncCategoryListView(AsyncAPIView):
+    """
+    Async variant of CategoryListView's list, served with the async ORM.
+    Filtering, ?search= and ?ordering= go through CategoryListView's own
+    filter backends, which only build the queryset.
+    """
+    authentication_required = False
+
+    def get_queryset(self, request):
+        view = CategoryListView(request=Request(request), args=(), kwargs={}, format_kwarg=None)
+        return view.filter_queryset(view.get_queryset())
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            queryset = self.get_queryset(request)
+        except ValidationError as e:
+            # Same envelope as the exception handler gives CategoryListView
+            return json_api_response(
+                success=False,
+                message=_extract_single_error_message(e.detail),
+                data=None,
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        categories = [category async for category in queryset]
+        if not categories:
+            return json_api_response(
+                success=False,
+                message="No categories found.",
+                data=[],
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        serializer = CategorySerializer(categories, many=True, context={"request": request})
+        return json_api_response(
+            success=True,
+            message="Category list retrieved successfully.",
+            data=serializer.data
+        )
+
 class CategoryDetailView(RetrieveAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -1,5 +1,19 @@
 from django.contrib import admin
-from .models import Message
+from .models import Message, Conversation, ConversationMember
 
 admin.site.register(Message)
 
+
+class ConversationMemberInline(admin.TabularInline):
+    model = ConversationMember
+    extra = 0
+    raw_id_fields = ('user', 'peer')
+    readonly_fields = ('unread_count', 'last_message_at')
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user_low', 'user_high', 'last_message_snippet', 'last_message_at')
+    search_fields = ('user_low__mobile_number', 'user_high__mobile_number')
+    raw_id_fields = ('user_low', 'user_high', 'last_message')
+    inlines = [ConversationMemberInline]
@@ -0,0 +1,77 @@
+# chats/conversations.py
+"""
+Maintenance of the denormalized Conversation / ConversationMember rows.
+
+Every helper here is meant to run inside the same transaction as the message
+write it reflects, so the chat list and the messages never disagree.
+"""
+from django.db.models import Case, F, IntegerField, When
+from django.db.models.functions import Greatest
+
+from .models import Conversation, ConversationMember
+
+SNIPPET_LENGTH = 200
+
+
+def pair_key(user_a_id, user_b_id):
+    return (user_a_id, user_b_id) if user_a_id <= user_b_id else (user_b_id, user_a_id)
+
+
+def get_or_create_conversation(user_a_id, user_b_id):
+    """Return the conversation of a pair, creating it and its member rows if needed."""
+    low, high = pair_key(user_a_id, user_b_id)
+    conversation, created = Conversation.objects.get_or_create(user_low_id=low, user_high_id=high)
+    if created:
+        members = [ConversationMember(conversation=conversation, user_id=low, peer_id=high)]
+        if low != high:
+            members.append(ConversationMember(conversation=conversation, user_id=high, peer_id=low))
+        ConversationMember.objects.bulk_create(members, ignore_conflicts=True)
+    return conversation
+
+
+def snippet(content):
+    content = " ".join(content.split())
+    if len(content) <= SNIPPET_LENGTH:
+        return content
+    return content[:SNIPPET_LENGTH - 1] + "…"
+
+
+def get_conversation_id(user_a_id, user_b_id):
+    low, high = pair_key(user_a_id, user_b_id)
+    return Conversation.objects.filter(user_low_id=low, user_high_id=high).values_list('id', flat=True).first()
+
+
+def record_message(message):
+    """Point the conversation at `message` and bump the receiver's unread count."""
+    if message.conversation_id is not None:
+        conversation = Conversation(pk=message.conversation_id)
+    else:
+        conversation = get_or_create_conversation(message.sender_id, message.receiver_id)
+    Conversation.objects.filter(pk=conversation.pk).update(
+        last_message=message,
+        last_message_snippet=snippet(message.content),
+        last_message_at=message.timestamp,
+    )
+    # One UPDATE for both members
+    unread = F('unread_count')
+    if message.sender_id != message.receiver_id:
+        unread = Case(
+            When(user_id=message.receiver_id, then=F('unread_count') + 1),
+            default=F('unread_count'),
+            output_field=IntegerField(),
+        )
+    ConversationMember.objects.filter(conversation=conversation).update(
+        last_message_at=message.timestamp,
+        unread_count=unread,
+    )
+    return conversation
+
+
+def mark_conversation_read(receiver_id, sender_id, count):
+    """Take `count` messages from `sender_id` off `receiver_id`'s unread counter."""
+    if count <= 0:
+        return
+    low, high = pair_key(receiver_id, sender_id)
+    ConversationMember.objects.filter(
+        conversation__user_low_id=low, conversation__user_high_id=high, user_id=receiver_id,
+    ).update(unread_count=Greatest(F('unread_count') - count, 0, output_field=IntegerField()))
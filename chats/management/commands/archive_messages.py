@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from chats.models import Message, ArchivedMessage
+
+
+class Command(BaseCommand):
+    help = (
+        "Move read messages older than the cutoff from chats_message into the "
+        "compressed chats_archivedmessage table, in batches. Conversation "
+        "history, sync and message search serve archived rows (their search "
+        "tokens and sync log rows are kept); the inbox does not."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.MESSAGE_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        # Unread messages stay hot: they still count towards unread badges
+        candidates = Message.objects.filter(timestamp__lt=cutoff, is_read=True).order_by('id')
+        total = 0
+        while True:
+            with transaction.atomic():
+                messages = list(
+                    candidates.select_for_update()
+                    .only('id', 'sender_id', 'receiver_id', 'conversation_id', 'content', 'timestamp', 'is_read')
+                    [:options['batch_size']]
+                )
+                if not messages:
+                    break
+                ArchivedMessage.objects.bulk_create(
+                    [ArchivedMessage.from_message(message) for message in messages], ignore_conflicts=True,
+                )
+                Message.objects.filter(id__in=[message.id for message in messages]).delete()
+            total += len(messages)
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} messages older than {cutoff:%Y-%m-%d}."))
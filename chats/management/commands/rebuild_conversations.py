@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.db.models.functions import Greatest, Least
+
+from chats.conversations import get_or_create_conversation, snippet
+from chats.models import Message, Conversation, ConversationMember
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild Conversation and ConversationMember rows (last message, unread "
+        "counts) from the message table and link messages to their conversation. "
+        "Run once after deploying conversations, or to repair drifted counters."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        # Latest message per pair; ids grow with timestamp (auto_now_add)
+        pairs = list(
+            Message.objects
+            .annotate(low=Least('sender_id', 'receiver_id'), high=Greatest('sender_id', 'receiver_id'))
+            .values('low', 'high')
+            .annotate(last_id=Max('id'))
+            .order_by()
+        )
+        unread = {
+            (row['receiver_id'], row['sender_id']): row['n']
+            for row in Message.objects.filter(is_read=False)
+            .values('receiver_id', 'sender_id').annotate(n=Count('id')).order_by()
+        }
+
+        batch_size = options['batch_size']
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            last_messages = Message.objects.in_bulk([pair['last_id'] for pair in batch])
+            with transaction.atomic():
+                for pair in batch:
+                    low, high = pair['low'], pair['high']
+                    message = last_messages[pair['last_id']]
+                    conversation = get_or_create_conversation(low, high)
+                    # Link messages sent before Message.conversation existed
+                    Message.objects.filter(
+                        Q(sender_id=low, receiver_id=high) | Q(sender_id=high, receiver_id=low),
+                        conversation__isnull=True,
+                    ).update(conversation=conversation)
+                    Conversation.objects.filter(pk=conversation.pk).update(
+                        last_message=message,
+                        last_message_snippet=snippet(message.content),
+                        last_message_at=message.timestamp,
+                    )
+                    for user_id, peer_id in {(low, high), (high, low)}:
+                        ConversationMember.objects.filter(conversation=conversation, user_id=user_id).update(
+                            last_message_at=message.timestamp,
+                            unread_count=unread.get((user_id, peer_id), 0) if user_id != peer_id else 0,
+                        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(pairs)} conversations."))
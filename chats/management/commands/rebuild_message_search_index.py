@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from chats.models import Message
+from chats.search import index_messages
+
+
+class Command(BaseCommand):
+    help = "Rebuild the message search tokens for all messages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = index_messages(Message.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} messages."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0002_conversation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['receiver', '-timestamp', '-id'], name='chats_msg_inbox_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0003_message_inbox_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['receiver', 'is_read'], name='chats_msg_receiver_unread_idx'),
+        ),
+    ]
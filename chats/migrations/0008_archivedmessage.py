@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0007_messagesearchtoken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMessage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('body', models.BinaryField()),
+                ('is_compressed', models.BooleanField(default=False)),
+                ('timestamp', models.DateTimeField()),
+                ('is_read', models.BooleanField(default=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('conversation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_messages', to='chats.conversation')),
+                ('receiver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived message',
+                'verbose_name_plural': 'Archived messages',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['conversation', '-timestamp', '-id'], name='chats_archive_history_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_seq(apps, schema_editor):
+    # Existing rows keep their id order, numbered per user
+    MessageChange = apps.get_model('chats', 'MessageChange')
+    SyncSequence = apps.get_model('chats', 'SyncSequence')
+    last_seq = {}
+    batch_size = 5000
+    last_id = 0
+    while True:
+        changes = list(MessageChange.objects.filter(id__gt=last_id).order_by('id').only('id', 'user_id')[:batch_size])
+        if not changes:
+            break
+        for change in changes:
+            change.seq = last_seq[change.user_id] = last_seq.get(change.user_id, 0) + 1
+        MessageChange.objects.bulk_update(changes, ['seq'])
+        last_id = changes[-1].id
+    SyncSequence.objects.bulk_create(
+        [SyncSequence(user_id=user_id, last_seq=seq) for user_id, seq in last_seq.items()],
+        batch_size=batch_size,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0008_archivedmessage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncSequence',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_seq', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Sync sequence',
+                'verbose_name_plural': 'Sync sequences',
+            },
+        ),
+        migrations.AddField(
+            model_name='messagechange',
+            name='seq',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(backfill_seq, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='messagechange',
+            name='seq',
+            field=models.BigIntegerField(),
+        ),
+        migrations.RemoveIndex(
+            model_name='messagechange',
+            name='chats_change_user_seq_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='messagechange',
+            constraint=models.UniqueConstraint(fields=('user', 'seq'), name='chats_change_user_seq_uniq'),
+        ),
+    ]
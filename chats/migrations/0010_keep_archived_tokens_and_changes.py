@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0009_syncsequence_messagechange_seq'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='messagechange',
+            name='message',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='changes', to='chats.message'),
+        ),
+        migrations.AlterField(
+            model_name='messagesearchtoken',
+            name='message',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='search_tokens', to='chats.message'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 # messages/models.py
+import zlib
+
 from django.db import models
 from accounts.models import User # Import your User model from the accounts app
 
@@ -11,12 +13,221 @@ class Message(models.Model):
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False) # To track if the message has been read
+    # Normalized pair key: both directions of a two-party thread share it, so
+    # history is one (conversation, timestamp, id) range scan instead of an OR
+    # over sender/receiver. Older rows are filled in by rebuild_conversations.
+    conversation = models.ForeignKey(
+        'Conversation', on_delete=models.SET_NULL, null=True, blank=True, related_name='messages'
+    )
 
     class Meta:
         ordering = ['-timestamp'] # Order messages by newest first
         verbose_name = "Message"
         verbose_name_plural = "Messages"
+        indexes = [
+            # Inbox pages: WHERE receiver = ? ORDER BY timestamp DESC, id DESC
+            models.Index(fields=['receiver', '-timestamp', '-id'], name='chats_msg_inbox_idx'),
+            # Unread COUNT(*) per receiver and the mark-read UPDATEs
+            models.Index(fields=['receiver', 'is_read'], name='chats_msg_receiver_unread_idx'),
+            # Conversation history: WHERE conversation = ? ORDER BY timestamp DESC, id DESC
+            models.Index(fields=['conversation', '-timestamp', '-id'], name='chats_msg_history_idx'),
+        ]
 
     def __str__(self):
         # Displays the first 50 characters of the message content
-        return f"From {self.sender.name} to {self.receiver.name}: {self.content[:50]}..."
\ No newline at end of file
+        return f"From {self.sender.name} to {self.receiver.name}: {self.content[:50]}..."
+
+class Conversation(models.Model):
+    """
+    One row per pair of users, kept up to date on every send so the chat list
+    never has to group the message table. The pair is stored in a normalized
+    order (user_low < user_high) so each pair maps to exactly one row.
+    """
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_snippet = models.CharField(max_length=200, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Conversation"
+        verbose_name_plural = "Conversations"
+        constraints = [
+            models.UniqueConstraint(fields=['user_low', 'user_high'], name='chats_conversation_pair_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Conversation {self.user_low_id} <-> {self.user_high_id}"
+
+
+class ConversationMember(models.Model):
+    """
+    A participant's view of a conversation: who the other side is, how many
+    messages they haven't read and when it was last active. The chat list is
+    an index range scan over (user, last_message_at).
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='members')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversation_memberships')
+    peer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    unread_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Conversation member"
+        verbose_name_plural = "Conversation members"
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'user'], name='chats_member_conversation_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_message_at', '-id'], name='chats_member_activity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} in conversation {self.conversation_id} ({self.unread_count} unread)"
+
+
+
+class MessageChange(models.Model):
+    """
+    Per-user change log backing delta sync. `seq` numbers a user's changes
+    1, 2, 3... (allocated from their SyncSequence row, see chats.sync); a
+    sync call reads one (user, seq) index range after the client's cursor.
+    Both participants get a row when a message is created or marked read.
+    """
+    CREATED = 'created'
+    READ = 'read'
+    KIND_CHOICES = [
+        (CREATED, 'Created'),
+        (READ, 'Read'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    seq = models.BigIntegerField()
+    # No constraint: the row outlives the hot message when archive_messages
+    # moves it to ArchivedMessage (same id); see load_messages()
+    message = models.ForeignKey(
+        Message, on_delete=models.DO_NOTHING, db_constraint=False, related_name='changes'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Message change"
+        verbose_name_plural = "Message changes"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'seq'], name='chats_change_user_seq_uniq'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.kind} message {self.message_id} for user {self.user_id}"
+
+
+class SyncSequence(models.Model):
+    """
+    Last MessageChange.seq handed out for a user. Writers lock the row
+    (SELECT ... FOR UPDATE) until their transaction commits, so a user's
+    changes become visible in seq order.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    last_seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Sync sequence"
+        verbose_name_plural = "Sync sequences"
+
+    def __str__(self):
+        return f"{self.user_id}: {self.last_seq}"
+
+
+class MessageSearchToken(models.Model):
+    """
+    Inverted index for message search (chats.search). Each participant owns a
+    copy of a message's tokens, so a search only touches the requesting
+    user's (owner, token) index range.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    token = models.CharField(max_length=32)
+    # No constraint, so archived messages stay searchable (see MessageChange.message)
+    message = models.ForeignKey(
+        Message, on_delete=models.DO_NOTHING, db_constraint=False, related_name='search_tokens'
+    )
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        verbose_name = "Message search token"
+        verbose_name_plural = "Message search tokens"
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'token', 'message'], name='chats_msg_token_owner_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> message {self.message_id} (user {self.owner_id})"
+
+
+
+class ArchivedMessage(models.Model):
+    """
+    Cold storage for old, read messages (see the archive_messages command).
+    Rows keep the original message id, so history cursors stay valid across
+    the hot/archive boundary. Content is zlib-compressed when that saves space.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    conversation = models.ForeignKey(
+        Conversation, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_messages'
+    )
+    body = models.BinaryField()
+    is_compressed = models.BooleanField(default=False)
+    timestamp = models.DateTimeField()
+    is_read = models.BooleanField(default=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+        verbose_name = "Archived message"
+        verbose_name_plural = "Archived messages"
+        indexes = [
+            models.Index(fields=['conversation', '-timestamp', '-id'], name='chats_archive_history_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived message {self.pk} from {self.sender_id} to {self.receiver_id}"
+
+    @property
+    def content(self):
+        body = bytes(self.body)
+        if self.is_compressed:
+            body = zlib.decompress(body)
+        return body.decode()
+
+    @classmethod
+    def from_message(cls, message):
+        raw = message.content.encode()
+        compressed = zlib.compress(raw, 6)
+        is_compressed = len(compressed) < len(raw)
+        return cls(
+            id=message.id,
+            sender_id=message.sender_id,
+            receiver_id=message.receiver_id,
+            conversation_id=message.conversation_id,
+            body=compressed if is_compressed else raw,
+            is_compressed=is_compressed,
+            timestamp=message.timestamp,
+            is_read=message.is_read,
+        )
+
+
+def load_messages(ids):
+    """
+    {id: message} for `ids`, from the hot table or, for messages moved by
+    archive_messages, from ArchivedMessage (both read the same way). Ids in
+    neither table (messages deleted with their sender's account) are left
+    out.
+    """
+    messages = Message.objects.in_bulk(ids)
+    missing = set(ids) - messages.keys()
+    if missing:
+        messages.update(ArchivedMessage.objects.in_bulk(missing))
+    return messages
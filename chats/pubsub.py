@@ -0,0 +1,268 @@
+# chats/pubsub.py
+"""
+Pub/sub layer delivering chat events to connected WebSocket clients.
+
+Views publish (synchronously, after their transaction commits) to a user id;
+every socket of that user subscribed through the broker gets the event. Pick
+a backend with ``CHAT_PUBSUB`` in settings (without it: InProcessBroker
+under DEBUG, RespBroker on localhost otherwise):
+
+    # Single process only (runserver)
+    CHAT_PUBSUB = {"BACKEND": "chats.pubsub.InProcessBroker"}
+
+    # Any number of processes/hosts: fan out through a RESP server (Redis, Valkey)
+    CHAT_PUBSUB = {
+        "BACKEND": "chats.pubsub.RespBroker",
+        "OPTIONS": {"host": "127.0.0.1", "port": 6379},
+    }
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from accounts.resp import RespClient, encode_command, read_reply_async
+from .serializers import MessageCompactSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One socket's view of the broker: a bounded queue living on the event loop
+    that created it. A subscriber that falls `queue_size` events behind is
+    marked overflowed; the socket then closes so the client resyncs.
+    """
+
+    def __init__(self, broker, user_id, queue_size):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Must run on self.loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def close(self):
+        await self.broker.unsubscribe(self)
+
+
+class BaseBroker:
+    """Interface every pub/sub backend implements."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        raise NotImplementedError
+
+    async def subscribe(self, user_id):
+        subscription = Subscription(self, user_id, self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def _local_subscribers(self, user_id):
+        with self._lock:
+            return list(self._subscribers.get(user_id, ()))
+
+
+class InProcessBroker(BaseBroker):
+    """
+    Delivers to sockets held by this process only. publish() is called from
+    sync view threads, so events are handed to each socket's loop with
+    call_soon_threadsafe.
+    """
+
+    def publish(self, user_id, event):
+        for subscription in self._local_subscribers(user_id):
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Loop already closed (worker shutting down)
+                pass
+
+
+class RespBroker(BaseBroker):
+    """
+    Cross-process broker over RESP PUBLISH/SUBSCRIBE, one channel per user.
+    Each process keeps a single subscriber connection, subscribed to the
+    channels of the users it holds sockets for, and fans messages out to
+    them locally. The connection is re-opened (and channels re-subscribed)
+    if the server goes away.
+    """
+    channel_prefix = "ubc:chats:user:"
+
+    def __init__(self, host="127.0.0.1", port=6379, db=0, password=None, timeout=2.0, queue_size=100):
+        super().__init__(queue_size=queue_size)
+        self.host = host
+        self.port = port
+        self.password = password
+        # Publishing happens from sync code in any thread
+        self.client = RespClient(host=host, port=port, db=db, password=password, timeout=timeout)
+        self._writer = None
+        self._listener = None
+        self._start_lock = None
+
+    def channel(self, user_id):
+        return f"{self.channel_prefix}{user_id}"
+
+    def publish(self, user_id, event):
+        self.client.execute("PUBLISH", self.channel(user_id), json.dumps(event, cls=DjangoJSONEncoder))
+
+    async def subscribe(self, user_id):
+        subscription = await super().subscribe(user_id)
+        if len(self._local_subscribers(user_id)) == 1:
+            await self._send("SUBSCRIBE", self.channel(user_id))
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        await super().unsubscribe(subscription)
+        if not self._local_subscribers(subscription.user_id):
+            await self._send("UNSUBSCRIBE", self.channel(subscription.user_id))
+
+    async def _send(self, *args):
+        # Replies to (UN)SUBSCRIBE arrive on the listener as push messages
+        if self._listener is None:
+            if self._start_lock is None:
+                self._start_lock = asyncio.Lock()
+            async with self._start_lock:
+                if self._listener is None:
+                    await self._connect()
+                    self._listener = asyncio.get_running_loop().create_task(self._listen())
+        try:
+            self._writer.write(encode_command(*args))
+            await self._writer.drain()
+        except (ConnectionError, OSError):
+            # The listener reconnects and re-subscribes every current channel
+            pass
+
+    async def close(self):
+        """Stop listening and drop the subscriber connection (worker shutdown)."""
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            writer.write(encode_command("AUTH", self.password))
+            await writer.drain()
+            await read_reply_async(reader)
+        with self._lock:
+            channels = [self.channel(user_id) for user_id in self._subscribers]
+        if channels:
+            writer.write(encode_command("SUBSCRIBE", *channels))
+            await writer.drain()
+        self._reader, self._writer = reader, writer
+
+    async def _reconnect(self):
+        self._writer.close()
+        delay = 0.5
+        while True:
+            try:
+                await self._connect()
+                return
+            except OSError:
+                logger.warning("Chat pub/sub server unreachable, retrying in %.1fs", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    async def _listen(self):
+        while True:
+            try:
+                reply = await read_reply_async(self._reader)
+            except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                await self._reconnect()
+                continue
+            if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                user_id = int(reply[1].decode()[len(self.channel_prefix):])
+                event = json.loads(reply[2])
+                for subscription in self._local_subscribers(user_id):
+                    subscription.deliver(event)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by ``CHAT_PUBSUB``."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = getattr(settings, "CHAT_PUBSUB", {})
+                default = "chats.pubsub.InProcessBroker" if settings.DEBUG else "chats.pubsub.RespBroker"
+                backend = import_string(config.get("BACKEND", default))
+                _broker = backend(**config.get("OPTIONS", {}))
+    return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    global _broker
+    if setting == "CHAT_PUBSUB":
+        _broker = None
+
+
+def publish_on_commit(user_id, event):
+    """Publish `event` to `user_id` once the current transaction commits."""
+    def publish():
+        try:
+            get_broker().publish(user_id, event)
+        except Exception:
+            # Delivery is best effort: clients catch up through the REST API
+            logger.exception("Could not publish chat event to user %s", user_id)
+    transaction.on_commit(publish)
+
+
+def notify_new_message(message):
+    publish_on_commit(message.receiver_id, {
+        "type": "message.new",
+        "message": MessageCompactSerializer(message).data,
+    })
+
+
+def notify_messages_read(sender_id, reader_id, ids=None, up_to_id=None, up_to_timestamp=None):
+    """
+    Read receipt for `sender_id`: either the exact message ids, or a watermark
+    (everything `reader_id` received from them up to the id/timestamp; both
+    None means everything).
+    """
+    event = {"type": "messages.read", "reader": reader_id}
+    if ids is not None:
+        event["ids"] = ids
+    else:
+        event["up_to_id"] = up_to_id
+        event["up_to_timestamp"] = up_to_timestamp
+    publish_on_commit(sender_id, event)
@@ -0,0 +1,101 @@
+# chats/search.py
+"""
+Search over a user's sent and received messages, backed by the
+MessageSearchToken side table.
+
+Message content is split with the directory tokenizer (accounts.search). A
+search term matches tokens by prefix within the requesting user's own rows
+- an index range scan on (owner, token) - and messages are ranked by how
+often the terms occur, newest first on ties. Results carry the content with
+the matching words wrapped in <mark>. Tokens are kept when archive_messages
+moves a message out of the hot table, so archived messages stay searchable.
+"""
+import re
+from collections import Counter
+
+from django.db.models import Q, Sum
+from django.utils.html import escape
+
+from accounts.search import prefix_range, tokenize
+from .models import MessageSearchToken, load_messages
+
+MAX_TOKENS_PER_MESSAGE = 200
+MAX_WEIGHT = 5
+
+_word_re = re.compile(r'\w+', re.UNICODE)
+
+
+def build_tokens(message):
+    """Return {token: weight} for a message; weight is the (capped) occurrence count."""
+    counts = Counter(tokenize(message.content))
+    return {token: min(count, MAX_WEIGHT) for token, count in counts.most_common(MAX_TOKENS_PER_MESSAGE)}
+
+
+def _token_rows(message):
+    tokens = build_tokens(message)
+    return [
+        MessageSearchToken(owner_id=owner_id, token=token, message_id=message.id, weight=weight)
+        for owner_id in {message.sender_id, message.receiver_id}
+        for token, weight in tokens.items()
+    ]
+
+
+def index_message(message):
+    MessageSearchToken.objects.bulk_create(_token_rows(message))
+
+
+def index_messages(queryset, batch_size=1000):
+    """(Re)build tokens for many messages, one DELETE and one INSERT per batch."""
+    queryset = queryset.only('id', 'sender_id', 'receiver_id', 'content').order_by('id')
+    last_id = 0
+    total = 0
+    while True:
+        messages = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not messages:
+            return total
+        ids = [message.id for message in messages]
+        MessageSearchToken.objects.filter(message_id__in=ids).delete()
+        MessageSearchToken.objects.bulk_create(
+            [row for message in messages for row in _token_rows(message)],
+            batch_size=batch_size,
+        )
+        total += len(messages)
+        last_id = ids[-1]
+
+
+def search_messages(owner_id, query):
+    """
+    Return a queryset of {'message_id', 'score'} rows for `owner_id`, ready
+    for KeysetPaginator(ordering=('-score', '-message_id')).
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return MessageSearchToken.objects.none().values('message_id')
+
+    matches = Q()
+    for term in terms:
+        matches |= prefix_range(term)
+    return (
+        MessageSearchToken.objects.filter(matches, owner_id=owner_id)
+        .values('message_id').annotate(score=Sum('weight'))
+    )
+
+
+def load_ranked_messages(rows):
+    """Fetch the messages (hot or archived) for a page of search rows, keeping the ranked order."""
+    messages = load_messages([row['message_id'] for row in rows])
+    return [messages[row['message_id']] for row in rows if row['message_id'] in messages]
+
+
+def highlight(content, query):
+    """HTML-escaped `content` with words matching a query term wrapped in <mark>."""
+    terms = tuple(set(tokenize(query)))
+    parts = []
+    position = 0
+    for match in _word_re.finditer(content):
+        if match.group().lower().startswith(terms):
+            parts.append(escape(content[position:match.start()]))
+            parts.append(f"<mark>{escape(match.group())}</mark>")
+            position = match.end()
+    parts.append(escape(content[position:]))
+    return "".join(parts)
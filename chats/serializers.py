@@ -1,6 +1,8 @@
 # messages/serializers.py
+from django.conf import settings
 from rest_framework import serializers
-from .models import Message # Import the Message model from the current app
+from .models import Message, ConversationMember, ArchivedMessage # Import the Message model from the current app
+from .search import highlight
 from accounts.serializers import UserSerializer # Import UserSerializer from accounts app
 
 class MessageListSerializer(serializers.ModelSerializer):
@@ -15,6 +17,55 @@ class MessageListSerializer(serializers.ModelSerializer):
         fields = ['id', 'sender', 'receiver', 'content', 'timestamp', 'is_read', 'sender_details']
         read_only_fields = ['sender', 'receiver', 'timestamp']
 
+class MessageCompactSerializer(serializers.ModelSerializer):
+    """
+    Inbox row without the embedded sender profile. Used by the side-loaded
+    response shape, where each distinct sender is serialized once under
+    included.users instead of once per message.
+    """
+    class Meta:
+        model = Message
+        fields = ['id', 'sender', 'receiver', 'content', 'timestamp', 'is_read']
+        read_only_fields = ['sender', 'receiver', 'timestamp']
+
+
+class ArchivedMessageSerializer(serializers.ModelSerializer):
+    """
+    Archived message in the same shape as MessageCompactSerializer, so history
+    pages can mix hot and archived rows.
+    """
+    content = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = ArchivedMessage
+        fields = ['id', 'sender', 'receiver', 'content', 'timestamp', 'is_read']
+        read_only_fields = fields
+
+
+class MessageSearchResultSerializer(MessageCompactSerializer):
+    """
+    A message search hit: the compact row plus its relevance score and the
+    HTML-escaped content with matching words wrapped in <mark>. Expects the
+    search query in context['query'] and `score` set on each message.
+    """
+    score = serializers.IntegerField(read_only=True)
+    highlighted = serializers.SerializerMethodField()
+
+    class Meta(MessageCompactSerializer.Meta):
+        fields = MessageCompactSerializer.Meta.fields + ['score', 'highlighted']
+
+    def get_highlighted(self, obj):
+        return highlight(obj.content, self.context.get('query', ''))
+
+
+def side_load_users(messages, context=None):
+    """Serialize each distinct sender of `messages` once, keyed by id."""
+    senders = {}
+    for message in messages:
+        senders.setdefault(message.sender_id, message.sender)
+    data = UserSerializer(list(senders.values()), many=True, context=context).data
+    return {str(user['id']): user for user in data}
+
 class MessageCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for sending a new message.
@@ -22,4 +73,43 @@ class MessageCreateSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Message
-        fields = ['id', 'receiver', 'content'] # 'sender' is set by the view, 'timestamp' is auto_now_add
\ No newline at end of file
+        fields = ['id', 'receiver', 'content'] # 'sender' is set by the view, 'timestamp' is auto_now_add
+
+class ConversationSerializer(serializers.ModelSerializer):
+    """
+    A row of the chat list, read from the requesting user's ConversationMember.
+    """
+    id = serializers.IntegerField(source='conversation_id', read_only=True)
+    peer = UserSerializer(read_only=True)
+    last_message_id = serializers.IntegerField(source='conversation.last_message_id', read_only=True)
+    last_message_snippet = serializers.CharField(source='conversation.last_message_snippet', read_only=True)
+
+    class Meta:
+        model = ConversationMember
+        fields = ['id', 'peer', 'last_message_id', 'last_message_snippet', 'last_message_at', 'unread_count']
+
+
+class MessageBulkReadSerializer(serializers.Serializer):
+    """
+    Body of the bulk mark-as-read endpoint. Either a list of message ids, or a
+    sender with an optional watermark (everything from that sender up to and
+    including up_to_id / up_to_timestamp; without one, everything from them).
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    sender = serializers.IntegerField(min_value=1, required=False)
+    up_to_id = serializers.IntegerField(min_value=1, required=False)
+    up_to_timestamp = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        ids = attrs.get('ids')
+        if ids is not None:
+            if any(key in attrs for key in ('sender', 'up_to_id', 'up_to_timestamp')):
+                raise serializers.ValidationError({"ids": "Send either ids or a sender watermark, not both."})
+            if len(ids) > settings.MESSAGE_BULK_READ_MAX_IDS:
+                raise serializers.ValidationError({"ids": f"At most {settings.MESSAGE_BULK_READ_MAX_IDS} ids per request."})
+            return attrs
+        if 'sender' not in attrs:
+            raise serializers.ValidationError({"sender": "Either ids or sender is required."})
+        if 'up_to_id' in attrs and 'up_to_timestamp' in attrs:
+            raise serializers.ValidationError({"up_to_id": "Send either up_to_id or up_to_timestamp, not both."})
+        return attrs
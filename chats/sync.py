@@ -0,0 +1,85 @@
+# chats/sync.py
+"""
+Delta sync: a per-user change log of created and read messages.
+
+Writers append MessageChange rows in the transaction that changes the
+message; readers page through their own rows by `seq` with an opaque cursor.
+Each user's seqs come from their SyncSequence row, which the writer locks
+until its transaction commits: a second writer for the same user waits for
+the first to commit before it gets the next number. Rows therefore become
+visible in seq order, and a cursor never moves past a row that commits
+later.
+
+Writers append their rows as the very last statement of the transaction
+(after any other row locks and counter updates), so the sequence row is
+held only for the commit itself.
+
+Log rows are kept when archive_messages moves their message out of the hot
+table; sync then returns the archived copy (chats.models.load_messages).
+"""
+from django.conf import settings
+
+from accounts.pagination import encode_cursor, decode_cursor, InvalidCursor
+from .models import MessageChange, SyncSequence
+
+
+def _append(changes):
+    """Number `changes` from each user's sequence and insert them."""
+    if not changes:
+        return
+    user_ids = sorted({change.user_id for change in changes})
+    # Locked in user order, so two writers never wait on each other crosswise
+    sequences = SyncSequence.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id')
+    locked = {sequence.user_id: sequence for sequence in sequences}
+    if len(locked) < len(user_ids):
+        SyncSequence.objects.bulk_create(
+            [SyncSequence(user_id=user_id) for user_id in user_ids if user_id not in locked],
+            ignore_conflicts=True,
+        )
+        locked = {sequence.user_id: sequence for sequence in sequences.all()}
+    for change in changes:
+        sequence = locked[change.user_id]
+        sequence.last_seq += 1
+        change.seq = sequence.last_seq
+    SyncSequence.objects.bulk_update(locked.values(), ['last_seq'])
+    MessageChange.objects.bulk_create(changes)
+
+
+def record_created(message):
+    users = {message.receiver_id, message.sender_id}
+    _append([MessageChange(user_id=user_id, message=message, kind=MessageChange.CREATED) for user_id in users])
+
+
+def record_reads(reader_id, targets):
+    """`targets`: (message id, sender id) pairs just marked read by `reader_id`."""
+    changes = []
+    for message_id, sender_id in targets:
+        for user_id in {reader_id, sender_id}:
+            changes.append(MessageChange(user_id=user_id, message_id=message_id, kind=MessageChange.READ))
+    _append(changes)
+
+
+def changes_since(user_id, cursor=None, limit=None):
+    """
+    Return `(changes, next_cursor, has_more)` for the changes of `user_id`
+    after `cursor` (None means from the start). Load the messages of created
+    changes with load_messages(). The returned cursor is always set; pass it
+    back on the next call.
+    """
+    limit = limit or settings.MESSAGE_SYNC_BATCH_SIZE
+    after = 0
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 1 or not isinstance(values[0], int):
+            raise InvalidCursor("Invalid cursor.")
+        after = values[0]
+
+    changes = list(
+        MessageChange.objects
+        .filter(user_id=user_id, seq__gt=after)
+        .order_by('seq')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    next_cursor = encode_cursor([changes[-1].seq if changes else after])
+    return changes, next_cursor, has_more
@@ -1,3 +1,518 @@
-from django.test import TestCase
+import asyncio
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from accounts.tests import start_fake_resp_server
+from accounts.utils import get_tokens_for_user
+from notifications.models import UnreadCounter
+from .models import ArchivedMessage, ConversationMember, Message, MessageChange, SyncSequence
+from .pubsub import RespBroker, get_broker
+from .views import MessageMarkAsReadView
+from .websocket import CLOSE_TRY_AGAIN_LATER, CLOSE_UNAUTHORIZED
+
+# Per-test, in-memory caches: the configured shared cache outlives test runs
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'chats-tests'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'chats-tests-shared'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES, CHAT_PUBSUB={'BACKEND': 'chats.pubsub.InProcessBroker'})
+class ChatTestCase(TestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.alice = User.objects.create(mobile_number='+919876501001', name='Alice')
+        self.bob = User.objects.create(mobile_number='+919876501002', name='Bob')
+        self.carol = User.objects.create(mobile_number='+919876501003', name='Carol')
+
+    def api(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def send(self, sender, receiver, content='hello'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api(sender).post('/api/chats/send/', {'receiver': receiver.pk, 'content': content})
+        self.assertEqual(response.status_code, 201, response.content)
+        return Message.objects.get(pk=response.json()['data']['id'])
+
+    def member(self, user, peer):
+        return ConversationMember.objects.get(user=user, peer=peer)
+
+
+class ConversationTests(ChatTestCase):
+    def test_sending_updates_both_members_in_one_conversation(self):
+        self.send(self.alice, self.bob, 'one')
+        self.send(self.bob, self.alice, 'two')
+        last = self.send(self.alice, self.bob, 'three')
+
+        self.assertEqual(self.member(self.bob, self.alice).unread_count, 2)
+        self.assertEqual(self.member(self.alice, self.bob).unread_count, 1)
+        bob_row = self.member(self.bob, self.alice)
+        self.assertEqual(bob_row.conversation.last_message_id, last.pk)
+        self.assertEqual(bob_row.conversation.last_message_snippet, 'three')
+        self.assertEqual(Message.objects.filter(conversation=bob_row.conversation).count(), 3)
+
+    def test_conversation_list_is_newest_first_with_unread_counts(self):
+        self.send(self.alice, self.bob)
+        self.send(self.carol, self.bob)
+        self.send(self.carol, self.bob)
+
+        response = self.api(self.bob).get('/api/chats/conversations/')
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()['data']
+        self.assertEqual([row['peer']['id'] for row in rows], [self.carol.pk, self.alice.pk])
+        self.assertEqual([row['unread_count'] for row in rows], [2, 1])
+
+    def test_single_mark_read_takes_one_off_and_never_goes_negative(self):
+        message = self.send(self.alice, self.bob)
+        member = self.member(self.bob, self.alice)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api(self.bob).patch(f'/api/chats/mark-read/{message.pk}/')
+        self.assertEqual(response.status_code, 200)
+        member.refresh_from_db()
+        self.assertEqual(member.unread_count, 0)
+
+        response = self.api(self.bob).patch(f'/api/chats/mark-read/{message.pk}/')
+        self.assertEqual(response.status_code, 400)
+        member.refresh_from_db()
+        self.assertEqual(member.unread_count, 0)
+
+    def test_concurrent_mark_read_counts_once(self):
+        self.send(self.alice, self.bob)
+        message = self.send(self.alice, self.bob)
+        # Both requests loaded the message while it was still unread
+        stale = [Message.objects.get(pk=message.pk) for _ in range(2)]
+
+        statuses = []
+        with mock.patch.object(MessageMarkAsReadView, 'get_object', side_effect=stale):
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    statuses.append(self.api(self.bob).patch(f'/api/chats/mark-read/{message.pk}/').status_code)
+
+        self.assertEqual(statuses, [200, 400])
+        self.assertEqual(self.member(self.bob, self.alice).unread_count, 1)
+        self.assertEqual(UnreadCounter.objects.get(user=self.bob).unread_messages, 1)
+        self.assertEqual(MessageChange.objects.filter(user=self.bob, kind=MessageChange.READ).count(), 1)
+
+
+class BulkMarkReadTests(ChatTestCase):
+    def mark_read(self, user, payload):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api(user).post('/api/chats/mark-read/', payload, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['data']['updated']
+
+    def test_watermark_marks_only_up_to_the_given_message(self):
+        messages = [self.send(self.alice, self.bob, f'm{i}') for i in range(4)]
+        self.send(self.carol, self.bob)
+
+        self.assertEqual(self.mark_read(self.bob, {'sender': self.alice.pk, 'up_to_id': messages[1].pk}), 2)
+
+        self.assertEqual(
+            list(Message.objects.filter(receiver=self.bob, is_read=False).order_by('id').values_list('id', flat=True)),
+            [messages[2].pk, messages[3].pk, Message.objects.get(sender=self.carol).pk],
+        )
+        self.assertEqual(self.member(self.bob, self.alice).unread_count, 2)
+        self.assertEqual(self.member(self.bob, self.carol).unread_count, 1)
+
+    def test_ids_across_senders_and_repeat_calls(self):
+        from_alice = self.send(self.alice, self.bob)
+        from_carol = self.send(self.carol, self.bob)
+        to_alice = self.send(self.bob, self.alice)
+
+        # Someone else's message is ignored
+        payload = {'ids': [from_alice.pk, from_carol.pk, to_alice.pk]}
+        self.assertEqual(self.mark_read(self.bob, payload), 2)
+        self.assertEqual(self.mark_read(self.bob, payload), 0)
+
+        self.assertEqual(self.member(self.bob, self.alice).unread_count, 0)
+        self.assertEqual(self.member(self.bob, self.carol).unread_count, 0)
+        self.assertEqual(self.member(self.alice, self.bob).unread_count, 1)
+
+    @override_settings(MESSAGE_BULK_READ_MAX=2)
+    def test_watermark_is_capped_oldest_first(self):
+        messages = [self.send(self.alice, self.bob, f'm{i}') for i in range(5)]
+
+        def mark_batch():
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.api(self.bob).post('/api/chats/mark-read/', {'sender': self.alice.pk}, format='json')
+            data = response.json()['data']
+            return data['updated'], data['has_more']
+
+        self.assertEqual(mark_batch(), (2, True))
+        self.assertEqual(
+            list(Message.objects.filter(receiver=self.bob, is_read=False).order_by('id').values_list('id', flat=True)),
+            [message.pk for message in messages[2:]],
+        )
+        self.assertEqual(mark_batch(), (2, True))
+        self.assertEqual(mark_batch(), (1, False))
+        self.assertFalse(Message.objects.filter(receiver=self.bob, is_read=False).exists())
+        self.assertEqual(self.member(self.bob, self.alice).unread_count, 0)
+        self.assertEqual(
+            sorted(MessageChange.objects.filter(user=self.bob, kind=MessageChange.READ).values_list('message_id', flat=True)),
+            [message.pk for message in messages],
+        )
+
+    def test_ids_and_watermark_are_exclusive(self):
+        response = self.api(self.bob).post(
+            '/api/chats/mark-read/', {'ids': [1], 'sender': self.alice.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MESSAGE_SYNC_BATCH_SIZE=2)
+class SyncTests(ChatTestCase):
+    def sync(self, user, cursor=None):
+        response = self.api(user).get('/api/chats/sync/', {'cursor': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        return body['data'], body['next_cursor']
+
+    def drain(self, user, cursor=None):
+        created, read_ids = [], []
+        while True:
+            data, cursor = self.sync(user, cursor)
+            created += [message['id'] for message in data['messages']]
+            read_ids += data['read_ids']
+            if not data['has_more']:
+                return created, read_ids, cursor
+
+    def test_batches_cover_every_change_once(self):
+        messages = [self.send(self.alice, self.bob, f'm{i}') for i in range(3)]
+        created, read_ids, cursor = self.drain(self.bob)
+        self.assertEqual(created, [message.pk for message in messages])
+        self.assertEqual(read_ids, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api(self.bob).post('/api/chats/mark-read/', {'sender': self.alice.pk}, format='json')
+        newer = self.send(self.carol, self.bob)
+
+        # Reads show up for both the reader and the sender
+        created, read_ids, _ = self.drain(self.bob, cursor)
+        self.assertEqual(created, [newer.pk])
+        self.assertEqual(sorted(read_ids), [message.pk for message in messages])
+        _, alice_reads, _ = self.drain(self.alice)
+        self.assertEqual(sorted(alice_reads), [message.pk for message in messages])
+
+    def test_changes_are_numbered_per_user(self):
+        first = self.send(self.alice, self.bob)
+        self.send(self.carol, self.bob)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api(self.bob).patch(f'/api/chats/mark-read/{first.pk}/')
+
+        for user, count in ((self.bob, 3), (self.alice, 2), (self.carol, 1)):
+            seqs = list(MessageChange.objects.filter(user=user).order_by('id').values_list('seq', flat=True))
+            self.assertEqual(seqs, list(range(1, count + 1)))
+            self.assertEqual(SyncSequence.objects.get(user=user).last_seq, count)
+
+    def test_pages_follow_seq_not_insert_order(self):
+        _, _, cursor = self.drain(self.bob)
+        late, early = self.send(self.alice, self.bob), self.send(self.carol, self.bob)
+        # Inserted in one order, committed (numbered) in the other
+        late_seq, early_seq = (
+            MessageChange.objects.get(user=self.bob, message=message).seq for message in (late, early)
+        )
+        MessageChange.objects.filter(user=self.bob, message=late).update(seq=0)
+        MessageChange.objects.filter(user=self.bob, message=early).update(seq=late_seq)
+        MessageChange.objects.filter(user=self.bob, message=late).update(seq=early_seq)
+
+        data, _ = self.sync(self.bob, cursor)
+        self.assertEqual([message['id'] for message in data['messages']], [early.pk, late.pk])
+
+    def test_invalid_cursor(self):
+        response = self.api(self.bob).get('/api/chats/sync/', {'cursor': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConversationHistoryTests(ChatTestCase):
+    def history(self, user, peer, page_size):
+        ids, cursor = [], None
+        while True:
+            params = {'page_size': page_size}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.api(user).get(f'/api/chats/conversations/{peer.pk}/messages/', params)
+            self.assertEqual(response.status_code, 200, response.content)
+            body = response.json()
+            self.assertLessEqual(len(body['data']), page_size)
+            ids += [message['id'] for message in body['data']]
+            cursor = body['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_both_directions_newest_first_on_every_page_size(self):
+        thread = []
+        for i in range(5):
+            thread.append(self.send(self.alice, self.bob, f'a{i}'))
+            thread.append(self.send(self.bob, self.alice, f'b{i}'))
+        self.send(self.carol, self.bob)
+        expected = [message.pk for message in sorted(thread, key=lambda m: (m.timestamp, m.pk), reverse=True)]
+
+        for page_size in (1, 3, 10, 50):
+            self.assertEqual(self.history(self.bob, self.alice, page_size), expected)
+            self.assertEqual(self.history(self.alice, self.bob, page_size), expected)
+
+    def test_no_thread(self):
+        response = self.api(self.alice).get(f'/api/chats/conversations/{self.carol.pk}/messages/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], [])
+
+
+class ArchivedHistoryTests(ConversationHistoryTests):
+    def age(self, message, days, is_read=True):
+        Message.objects.filter(pk=message.pk).update(timestamp=timezone.now() - timedelta(days=days), is_read=is_read)
+
+    def test_unread_old_message_does_not_hide_newer_archived_ones(self):
+        thread = [self.send(self.alice, self.bob, f'm{i}') for i in range(1, 6)]
+        # m1 is the oldest and still unread, so it stays in the hot table
+        self.age(thread[0], 120, is_read=False)
+        for message, days in zip(thread[1:], (110, 105, 100, 95)):
+            self.age(message, days)
+        newest = self.send(self.bob, self.alice, 'recent')
+
+        call_command('archive_messages', older_than_days=90, stdout=StringIO())
+
+        self.assertEqual(ArchivedMessage.objects.count(), 4)
+        self.assertEqual(list(Message.objects.values_list('id', flat=True).order_by('id')), [thread[0].pk, newest.pk])
+        expected = [newest.pk] + [message.pk for message in reversed(thread)]
+        for page_size in (1, 2, 3, 6, 50):
+            self.assertEqual(self.history(self.bob, self.alice, page_size), expected)
+
+    def test_archived_content_round_trips(self):
+        message = self.send(self.alice, self.bob, ' '.join(['archived words'] * 20))
+        self.age(message, 200)
+        call_command('archive_messages', older_than_days=90, stdout=StringIO())
+
+        response = self.api(self.bob).get(f'/api/chats/conversations/{self.alice.pk}/messages/')
+        self.assertEqual(response.json()['data'][0]['content'], ' '.join(['archived words'] * 20))
+
+    def test_archived_messages_stay_searchable(self):
+        message = self.send(self.alice, self.bob, 'the quotation for the kitchen')
+        self.send(self.alice, self.bob, 'see you tomorrow')
+        self.age(message, 200)
+        call_command('archive_messages', older_than_days=90, stdout=StringIO())
+        self.assertFalse(Message.objects.filter(pk=message.pk).exists())
+
+        for user in (self.alice, self.bob):
+            response = self.api(user).get('/api/chats/search/', {'q': 'quotation'})
+            self.assertEqual(response.status_code, 200, response.content)
+            hits = response.json()['data']
+            self.assertEqual([hit['id'] for hit in hits], [message.pk])
+            self.assertEqual(hits[0]['highlighted'], 'the <mark>quotation</mark> for the kitchen')
+
+    def test_sync_returns_archived_messages(self):
+        message = self.send(self.alice, self.bob, 'old news')
+        newer = self.send(self.alice, self.bob, 'new')
+        self.age(message, 200)
+        call_command('archive_messages', older_than_days=90, stdout=StringIO())
+
+        response = self.api(self.bob).get('/api/chats/sync/')
+        messages = response.json()['data']['messages']
+        self.assertEqual([m['id'] for m in messages], [message.pk, newer.pk])
+        self.assertEqual(messages[0]['content'], 'old news')
+
+
+class AsyncInboxTests(ChatTestCase):
+    async def test_matches_the_sync_inbox_page_by_page(self):
+        for i in range(5):
+            await sync_to_async(self.send)(self.alice, self.bob, f'm{i}')
+        token = await sync_to_async(get_tokens_for_user)(self.bob)
+        headers = {'Authorization': f"Bearer {token['access']}"}
+
+        cursor = ''
+        while True:
+            query = f'?page_size=2&cursor={cursor}'
+            expected = await sync_to_async(self.api(self.bob).get)(f'/api/chats/{query}')
+            response = await self.async_client.get(f'/api/chats/async/{query}', headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), expected.json())
+            cursor = response.json()['next_cursor']
+            if cursor is None:
+                break
+
+    async def test_requires_a_token(self):
+        response = await self.async_client.get('/api/chats/async/')
+        self.assertEqual(response.status_code, 401)
+
+
+class WebSocketClient:
+    """Drives the ASGI application's websocket side in-process."""
+
+    def __init__(self, path='/ws/chats/', token=None):
+        from ubc.asgi import application
+        self.to_app = asyncio.Queue()
+        self.from_app = asyncio.Queue()
+        scope = {
+            'type': 'websocket',
+            'path': path,
+            'query_string': f'token={token}'.encode() if token else b'',
+            'headers': [],
+        }
+        self.task = asyncio.ensure_future(application(scope, self.to_app.get, self.from_app.put))
+
+    async def connect(self):
+        await self.to_app.put({'type': 'websocket.connect'})
+        return await self.receive()
+
+    async def receive(self):
+        return await asyncio.wait_for(self.from_app.get(), 5)
+
+    async def receive_json(self):
+        frame = await self.receive()
+        assert frame['type'] == 'websocket.send', frame
+        return json.loads(frame['text'])
+
+    async def send_json(self, data):
+        await self.to_app.put({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+    async def disconnect(self):
+        await self.to_app.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, 5)
+
+
+class ChatWebSocketTests(ChatTestCase):
+    async def open(self, user):
+        token = await sync_to_async(get_tokens_for_user)(user)
+        socket = WebSocketClient(token=token['access'])
+        self.assertEqual(await socket.connect(), {'type': 'websocket.accept'})
+        return socket
+
+    async def test_rejects_missing_and_invalid_tokens(self):
+        for token in (None, 'not-a-jwt'):
+            socket = WebSocketClient(token=token)
+            self.assertEqual(await socket.connect(), {'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+
+    async def test_unknown_path_is_refused(self):
+        socket = WebSocketClient(path='/ws/elsewhere/')
+        self.assertEqual(await socket.connect(), {'type': 'websocket.close'})
+
+    async def test_pushes_new_messages_and_read_receipts(self):
+        alice_socket = await self.open(self.alice)
+        bob_socket = await self.open(self.bob)
+
+        message = await sync_to_async(self.send)(self.alice, self.bob, 'are you free today?')
+        event = await bob_socket.receive_json()
+        self.assertEqual(event['type'], 'message.new')
+        self.assertEqual(event['message']['id'], message.pk)
+        self.assertEqual(event['message']['content'], 'are you free today?')
+
+        def read():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.api(self.bob).patch(f'/api/chats/mark-read/{message.pk}/')
+        await sync_to_async(read)()
+        self.assertEqual(await alice_socket.receive_json(), {'type': 'messages.read', 'reader': self.bob.pk, 'ids': [message.pk]})
+
+        await alice_socket.disconnect()
+        await bob_socket.disconnect()
+
+    async def test_ping(self):
+        socket = await self.open(self.bob)
+        await socket.send_json({'type': 'ping'})
+        self.assertEqual(await socket.receive_json(), {'type': 'pong'})
+        await socket.disconnect()
+
+    async def test_disconnect_unsubscribes(self):
+        first = await self.open(self.bob)
+        second = await self.open(self.bob)
+        self.assertEqual(len(get_broker()._local_subscribers(self.bob.pk)), 2)
+        await first.disconnect()
+        self.assertEqual(len(get_broker()._local_subscribers(self.bob.pk)), 1)
+        await second.disconnect()
+        self.assertEqual(get_broker()._local_subscribers(self.bob.pk), [])
+
+    @override_settings(CHAT_PUBSUB={'BACKEND': 'chats.pubsub.InProcessBroker', 'OPTIONS': {'queue_size': 2}})
+    async def test_client_falling_behind_is_closed(self):
+        socket = await self.open(self.bob)
+        # Published back to back: the handler has no chance to drain the queue
+        for i in range(5):
+            get_broker().publish(self.bob.pk, {'type': 'message.new', 'message': {'id': i}})
+        frames = []
+        while True:
+            frame = await socket.receive()
+            if frame['type'] == 'websocket.close':
+                break
+            frames.append(frame)
+        self.assertEqual(frame['code'], CLOSE_TRY_AGAIN_LATER)
+        self.assertLessEqual(len(frames), 2)
+        await asyncio.wait_for(socket.task, 5)
+        self.assertEqual(get_broker()._local_subscribers(self.bob.pk), [])
+
+
+async def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not met in time')
+        await asyncio.sleep(0.01)
+
+
+class RespBrokerTests(SimpleTestCase):
+    def setUp(self):
+        self.server = start_fake_resp_server(self)
+        self.brokers = []
+
+    def broker(self):
+        broker = RespBroker(port=self.server.server_address[1])
+        self.brokers.append(broker)
+        self.addCleanup(broker.client.close)
+        return broker
+
+    async def close_brokers(self):
+        for broker in self.brokers:
+            await broker.close()
+
+    def subscribed(self, user_id):
+        return len(self.server.channels.get(f'{RespBroker.channel_prefix}{user_id}'.encode(), ()))
+
+    async def test_fans_out_across_processes(self):
+        worker, other_worker = self.broker(), self.broker()
+        first = await worker.subscribe(1)
+        second = await worker.subscribe(1)
+        unrelated = await worker.subscribe(2)
+        await wait_until(lambda: self.subscribed(1) and self.subscribed(2))
+        # One subscriber connection per process, however many sockets
+        self.assertEqual(self.subscribed(1), 1)
+
+        other_worker.publish(1, {'type': 'message.new', 'message': {'id': 7}})
+        self.assertEqual(await asyncio.wait_for(first.get(), 5), {'type': 'message.new', 'message': {'id': 7}})
+        self.assertEqual(await asyncio.wait_for(second.get(), 5), {'type': 'message.new', 'message': {'id': 7}})
+        self.assertTrue(unrelated.queue.empty())
+        await self.close_brokers()
+
+    async def test_unsubscribes_with_the_last_socket(self):
+        broker = self.broker()
+        first = await broker.subscribe(1)
+        second = await broker.subscribe(1)
+        await wait_until(lambda: self.subscribed(1))
+        await first.close()
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.subscribed(1), 1)
+        await second.close()
+        await wait_until(lambda: not self.subscribed(1))
+        await self.close_brokers()
+
+    async def test_resubscribes_after_reconnecting(self):
+        broker = self.broker()
+        subscription = await broker.subscribe(1)
+        await wait_until(lambda: self.subscribed(1))
+
+        self.server.drop_connections()
+        await wait_until(lambda: self.subscribed(1))
+
+        broker.publish(1, {'type': 'messages.read', 'reader': 2, 'ids': [3]})
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 5), {'type': 'messages.read', 'reader': 2, 'ids': [3]})
+        await self.close_brokers()
@@ -2,12 +2,26 @@
 from django.urls import path
 from .views import (
     MessageListView,
+    AsyncMessageListView,
     MessageCreateView,
-    MessageMarkAsReadView
+    MessageMarkAsReadView,
+    MessageBulkMarkAsReadView,
+    MessageUnreadCountView,
+    MessageSyncView,
+    MessageSearchView,
+    ConversationListView,
+    ConversationHistoryView,
 )
 
 urlpatterns = [
     path('', MessageListView.as_view(), name='message-inbox'), # e.g., /api/messages/
+    path('async/', AsyncMessageListView.as_view(), name='message-inbox-async'), # async variant of the inbox
     path('send/', MessageCreateView.as_view(), name='message-send'), # e.g., /api/messages/send/
     path('mark-read/<int:pk>/', MessageMarkAsReadView.as_view(), name='message-mark-read'), # e.g., /api/messages/123/mark-read/
+    path('mark-read/', MessageBulkMarkAsReadView.as_view(), name='message-mark-read-bulk'), # e.g., /api/chats/mark-read/ {"sender": 7, "up_to_id": 250}
+    path('unread-count/', MessageUnreadCountView.as_view(), name='message-unread-count'), # e.g., /api/chats/unread-count/
+    path('sync/', MessageSyncView.as_view(), name='message-sync'), # e.g., /api/chats/sync/?cursor=...
+    path('search/', MessageSearchView.as_view(), name='message-search'), # e.g., /api/chats/search/?q=quote
+    path('conversations/', ConversationListView.as_view(), name='conversation-list'), # e.g., /api/chats/conversations/
+    path('conversations/<int:user_id>/messages/', ConversationHistoryView.as_view(), name='conversation-history'), # e.g., /api/chats/conversations/7/messages/
 ]
\ No newline at end of file
@@ -1,17 +1,52 @@
 # messages/views.py
+from collections import defaultdict
+
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404 # Needed for MessageMarkAsReadView
 
 from accounts.models import User # Import User model from accounts app
+from accounts.async_api import AsyncAPIView, json_api_response
+from accounts.pagination import KeysetPaginator, InvalidCursor
 from accounts.utils import api_response # Import your custom api_response utility
+from notifications.counters import adjust_unread, get_unread_counts
 
-from .models import Message # Import Message model from current app
-from .serializers import MessageListSerializer, MessageCreateSerializer # Import serializers from current app
+from .conversations import get_or_create_conversation, get_conversation_id, record_message, mark_conversation_read
+from .models import Message, ConversationMember, MessageChange, ArchivedMessage, load_messages # Import Message model from current app
+from .pubsub import notify_new_message, notify_messages_read
+from .search import index_message, search_messages, load_ranked_messages
+from .sync import record_created, record_reads, changes_since
+from .serializers import (
+    MessageListSerializer, MessageCreateSerializer, MessageCompactSerializer, ConversationSerializer,
+    MessageBulkReadSerializer, MessageSearchResultSerializer, ArchivedMessageSerializer, side_load_users,
+) # Import serializers from current app
 from rest_framework.response import Response
 from django.http import Http404
 
+def inbox_paginator():
+    # Keyset pagination over (timestamp, id), served by the
+    # (receiver, -timestamp, -id) index; pass next_cursor back as ?cursor=
+    return KeysetPaginator(
+        ordering=('-timestamp', '-id'),
+        page_size=settings.MESSAGE_INBOX_PAGE_SIZE,
+        max_page_size=settings.MESSAGE_INBOX_MAX_PAGE_SIZE,
+    )
+
+
+def inbox_data(messages, params, context):
+    # ?include=users: messages carry sender ids and every distinct sender is
+    # serialized once under included.users instead of on every row
+    if params.get('include') == 'users':
+        return {
+            "messages": MessageCompactSerializer(messages, many=True).data,
+            "included": {"users": side_load_users(messages, context)},
+        }
+    return MessageListSerializer(messages, many=True, context=context).data
+
+
 class MessageListView(generics.ListAPIView):
     """
     API endpoint to list messages delivered to the logged-in user (Inbox).
@@ -26,13 +61,40 @@ class MessageListView(generics.ListAPIView):
         return Message.objects.filter(receiver=self.request.user).select_related('sender').order_by('-timestamp')
     
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset.exists():
+        paginator = inbox_paginator()
+        try:
+            messages, next_cursor = paginator.paginate(self.get_queryset(), request)
+        except InvalidCursor as e:
+            return api_response(False, str(e), None, status.HTTP_400_BAD_REQUEST)
+
+        # An empty first page replaces the old separate .exists() query
+        if not messages and not request.query_params.get(paginator.cursor_query_param):
             return api_response(False,"No messages found for your inbox.",[], status.HTTP_200_OK)
 
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return api_response(True,"Messages retrieved successfully.",serializer.data, status.HTTP_200_OK)
+        data = inbox_data(messages, request.query_params, self.get_serializer_context())
+        response = api_response(True,"Messages retrieved successfully.",data, status.HTTP_200_OK)
+        response.data["next_cursor"] = next_cursor
+        return response
+
+class AsyncMessageListView(AsyncAPIView):
+    """
+    Async variant of MessageListView: same parameters and response, served
+    with the async ORM so the request holds no thread while waiting on it.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        paginator = inbox_paginator()
+        queryset = Message.objects.filter(receiver=request.user).select_related('sender')
+        try:
+            messages, next_cursor = await paginator.apaginate(queryset, request)
+        except InvalidCursor as e:
+            return json_api_response(False, str(e), None, status.HTTP_400_BAD_REQUEST)
+
+        if not messages and not request.GET.get(paginator.cursor_query_param):
+            return json_api_response(False,"No messages found for your inbox.",[], status.HTTP_200_OK)
+
+        data = inbox_data(messages, request.GET, {"request": request})
+        return json_api_response(True,"Messages retrieved successfully.",data, status.HTTP_200_OK, next_cursor=next_cursor)
 
 class MessageCreateView(generics.CreateAPIView):
     """
@@ -43,7 +105,15 @@ class MessageCreateView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         # Automatically set the sender of the message to the current authenticated user.
-        serializer.save(sender=self.request.user)
+        # The conversation row is updated in the same transaction as the insert.
+        with transaction.atomic():
+            conversation = get_or_create_conversation(self.request.user.id, serializer.validated_data['receiver'].id)
+            message = serializer.save(sender=self.request.user, conversation=conversation)
+            record_message(message)
+            index_message(message)
+            notify_new_message(message)
+            # Last statement before commit, see chats.sync
+            record_created(message)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -89,10 +159,231 @@ class MessageMarkAsReadView(generics.UpdateAPIView):
         if message.is_read:
             return api_response(False,"Message is already marked as read.",None,status.HTTP_400_BAD_REQUEST)
         
-        message.is_read = True 
-        message.save(update_fields=['is_read']) 
+        with transaction.atomic():
+            # Conditional UPDATE: of two concurrent requests only one flips the row,
+            # and only that one moves the counters
+            updated = Message.objects.filter(pk=message.pk, receiver=request.user, is_read=False).update(is_read=True)
+            if updated != 1:
+                return api_response(False,"Message is already marked as read.",None,status.HTTP_400_BAD_REQUEST)
+            mark_conversation_read(message.receiver_id, message.sender_id, 1)
+            adjust_unread(message.receiver_id, messages=-1)
+            notify_messages_read(message.sender_id, message.receiver_id, ids=[message.id])
+            record_reads(message.receiver_id, [(message.id, message.sender_id)])
+        message.is_read = True
         serializer = self.get_serializer(message)
         return api_response(True,"Message marked as read.",serializer.data,status.HTTP_200_OK)
+
+class MessageBulkMarkAsReadView(APIView):
+    """
+    API endpoint to mark many received messages as read in one request:
+
+        {"ids": [101, 102, 103]}
+        {"sender": 7, "up_to_id": 250}
+        {"sender": 7, "up_to_timestamp": "2025-07-01T10:00:00Z"}
+        {"sender": 7}                      # everything from user 7
+
+    The unread targets are selected (and locked) once, then flipped with a
+    single UPDATE; the response carries the number of rows changed. A
+    watermark request marks at most MESSAGE_BULK_READ_MAX messages, oldest
+    first; repeat it while the response says has_more.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = MessageBulkReadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return api_response(False,"Invalid mark-as-read request.",serializer.errors,status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+        unread = Message.objects.filter(receiver=request.user, is_read=False)
+
+        if 'ids' in params:
+            # Already capped at MESSAGE_BULK_READ_MAX_IDS by the serializer
+            unread = unread.filter(id__in=params['ids'])
+            limit = len(params['ids'])
+        else:
+            unread = unread.filter(sender_id=params['sender'])
+            if 'up_to_id' in params:
+                unread = unread.filter(id__lte=params['up_to_id'])
+            if 'up_to_timestamp' in params:
+                unread = unread.filter(timestamp__lte=params['up_to_timestamp'])
+            limit = settings.MESSAGE_BULK_READ_MAX
+
+        with transaction.atomic():
+            # Lock the targets first: the ids feed the sync change log, and with
+            # ids mode they can span several conversations. One extra row
+            # tells whether a watermark request has more to do.
+            targets = list(unread.order_by('id').select_for_update().values_list('id', 'sender_id')[:limit + 1])
+            has_more = len(targets) > limit
+            targets = targets[:limit]
+            updated = Message.objects.filter(id__in=[pk for pk, _ in targets], is_read=False).update(is_read=True)
+            ids_by_sender = defaultdict(list)
+            for pk, sender_id in targets:
+                ids_by_sender[sender_id].append(pk)
+            for sender_id, ids in ids_by_sender.items():
+                mark_conversation_read(request.user.id, sender_id, len(ids))
+                notify_messages_read(sender_id, request.user.id, ids=ids)
+            adjust_unread(request.user.id, messages=-updated)
+            # Last statement before commit, see chats.sync
+            record_reads(request.user.id, targets)
+
+        return api_response(True,f"{updated} messages marked as read.",{"updated": updated, "has_more": has_more},status.HTTP_200_OK)
+
+class MessageSyncView(APIView):
+    """
+    API endpoint for delta sync after a reconnect: messages created and
+    messages marked read (sent or received) since ?cursor=, in batches of
+    MESSAGE_SYNC_BATCH_SIZE. Always returns next_cursor; keep calling while
+    has_more is true. Without a cursor it starts at the beginning of the log.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            changes, next_cursor, has_more = changes_since(request.user.id, request.query_params.get('cursor'))
+        except InvalidCursor as e:
+            return api_response(False, str(e), None, status.HTTP_400_BAD_REQUEST)
+
+        created = load_messages([change.message_id for change in changes if change.kind == MessageChange.CREATED])
+        messages = {}
+        read_ids = []
+        for change in changes:
+            if change.kind != MessageChange.CREATED:
+                read_ids.append(change.message_id)
+            elif change.message_id in created:
+                messages[change.message_id] = created[change.message_id]
+        data = {
+            "messages": MessageCompactSerializer(list(messages.values()), many=True).data,
+            "read_ids": read_ids,
+            "has_more": has_more,
+        }
+        response = api_response(True,"Changes retrieved successfully.",data, status.HTTP_200_OK)
+        response.data["next_cursor"] = next_cursor
+        return response
+
+class ConversationHistoryView(generics.ListAPIView):
+    """
+    API endpoint to page through the logged-in user's thread with one other
+    user, sent and received messages together, newest first. Keyset
+    paginated with ?cursor= over the (conversation, timestamp, id) index.
+
+    Archiving skips unread messages, so hot and archived rows interleave in
+    time; each page reads up to page_size rows from both tables with the same
+    cursor and merges them.
+    """
+    serializer_class = MessageCompactSerializer
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request, *args, **kwargs):
+        conversation_id = get_conversation_id(request.user.id, self.kwargs['user_id'])
+        if conversation_id is None:
+            return api_response(False,"No messages found with this user.",[], status.HTTP_200_OK)
+
+        paginator = KeysetPaginator(
+            ordering=('-timestamp', '-id'),
+            page_size=settings.CONVERSATION_HISTORY_PAGE_SIZE,
+            max_page_size=settings.CONVERSATION_HISTORY_MAX_PAGE_SIZE,
+        )
+        page_size = paginator.get_page_size(request)
+        try:
+            messages, messages_next = paginator.paginate(
+                Message.objects.filter(conversation_id=conversation_id), request, page_size=page_size,
+            )
+            archived, archived_next = paginator.paginate(
+                ArchivedMessage.objects.filter(conversation_id=conversation_id), request, page_size=page_size,
+            )
+        except InvalidCursor as e:
+            return api_response(False, str(e), None, status.HTTP_400_BAD_REQUEST)
+
+        # Ids are shared by both tables (archived rows keep theirs)
+        rows = sorted(messages + archived, key=lambda row: (row.timestamp, row.id), reverse=True)
+        page = rows[:page_size]
+        has_next = len(rows) > page_size or messages_next is not None or archived_next is not None
+        next_cursor = paginator.cursor_for(page[-1]) if has_next else None
+
+        data = [
+            ArchivedMessageSerializer(row).data if isinstance(row, ArchivedMessage) else self.get_serializer(row).data
+            for row in page
+        ]
+        response = api_response(True,"Messages retrieved successfully.",data, status.HTTP_200_OK)
+        response.data["next_cursor"] = next_cursor
+        return response
+
+class MessageSearchView(APIView):
+    """
+    Ranked search over the logged-in user's sent and received messages.
+    Hits carry `highlighted` content with matching words in <mark>.
+
+    Query params: q (required), cursor, page_size.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        query = (request.query_params.get("q") or "").strip()
+        if len(query) < 2:
+            return api_response(False, "Search query must be at least 2 characters long.", None, status.HTTP_400_BAD_REQUEST)
+
+        paginator = KeysetPaginator(
+            ordering=("-score", "-message_id"),
+            page_size=settings.MESSAGE_SEARCH_PAGE_SIZE,
+            max_page_size=settings.MESSAGE_SEARCH_MAX_PAGE_SIZE,
+        )
+        try:
+            rows, next_cursor = paginator.paginate(search_messages(request.user.id, query), request)
+        except InvalidCursor as e:
+            return api_response(False, str(e), None, status.HTTP_400_BAD_REQUEST)
+
+        scores = {row['message_id']: row['score'] for row in rows}
+        messages = load_ranked_messages(rows)
+        for message in messages:
+            message.score = scores[message.id]
+        serializer = MessageSearchResultSerializer(messages, many=True, context={"query": query})
+        response = api_response(True,"Search results fetched successfully.",serializer.data, status.HTTP_200_OK)
+        response.data["next_cursor"] = next_cursor
+        return response
+
+class MessageUnreadCountView(APIView):
+    """
+    API endpoint returning the number of unread messages for the app badge.
+    Served from the maintained UnreadCounter through the cache.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        counts = get_unread_counts(request.user.id)
+        return api_response(True,"Unread message count retrieved successfully.",{"unread_count": counts['unread_messages']}, status.HTTP_200_OK)
+
+class ConversationListView(generics.ListAPIView):
+    """
+    API endpoint to list the logged-in user's conversations, most recently
+    active first. One indexed ConversationMember row per conversation, keyset
+    paginated with ?cursor=.
+    """
+    serializer_class = ConversationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return (
+            ConversationMember.objects
+            .filter(user=self.request.user, last_message_at__isnull=False)
+            .select_related('peer', 'conversation')
+        )
+
+    def list(self, request, *args, **kwargs):
+        paginator = KeysetPaginator(
+            ordering=('-last_message_at', '-id'),
+            page_size=settings.CONVERSATION_LIST_PAGE_SIZE,
+            max_page_size=settings.CONVERSATION_LIST_MAX_PAGE_SIZE,
+        )
+        try:
+            rows, next_cursor = paginator.paginate(self.get_queryset(), request)
+        except InvalidCursor as e:
+            return api_response(False, str(e), None, status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(rows, many=True)
+        response = api_response(True,"Conversations retrieved successfully.",serializer.data, status.HTTP_200_OK)
+        response.data["next_cursor"] = next_cursor
+        return response
+
     # def update(self, request, *args, **kwargs):
     #     message = self.get_object()
     #     if message.is_read:
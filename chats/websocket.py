@@ -0,0 +1,106 @@
+# chats/websocket.py
+"""
+Raw ASGI WebSocket endpoint pushing chat events to the connected user.
+
+    ws://<host>/ws/chats/?token=<JWT access token>
+
+Server -> client frames are JSON objects: {"type": "message.new", "message":
+{...}} for new messages and {"type": "messages.read", ...} read receipts.
+A client may send {"type": "ping"} and gets {"type": "pong"} back. The socket
+is closed with 4401 when the token is missing/invalid, and with 1013 when
+the client fell too far behind (it should then resync over the REST API).
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from accounts.authentication import CachedJWTAuthentication
+from .pubsub import get_broker
+
+logger = logging.getLogger(__name__)
+
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_TRY_AGAIN_LATER = 1013
+CLOSE_INTERNAL_ERROR = 1011
+
+
+def _token_from_scope(scope):
+    params = parse_qs(scope.get('query_string', b'').decode())
+    if params.get('token'):
+        return params['token'][0]
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode().split()
+            if len(parts) == 2 and parts[0] == 'Bearer':
+                return parts[1]
+    return None
+
+
+def _authenticate(raw_token):
+    # Same checks as the REST API (CachedJWTAuthentication), outside a request cycle
+    close_old_connections()
+    try:
+        auth = CachedJWTAuthentication()
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed, TokenError):
+        return None
+    finally:
+        close_old_connections()
+
+
+async def chat_websocket(scope, receive, send):
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    raw_token = _token_from_scope(scope)
+    user = await sync_to_async(_authenticate)(raw_token) if raw_token else None
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    try:
+        subscription = await get_broker().subscribe(user.id)
+    except OSError:
+        logger.exception("Chat pub/sub unavailable")
+        await send({'type': 'websocket.close', 'code': CLOSE_INTERNAL_ERROR})
+        return
+
+    await send({'type': 'websocket.accept'})
+    receiving = asyncio.ensure_future(receive())
+    waiting = asyncio.ensure_future(subscription.get())
+    try:
+        while True:
+            done, _ = await asyncio.wait({receiving, waiting}, return_when=asyncio.FIRST_COMPLETED)
+
+            if receiving in done:
+                message = receiving.result()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message.get('text') and _is_ping(message['text']):
+                    await send({'type': 'websocket.send', 'text': '{"type": "pong"}'})
+                receiving = asyncio.ensure_future(receive())
+
+            if waiting in done:
+                if subscription.overflowed:
+                    await send({'type': 'websocket.close', 'code': CLOSE_TRY_AGAIN_LATER})
+                    break
+                await send({'type': 'websocket.send', 'text': json.dumps(waiting.result(), cls=DjangoJSONEncoder)})
+                waiting = asyncio.ensure_future(subscription.get())
+    finally:
+        receiving.cancel()
+        waiting.cancel()
+        await subscription.close()
+
+
+def _is_ping(text):
+    try:
+        return json.loads(text).get('type') == 'ping'
+    except (ValueError, AttributeError):
+        return False
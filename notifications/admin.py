@@ -1,7 +1,8 @@
 # notifications/admin.py
 
 from django.contrib import admin
-from .models import Notification
+from .counters import reconcile_counters
+from .models import Notification, UnreadCounter
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -13,10 +14,20 @@ class NotificationAdmin(admin.ModelAdmin):
 
     def mark_as_read(self, request, queryset):
         queryset.update(is_read=True)
+        reconcile_counters(set(queryset.values_list('recipient_id', flat=True)))
         self.message_user(request, "Selected notifications marked as read.")
     mark_as_read.short_description = "Mark selected notifications as read"
 
     def mark_as_unread(self, request, queryset):
         queryset.update(is_read=False)
+        reconcile_counters(set(queryset.values_list('recipient_id', flat=True)))
         self.message_user(request, "Selected notifications marked as unread.")
-    mark_as_unread.short_description = "Mark selected notifications as unread"
\ No newline at end of file
+    mark_as_unread.short_description = "Mark selected notifications as unread"
+
+
+@admin.register(UnreadCounter)
+class UnreadCounterAdmin(admin.ModelAdmin):
+    list_display = ('user', 'unread_messages', 'unread_notifications', 'updated_at')
+    search_fields = ('user__mobile_number', 'user__email')
+    raw_id_fields = ('user',)
+    readonly_fields = ('updated_at',)
@@ -0,0 +1,131 @@
+# notifications/counters.py
+"""
+Per-user unread counters for messages and notifications.
+
+Writes adjust UnreadCounter with F() expressions in the caller's transaction;
+reads go through the cache, so a badge poll is a cache hit. Cached entries
+are keyed by a per-user generation that every write bumps once its
+transaction commits, so a reader that loaded the old counts just before a
+write can only fill a key nobody reads any more. Counters that drift (bulk
+updates outside these helpers, crashes) are repaired by recounting with
+indexed COUNT(*) queries - see reconcile_counters().
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from chats.models import Message
+from .models import Notification, UnreadCounter
+
+
+def get_counter_cache():
+    return caches[getattr(settings, 'UNREAD_COUNT_CACHE_ALIAS', 'default')]
+
+
+def _generation_key(user_id):
+    return f"unread_counts:generation:{user_id}"
+
+
+def counter_cache_key(user_id, generation):
+    return f"unread_counts:{user_id}:{generation}"
+
+
+def _generation(cache, user_id):
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Missing or evicted: any fresh value differs from what entries used
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def _bump_generations(user_ids):
+    cache = get_counter_cache()
+    for user_id in user_ids:
+        try:
+            cache.incr(_generation_key(user_id))
+        except ValueError:
+            cache.set(_generation_key(user_id), time.time_ns(), timeout=None)
+
+
+def invalidate_cached_counts(user_ids):
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: _bump_generations(user_ids))
+
+
+def count_unread(user_id):
+    """Real unread totals of one user (two indexed COUNT(*) queries)."""
+    return {
+        'unread_messages': Message.objects.filter(receiver_id=user_id, is_read=False).count(),
+        'unread_notifications': Notification.objects.filter(recipient_id=user_id, is_read=False).count(),
+    }
+
+
+def adjust_unread(user_id, messages=0, notifications=0):
+    """Add (or with negative values, take off) unread items for `user_id`."""
+    changes = {}
+    if messages:
+        changes['unread_messages'] = Greatest(F('unread_messages') + messages, 0, output_field=IntegerField())
+    if notifications:
+        changes['unread_notifications'] = Greatest(F('unread_notifications') + notifications, 0, output_field=IntegerField())
+    if not changes:
+        return
+    updated = UnreadCounter.objects.filter(user_id=user_id).update(**changes)
+    if not updated and (messages > 0 or notifications > 0):
+        # First new item for this user: start from the real counts, which
+        # already include the write being counted. (Nothing to take off a
+        # counter that doesn't exist yet - it is created on first read.)
+        _, created = UnreadCounter.objects.get_or_create(user_id=user_id, defaults=count_unread(user_id))
+        if not created:
+            # Another transaction created the row first; its counts can't
+            # include our uncommitted write, so apply it on top
+            UnreadCounter.objects.filter(user_id=user_id).update(**changes)
+    invalidate_cached_counts([user_id])
+
+
+def get_unread_counts(user_id):
+    """{'unread_messages': n, 'unread_notifications': n}, served from cache."""
+    cache = get_counter_cache()
+    key = counter_cache_key(user_id, _generation(cache, user_id))
+    counts = cache.get(key)
+    if counts is None:
+        counts = (
+            UnreadCounter.objects.filter(user_id=user_id)
+            .values('unread_messages', 'unread_notifications').first()
+        )
+        if counts is None:
+            counts = count_unread(user_id)
+            UnreadCounter.objects.get_or_create(user_id=user_id, defaults=counts)
+        cache.set(key, counts, timeout=getattr(settings, 'UNREAD_COUNT_CACHE_TIMEOUT', 300))
+    return counts
+
+
+def reconcile_counters(user_ids):
+    """
+    Reset the counters of `user_ids` to their real values. Each counter is
+    recomputed by correlated COUNT(*) subqueries inside a single UPDATE, so
+    increments that land while this runs are not lost.
+    """
+    unread_messages = (
+        Message.objects.filter(receiver_id=OuterRef('user_id'), is_read=False)
+        .order_by().values('receiver_id').annotate(n=Count('*')).values('n')
+    )
+    unread_notifications = (
+        Notification.objects.filter(recipient_id=OuterRef('user_id'), is_read=False)
+        .order_by().values('recipient_id').annotate(n=Count('*')).values('n')
+    )
+    user_ids = list(user_ids)
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(user_id=user_id) for user_id in user_ids], ignore_conflicts=True,
+    )
+    updated = UnreadCounter.objects.filter(user_id__in=user_ids).update(
+        unread_messages=Coalesce(Subquery(unread_messages, output_field=IntegerField()), 0),
+        unread_notifications=Coalesce(Subquery(unread_notifications, output_field=IntegerField()), 0),
+    )
+    invalidate_cached_counts(user_ids)
+    return updated
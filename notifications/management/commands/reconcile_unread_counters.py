@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import User
+from notifications.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount every user's unread messages and notifications with indexed "
+        "COUNT(*) queries and correct their UnreadCounter rows. Safe to run "
+        "periodically (e.g. nightly from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = 0
+        last_id = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not user_ids:
+                break
+            with transaction.atomic():
+                total += reconcile_counters(user_ids)
+            last_id = user_ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {total} unread counters."))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_messages', models.PositiveIntegerField(default=0)),
+                ('unread_notifications', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Unread counter',
+                'verbose_name_plural': 'Unread counters',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read'], name='notif_recipient_unread_idx'),
+        ),
+        migrations.AddField(
+            model_name='unreadcounter',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counter', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
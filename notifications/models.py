@@ -59,6 +59,28 @@ class Notification(models.Model):
         ordering = ['-timestamp'] # Newest notifications first
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
+        indexes = [
+            # Unread COUNT(*) per recipient (counter reconciliation)
+            models.Index(fields=['recipient', 'is_read'], name='notif_recipient_unread_idx'),
+        ]
 
     def __str__(self):
-        return f"Notification for {self.recipient.name}: {self.title}"
\ No newline at end of file
+        return f"Notification for {self.recipient.name}: {self.title}"
+
+class UnreadCounter(models.Model):
+    """
+    Maintained per-user unread totals for the app badge, so polling it never
+    counts message or notification rows. Kept current by notifications.counters
+    and repaired by the reconcile_unread_counters command.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='unread_counter')
+    unread_messages = models.PositiveIntegerField(default=0)
+    unread_notifications = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Unread counter"
+        verbose_name_plural = "Unread counters"
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread_messages} messages, {self.unread_notifications} notifications unread"
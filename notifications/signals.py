@@ -0,0 +1,34 @@
+# notifications/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from chats.models import Message
+from .counters import adjust_unread
+from .models import Notification
+
+# Creates and deletes are counted here. Mark-as-read paths use queryset
+# updates or update_fields saves and call adjust_unread() themselves.
+
+
+@receiver(post_save, sender=Message)
+def count_new_message(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and not instance.is_read:
+        adjust_unread(instance.receiver_id, messages=1)
+
+
+@receiver(post_delete, sender=Message)
+def uncount_deleted_message(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread(instance.receiver_id, messages=-1)
+
+
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and not instance.is_read:
+        adjust_unread(instance.recipient_id, notifications=1)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread(instance.recipient_id, notifications=-1)
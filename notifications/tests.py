@@ -1,3 +1,112 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from chats.models import Message
+from . import counters
+from .models import Notification, UnreadCounter
+from .views import NotificationMarkAsReadView
+
+# Per-test, in-memory caches: the configured shared cache outlives test runs
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'notifications-tests'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'notifications-tests-shared'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.alice = User.objects.create(mobile_number='+919876502001', name='Alice')
+        self.bob = User.objects.create(mobile_number='+919876502002', name='Bob')
+
+    def notify(self, user, n=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(n):
+                Notification.objects.create(recipient=user, title=f'n{i}', message='x')
+
+    def message(self, sender, receiver):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(sender=sender, receiver=receiver, content='hi')
+
+    def test_badge_counts_follow_writes(self):
+        client = APIClient()
+        client.force_authenticate(self.bob)
+        self.message(self.alice, self.bob)
+        self.message(self.alice, self.bob)
+        self.notify(self.bob, 3)
+
+        response = client.get('/api/chats/unread-count/')
+        self.assertEqual(response.json()['data']['unread_count'], 2)
+        response = client.get('/api/notifications/unread-count/')
+        self.assertEqual(response.json()['data']['unread_count'], 3)
+
+        # Cached between polls, refreshed after the next write commits
+        self.assertEqual(counters.get_unread_counts(self.bob.pk)['unread_messages'], 2)
+        self.message(self.alice, self.bob)
+        self.assertEqual(counters.get_unread_counts(self.bob.pk)['unread_messages'], 3)
+
+    def test_stale_fill_after_an_invalidation_is_never_served(self):
+        self.notify(self.bob)
+        cache = counters.get_counter_cache()
+
+        # A reader misses and loads the counts...
+        stale_key = counters.counter_cache_key(self.bob.pk, counters._generation(cache, self.bob.pk))
+        stale = counters.get_unread_counts(self.bob.pk)
+        cache.delete(stale_key)
+        # ...a write commits and invalidates...
+        self.notify(self.bob)
+        # ...and only then does the reader fill the cache
+        cache.set(stale_key, stale)
+
+        self.assertEqual(counters.get_unread_counts(self.bob.pk)['unread_notifications'], 2)
+
+    def test_concurrent_first_write_is_not_lost(self):
+        real_count = counters.count_unread
+
+        def racing_count(user_id):
+            # Another transaction creates the counter first, without our write
+            counts = real_count(user_id)
+            UnreadCounter.objects.create(
+                user_id=user_id,
+                unread_messages=counts['unread_messages'],
+                unread_notifications=counts['unread_notifications'] - 1,
+            )
+            return counts
+
+        with mock.patch.object(counters, 'count_unread', side_effect=racing_count):
+            self.notify(self.bob)
+
+        self.assertEqual(UnreadCounter.objects.get(user=self.bob).unread_notifications, 1)
+
+    def test_concurrent_mark_read_counts_once(self):
+        self.notify(self.bob, 2)
+        pk = Notification.objects.filter(recipient=self.bob).first().pk
+        client = APIClient()
+        client.force_authenticate(self.bob)
+
+        # Both requests loaded the notification while it was still unread
+        stale = [Notification.objects.get(pk=pk) for _ in range(2)]
+        statuses = []
+        with mock.patch.object(NotificationMarkAsReadView, 'get_object', side_effect=stale):
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    statuses.append(client.patch(f'/api/notifications/mark-read/{pk}/').status_code)
+
+        self.assertEqual(statuses, [200, 400])
+        self.assertEqual(UnreadCounter.objects.get(user=self.bob).unread_notifications, 1)
+        self.assertEqual(counters.get_unread_counts(self.bob.pk)['unread_notifications'], 1)
+
+    def test_reconcile_repairs_drift(self):
+        self.notify(self.bob, 2)
+        UnreadCounter.objects.filter(user=self.bob).update(unread_notifications=7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            counters.reconcile_counters([self.bob.pk])
+
+        self.assertEqual(counters.get_unread_counts(self.bob.pk)['unread_notifications'], 2)
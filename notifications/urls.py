@@ -3,12 +3,16 @@
 from django.urls import path
 from .views import (
     NotificationListView,
+    AsyncNotificationListView,
     NotificationCreateView,
-    NotificationMarkAsReadView
+    NotificationMarkAsReadView,
+    NotificationUnreadCountView,
 )
 
 urlpatterns = [
     path('', NotificationListView.as_view(), name='notification-list'),
+    path('async/', AsyncNotificationListView.as_view(), name='notification-list-async'),
     path('send/', NotificationCreateView.as_view(), name='notification-send'),
     path('mark-read/<int:pk>/', NotificationMarkAsReadView.as_view(), name='notification-mark-read'),
+    path('unread-count/', NotificationUnreadCountView.as_view(), name='notification-unread-count'),
 ]
\ No newline at end of file
@@ -2,10 +2,14 @@
 
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated,IsAdminUser
+from rest_framework.views import APIView
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.http import Http404 # For custom 404 response
+from accounts.async_api import AsyncAPIView, json_api_response
 from accounts.utils import api_response # Your custom api_response utility
 
+from .counters import adjust_unread, get_unread_counts
 from .models import Notification
 from .serializers import NotificationSerializer, NotificationCreateSerializer
 from rest_framework.response import Response
@@ -31,6 +35,25 @@ class NotificationListView(generics.ListAPIView):
         return api_response(True,"Notifications retrieved successfully.",serializer.data, status.HTTP_200_OK)
 
 
+class AsyncNotificationListView(AsyncAPIView):
+    """
+    Async variant of NotificationListView, served with the async ORM.
+    Senders are joined in the same query instead of loaded per row.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        queryset = (
+            Notification.objects.filter(recipient=request.user)
+            .select_related('sender').order_by('-timestamp')
+        )
+        notifications = [notification async for notification in queryset]
+        if not notifications:
+            return json_api_response(False,"No notifications found.",[], status.HTTP_200_OK)
+
+        serializer = NotificationSerializer(notifications, many=True, context={"request": request})
+        return json_api_response(True,"Notifications retrieved successfully.",serializer.data, status.HTTP_200_OK)
+
+
 class NotificationCreateView(generics.CreateAPIView): # <--- ADD THIS NEW VIEW
     """
     API endpoint for administrators to send notifications to users.
@@ -89,9 +112,26 @@ class NotificationMarkAsReadView(generics.UpdateAPIView):
 
           
             
-        notification.is_read = True 
-        notification.save(update_fields=['is_read']) 
+        with transaction.atomic():
+            # Conditional UPDATE: of two concurrent requests only one flips the row
+            updated = Notification.objects.filter(
+                pk=notification.pk, recipient=request.user, is_read=False,
+            ).update(is_read=True)
+            if updated != 1:
+                return api_response(False,"Notification is already marked as read.",None, status.HTTP_400_BAD_REQUEST)
+            adjust_unread(notification.recipient_id, notifications=-1)
+        notification.is_read = True
         serializer = self.get_serializer(notification)
         return api_response(True,"Notification marked as read.",serializer.data, status.HTTP_200_OK)
 
-        
\ No newline at end of file
+
+class NotificationUnreadCountView(APIView):
+    """
+    API endpoint returning the number of unread notifications for the app badge.
+    Served from the maintained UnreadCounter through the cache.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        counts = get_unread_counts(request.user.id)
+        return api_response(True,"Unread notification count retrieved successfully.",{"unread_count": counts['unread_notifications']}, status.HTTP_200_OK)
@@ -2,6 +2,8 @@
 ASGI config for ubc project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections are routed by path to the raw
+ASGI handlers in ``websocket_routes``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,23 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ubc.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up: the handlers use models and settings
+from chats.websocket import chat_websocket  # noqa: E402
+
+websocket_routes = {
+    '/ws/chats/': chat_websocket,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        handler = websocket_routes.get(scope['path'])
+        if handler is None:
+            # Closing before accept rejects the handshake (HTTP 403)
+            await receive()
+            await send({'type': 'websocket.close'})
+            return
+        return await handler(scope, receive, send)
+    return await django_application(scope, receive, send)
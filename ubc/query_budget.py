@@ -0,0 +1,220 @@
+# ubc/query_budget.py
+"""
+Per-endpoint SQL instrumentation.
+
+QueryBudgetMiddleware records, for every request, the number of queries, the
+total SQL time and how often each statement "shape" (fingerprint) repeated,
+keyed by the resolved URL name. In development it warns about - or fails on -
+N+1 patterns and endpoints that go over their configured budget:
+
+    QUERY_BUDGET = {
+        "ENABLED": DEBUG,
+        "MODE": "warn",              # "warn", "raise" or "off"
+        "N_PLUS_ONE_THRESHOLD": 5,   # same statement this many times = N+1
+        "BUDGETS": {"profile-bundle": 5},
+    }
+
+`assert_query_budget` / `assert_endpoint_budget` are the test-side helpers.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+logger = logging.getLogger(__name__)
+
+_string_re = re.compile(r"'(?:[^']|'')*'")
+_number_re = re.compile(r'\b\d+(?:\.\d+)?\b')
+_in_list_re = re.compile(r'IN \([^()]*\)')
+_space_re = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """Statement shape: literals replaced by ? and IN-lists collapsed."""
+    sql = _string_re.sub('?', sql)
+    sql = _number_re.sub('?', sql)
+    sql = _in_list_re.sub('IN (...)', sql)
+    return _space_re.sub(' ', sql).strip()
+
+
+def get_config():
+    config = {
+        'ENABLED': settings.DEBUG,
+        'MODE': 'warn',
+        'N_PLUS_ONE_THRESHOLD': 5,
+        'BUDGETS': {},
+        'HEADERS': True,
+    }
+    config.update(getattr(settings, 'QUERY_BUDGET', {}))
+    return config
+
+
+class QueryRecorder:
+    """`connection.execute_wrapper` callable collecting count, time and fingerprints."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def repeated(self, threshold):
+        return {sql: n for sql, n in self.fingerprints.items() if n >= threshold}
+
+
+class EndpointStats:
+    """Process-wide totals per URL name, for ad-hoc inspection in a shell or debug view."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.data = defaultdict(lambda: {'requests': 0, 'queries': 0, 'max_queries': 0, 'sql_time': 0.0})
+
+    def add(self, name, recorder):
+        with self._lock:
+            entry = self.data[name]
+            entry['requests'] += 1
+            entry['queries'] += recorder.count
+            entry['max_queries'] = max(entry['max_queries'], recorder.count)
+            entry['sql_time'] += recorder.duration
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self.data.items()}
+
+
+endpoint_stats = EndpointStats()
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return request.path
+    return match.url_name or match.view_name
+
+
+def check_budget(name, recorder, config):
+    """Return a list of problems (N+1 suspects, budget overruns) for one request."""
+    problems = []
+    for sql, n in recorder.repeated(config['N_PLUS_ONE_THRESHOLD']).items():
+        problems.append(f"possible N+1 in {name}: {n}x {sql[:200]}")
+    budget = config['BUDGETS'].get(name)
+    if budget is not None and recorder.count > budget:
+        problems.append(f"{name} ran {recorder.count} queries, budget is {budget}")
+    return problems
+
+
+class QueryBudgetMiddleware:
+    """
+    Sync and async capable, so async views are not forced onto a thread.
+    Database connections are per thread and the async ORM runs its queries
+    in the request's sync_to_async thread, so under async the execute
+    wrappers are installed (and removed) from that thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with self.install(recorder):
+            response = self.get_response(request)
+        return self.finish(request, recorder, config, response)
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        stack = await sync_to_async(self.install)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, recorder, config, response)
+
+    @staticmethod
+    def install(recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def finish(self, request, recorder, config, response):
+        name = endpoint_name(request)
+        endpoint_stats.add(name, recorder)
+        if config['HEADERS']:
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time-Ms'] = f"{recorder.duration * 1000:.1f}"
+
+        problems = check_budget(name, recorder, config)
+        if problems and config['MODE'] == 'raise':
+            raise QueryBudgetExceeded("; ".join(problems))
+        if problems and config['MODE'] == 'warn':
+            for problem in problems:
+                logger.warning(problem)
+        return response
+
+
+@contextmanager
+def assert_query_budget(max_queries, using='default', n_plus_one_threshold=None):
+    """
+    Fail if the block runs more than `max_queries` queries (or repeats one
+    statement `n_plus_one_threshold` times):
+
+        with assert_query_budget(4):
+            client.get(url)
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    executed = len(context)
+    if executed > max_queries:
+        statements = "\n".join(query['sql'] for query in context.captured_queries)
+        raise AssertionError(f"{executed} queries executed, budget is {max_queries}:\n{statements}")
+    if n_plus_one_threshold:
+        repeated = Counter(fingerprint(query['sql']) for query in context.captured_queries)
+        suspects = [sql for sql, n in repeated.items() if n >= n_plus_one_threshold]
+        if suspects:
+            raise AssertionError("Possible N+1 queries:\n" + "\n".join(suspects))
+
+
+def assert_endpoint_budget(client, url, method='get', budget=None, **kwargs):
+    """
+    Request `url` with a test client and check it against `budget`, or the
+    budget configured for its URL name in QUERY_BUDGET["BUDGETS"].
+    """
+    if budget is None:
+        match = resolve(url.split('?', 1)[0])
+        budget = get_config()['BUDGETS'][match.url_name or match.view_name]
+    with assert_query_budget(budget):
+        return getattr(client, method)(url, **kwargs)
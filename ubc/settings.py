@@ -55,6 +55,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'ubc.query_budget.QueryBudgetMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -161,7 +162,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     # 'DEFAULT_PERMISSION_CLASSES': (
     #     'rest_framework.permissions.IsAuthenticated',
@@ -175,6 +176,99 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# CachedJWTAuthentication keeps the authenticated User here between requests
+AUTH_USER_CACHE_ALIAS = 'shared'
+AUTH_USER_CACHE_TIMEOUT = 60  # seconds
+
+# Profile views are buffered in memory and written in batches (accounts.profile_views)
+PROFILE_VIEW_BUFFER_SIZE = 500
+PROFILE_VIEW_FLUSH_INTERVAL = 5  # seconds
+
+# Keyset pagination of api/users/ (?cursor=&page_size=)
+USER_LIST_PAGE_SIZE = 50
+USER_LIST_MAX_PAGE_SIZE = 200
+
+DIRECTORY_SEARCH_PAGE_SIZE = 20
+DIRECTORY_SEARCH_MAX_PAGE_SIZE = 100
+
+# Upper bound for api/profiles/?ids=...
+PROFILE_BATCH_MAX_IDS = 100
+
+# api/chats/ inbox keyset pagination
+MESSAGE_INBOX_PAGE_SIZE = 50
+MESSAGE_INBOX_MAX_PAGE_SIZE = 200
+
+# api/chats/sync/ batch size
+MESSAGE_SYNC_BATCH_SIZE = 200
+
+# Default age (days) after which archive_messages moves read messages to
+# the compressed archive table
+MESSAGE_ARCHIVE_AFTER_DAYS = 90
+
+# api/chats/search/ keyset pagination
+MESSAGE_SEARCH_PAGE_SIZE = 20
+MESSAGE_SEARCH_MAX_PAGE_SIZE = 100
+
+# Upper bound for the ids list of api/chats/mark-read/, and for the messages
+# one watermark (sender / up_to_*) request marks; the response says has_more
+# when the client should repeat it
+MESSAGE_BULK_READ_MAX_IDS = 500
+MESSAGE_BULK_READ_MAX = 500
+
+# Cached unread badge counts (notifications.counters)
+UNREAD_COUNT_CACHE_ALIAS = 'shared'
+UNREAD_COUNT_CACHE_TIMEOUT = 300  # seconds
+
+# Real-time chat delivery over ws/chats/ (chats.pubsub). InProcessBroker only
+# reaches sockets held by the publishing process, so it is limited to DEBUG
+# (runserver); deployments fan out through a RESP server (Redis, Valkey).
+CHAT_PUBSUB = {
+    "BACKEND": "chats.pubsub.InProcessBroker",
+    "OPTIONS": {"queue_size": 100},
+} if DEBUG else {
+    "BACKEND": "chats.pubsub.RespBroker",
+    "OPTIONS": {"host": "127.0.0.1", "port": 6379, "queue_size": 100},
+}
+
+# api/chats/conversations/ keyset pagination
+CONVERSATION_LIST_PAGE_SIZE = 20
+CONVERSATION_LIST_MAX_PAGE_SIZE = 100
+
+# api/chats/conversations/<user_id>/messages/ keyset pagination
+CONVERSATION_HISTORY_PAGE_SIZE = 50
+CONVERSATION_HISTORY_MAX_PAGE_SIZE = 200
+
+# SQL instrumentation per URL name (ubc.query_budget). Budgets include the
+# auth user lookup on a cold cache, and the ArchivedMessage lookup where a
+# page can hold archived messages.
+QUERY_BUDGET = {
+    "ENABLED": DEBUG,
+    "MODE": "warn",  # "raise" to fail requests with N+1 patterns / overruns
+    "N_PLUS_ONE_THRESHOLD": 5,
+    "BUDGETS": {
+        "profile-bundle": 5,
+        "profile-batch": 4,
+        "profile-public-detail": 3,
+        "user-list": 2,
+        "directory-search": 3,
+        "conversation-list": 2,
+        "conversation-history": 4,
+        "message-inbox": 2,
+        "message-sync": 4,
+        "message-search": 4,
+        "message-unread-count": 1,
+        "notification-unread-count": 1,
+        "message-inbox-async": 2,
+        "notification-list-async": 2,
+        "profile-async": 3,
+        "category-list-async": 1,
+    },
+}
+
+# Rendered api/profile-public/<pk>/ payloads (versioned, see accounts.profile_cache)
+PROFILE_PUBLIC_CACHE_ALIAS = 'shared'
+PROFILE_PUBLIC_CACHE_TIMEOUT = 300  # seconds
+
 AUTH_USER_MODEL = 'accounts.User'
 
 
@@ -183,9 +277,36 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",  # Dev only (not shared across processes)
         "LOCATION": "unique-signup-cache",
-    }
+    },
+    # Entries other workers must see invalidated: cached auth users, public
+    # profile payloads and unread badge counts. Shared by every worker on the
+    # host; switch to the RESP backend below when running on several hosts.
+    "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    # "shared": {
+    #     "BACKEND": "accounts.resp_cache.RespCache",
+    #     "LOCATION": "127.0.0.1:6379",
+    #     "OPTIONS": {"db": 1},
+    # },
 }
 
+# Pending signups (OTP + signup data) must be visible to every worker.
+# Swap in accounts.signup_store.RedisSignupStore when running on several hosts.
+SIGNUP_SESSION_STORE = {
+    "BACKEND": "accounts.signup_store.SQLiteSignupStore",
+    "OPTIONS": {
+        "path": BASE_DIR / "signup_sessions.sqlite3",
+        "max_entries": 10000,
+    },
+}
+# SIGNUP_SESSION_STORE = {
+#     "BACKEND": "accounts.signup_store.RedisSignupStore",
+#     "OPTIONS": {"host": "127.0.0.1", "port": 6379, "db": 0},
+# }
+
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
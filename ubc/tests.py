@@ -0,0 +1,103 @@
+from django.http import JsonResponse
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from accounts.models import User
+from category.models import Category
+from .query_budget import QueryBudgetExceeded, endpoint_stats
+
+
+def n_plus_one_view(request):
+    # One category query per user
+    return JsonResponse({'categories': [
+        user.category.category_name for user in User.objects.filter(category__isnull=False).order_by('id')
+    ]})
+
+
+def compliant_view(request):
+    return JsonResponse({'categories': list(
+        User.objects.filter(category__isnull=False).order_by('id').values_list('category__category_name', flat=True)
+    )})
+
+
+async def async_view(request):
+    return JsonResponse({'users': await User.objects.acount()})
+
+
+urlpatterns = [
+    path('n-plus-one/', n_plus_one_view, name='n-plus-one'),
+    path('compliant/', compliant_view, name='compliant'),
+    path('async/', async_view, name='async'),
+]
+
+
+def budget(**overrides):
+    return override_settings(ROOT_URLCONF=__name__, QUERY_BUDGET={
+        'ENABLED': True,
+        'MODE': 'warn',
+        'N_PLUS_ONE_THRESHOLD': 3,
+        'BUDGETS': {'compliant': 1, 'async': 1},
+        **overrides,
+    })
+
+
+class QueryBudgetMiddlewareTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(category_name='Plumbers', type='professional', icon='category_icons/p.png')
+        for i in range(4):
+            User.objects.create(mobile_number=f'+91987650300{i}', name=f'User {i}', category=category)
+
+    @budget()
+    def test_headers_report_the_queries(self):
+        response = self.client.get('/n-plus-one/')
+        self.assertEqual(response['X-Query-Count'], '5')
+        self.assertIn('X-Query-Time-Ms', response)
+        self.assertEqual(endpoint_stats.snapshot()['n-plus-one']['max_queries'], 5)
+
+    @budget()
+    def test_warn_mode_logs_n_plus_one(self):
+        with self.assertLogs('ubc.query_budget', 'WARNING') as logs:
+            response = self.client.get('/n-plus-one/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('possible N+1 in n-plus-one: 4x', logs.output[0])
+
+    @budget(BUDGETS={'compliant': 0})
+    def test_warn_mode_logs_budget_overrun(self):
+        with self.assertLogs('ubc.query_budget', 'WARNING') as logs:
+            self.client.get('/compliant/')
+        self.assertIn('compliant ran 1 queries, budget is 0', logs.output[0])
+
+    @budget(MODE='raise')
+    def test_raise_mode_fails_the_request(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'possible N+1 in n-plus-one'):
+            self.client.get('/n-plus-one/')
+
+    @budget(MODE='off')
+    def test_off_mode_only_records(self):
+        with self.assertNoLogs('ubc.query_budget', 'WARNING'):
+            response = self.client.get('/n-plus-one/')
+        self.assertEqual(response['X-Query-Count'], '5')
+
+    @budget(ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get('/n-plus-one/')
+        self.assertNotIn('X-Query-Count', response)
+
+    @budget(MODE='raise')
+    def test_compliant_endpoint_is_silent(self):
+        with self.assertNoLogs('ubc.query_budget', 'WARNING'):
+            response = self.client.get('/compliant/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Query-Count'], '1')
+
+    @budget(MODE='raise')
+    async def test_async_views_are_counted(self):
+        response = await self.async_client.get('/async/')
+        self.assertEqual(response.json()['users'], 4)
+        self.assertEqual(response['X-Query-Count'], '1')
+
+    @budget(MODE='raise', BUDGETS={'async': 0})
+    async def test_async_budget_overrun_raises(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'async ran 1 queries, budget is 0'):
+            await self.async_client.get('/async/')